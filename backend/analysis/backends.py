@@ -0,0 +1,288 @@
+"""
+检测推理后端
+
+定义检测后端接口及两种实现：
+- synthetic: 基于图片摘要的模拟评分（默认，即原有的哈希种子评分）
+- yolo: 基于 ultralytics YOLO 的 CPU 推理，按检测框置信度换算各维度评分
+
+模型在启动时加载并预热，常驻于由 N 个实例组成的模型池中；
+每次推理从池中借出一个实例，对整批图片执行一次前向计算。
+
+相关环境变量：
+- DETECT_BACKEND: 后端名称，synthetic 或 yolo，默认 synthetic
+- DETECT_MODEL_INSTANCES: 模型池实例数，默认等于 DETECT_WORKERS
+- DETECT_YOLO_WEIGHTS: YOLO 权重文件路径，默认 yolov8n.pt
+- DETECT_YOLO_IMGSZ: YOLO 推理输入尺寸，默认 640
+- DETECT_YOLO_CLASS_MAP: 类别到评分维度的映射（JSON），如 {"porosity": "defect", "undercut": "depth"}，
+  未映射的类别计入 defect 维度
+"""
+import io
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from analysis.scoring import SCORE_DIMENSIONS, SCORE_MAX, SCORE_MIN, matrix_to_results, score_digests
+
+
+@dataclass
+class DetectionInput:
+    """单张待检测图片：内容摘要，以及（后端需要时）图片字节或暂存路径"""
+    digest: str
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+
+class DetectorBackend:
+    """检测后端接口"""
+
+    name = "base"
+    # 是否需要图片内容（为 False 时仅凭摘要即可评分，上传无需保留字节）
+    needs_image = False
+
+    def load(self):
+        """加载模型（每个实例调用一次）"""
+
+    def warmup(self):
+        """预热：执行一次推理，使首个真实请求不承担初始化开销"""
+
+    def predict_batch(self, inputs: List[DetectionInput]) -> List[Dict[str, float]]:
+        """对一批图片执行一次前向计算，返回与输入顺序一致的 {维度: 得分} 列表"""
+        raise NotImplementedError
+
+
+class SyntheticDetector(DetectorBackend):
+    """基于图片摘要的模拟评分后端，按批次模拟一次推理耗时"""
+
+    name = "synthetic"
+
+    def __init__(self, latency_range=(0.5, 1.2)):
+        self.latency_range = latency_range
+
+    def predict_batch(self, inputs: List[DetectionInput]) -> List[Dict[str, float]]:
+        scores = matrix_to_results(score_digests([item.digest for item in inputs]))
+        if self.latency_range:
+            time.sleep(random.uniform(*self.latency_range))
+        return scores
+
+
+class YoloDetector(DetectorBackend):
+    """
+    ultralytics YOLO CPU 推理后端
+
+    每个检测框的置信度视为对应维度的缺陷程度，
+    维度得分 = 99 - 29 × 该维度最大置信度（无检测框时为 99），与合成评分的取值范围 [70, 99] 一致。
+    """
+
+    name = "yolo"
+    needs_image = True
+
+    def __init__(self, weights: str = "yolov8n.pt", imgsz: int = 640, class_map: Optional[Dict[str, str]] = None):
+        self.weights = weights
+        self.imgsz = imgsz
+        self.class_map = class_map or {}
+        self.model = None
+
+    def load(self):
+        try:
+            from ultralytics import YOLO
+        except ImportError as e:
+            raise RuntimeError(f"yolo 后端需要安装 ultralytics: {e}")
+        self.model = YOLO(self.weights)
+
+    def warmup(self):
+        blank = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        self.model.predict([blank], imgsz=self.imgsz, device="cpu", verbose=False)
+
+    @staticmethod
+    def _load_image(item: DetectionInput):
+        from PIL import Image
+
+        source = item.path if item.path else io.BytesIO(item.data or b"")
+        with Image.open(source) as image:
+            return np.asarray(image.convert("RGB"))[:, :, ::-1]  # ultralytics 的 ndarray 输入为 BGR
+
+    def _scores_from_result(self, result) -> Dict[str, float]:
+        worst = {dim: 0.0 for dim in SCORE_DIMENSIONS}
+        boxes = getattr(result, "boxes", None)
+        if boxes is not None and len(boxes):
+            names = result.names
+            for cls, conf in zip(boxes.cls.tolist(), boxes.conf.tolist()):
+                dim = self.class_map.get(names[int(cls)], "defect")
+                if dim in worst:
+                    worst[dim] = max(worst[dim], float(conf))
+        return {dim: SCORE_MAX - (SCORE_MAX - SCORE_MIN) * worst[dim] for dim in SCORE_DIMENSIONS}
+
+    def predict_batch(self, inputs: List[DetectionInput]) -> List[Dict[str, float]]:
+        images = [self._load_image(item) for item in inputs]
+        results = self.model.predict(images, imgsz=self.imgsz, device="cpu", verbose=False)
+        return [self._scores_from_result(result) for result in results]
+
+
+def create_backend(name: str) -> DetectorBackend:
+    """按名称创建后端实例（未加载模型）"""
+    if name == "synthetic":
+        return SyntheticDetector()
+    if name == "yolo":
+        class_map = os.getenv("DETECT_YOLO_CLASS_MAP")
+        return YoloDetector(
+            weights=os.getenv("DETECT_YOLO_WEIGHTS", "yolov8n.pt"),
+            imgsz=int(os.getenv("DETECT_YOLO_IMGSZ", "640")),
+            class_map=json.loads(class_map) if class_map else None,
+        )
+    raise ValueError(f"不支持的检测后端: {name}，可选值: synthetic, yolo")
+
+
+def backend_name_from_env() -> str:
+    return os.getenv("DETECT_BACKEND", "synthetic").lower()
+
+
+def backend_cache_namespace(name: Optional[str] = None) -> str:
+    """结果缓存命名空间：不同后端（或不同权重）的评分互不混用"""
+    name = name or backend_name_from_env()
+    if name == "yolo":
+        weights = os.path.basename(os.getenv("DETECT_YOLO_WEIGHTS", "yolov8n.pt"))
+        return f"yolo:{weights}"
+    return f"{name}-v1"
+
+
+class ModelPool:
+    """
+    常驻模型池：N 个预加载的后端实例，推理时借出一个实例
+
+    参数：
+    - backend_name: 后端名称
+    - instances: 实例数
+    """
+
+    def __init__(self, backend_name: str = "synthetic", instances: int = 1):
+        self.backend_name = backend_name
+        self.instances = max(1, int(instances))
+        self.needs_image = create_backend(backend_name).needs_image
+
+        self._available: "queue.Queue[tuple]" = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.loaded = False
+
+        # 运行指标
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.inference_calls = 0
+        self.inference_items = 0
+        self.inference_seconds = 0.0
+        self.max_batch_size = 0
+
+    @classmethod
+    def from_env(cls) -> "ModelPool":
+        """根据环境变量创建模型池（未加载）"""
+        instances = os.getenv("DETECT_MODEL_INSTANCES") or os.getenv("DETECT_WORKERS", "4")
+        return cls(backend_name=backend_name_from_env(), instances=int(instances))
+
+    def load(self):
+        """加载并预热全部实例（幂等）"""
+        with self._load_lock:
+            if self.loaded:
+                return
+            for index in range(self.instances):
+                backend = create_backend(self.backend_name)
+                started = time.perf_counter()
+                backend.load()
+                loaded = time.perf_counter()
+                backend.warmup()
+                self.load_seconds += loaded - started
+                self.warmup_seconds += time.perf_counter() - loaded
+                self._available.put((index, backend))
+            self.loaded = True
+
+    @contextmanager
+    def acquire(self):
+        """借出一个模型实例，用完归还"""
+        if not self.loaded:
+            self.load()
+        index, backend = self._available.get()
+        try:
+            yield index, backend
+        finally:
+            self._available.put((index, backend))
+
+    def infer(self, inputs: List[DetectionInput]):
+        """
+        对一批图片执行一次推理
+
+        返回：
+        - (评分列表, 推理信息)，推理信息包含 backend、batch_size、inference_ms、instance、model_load_ms
+        """
+        with self.acquire() as (index, backend):
+            started = time.perf_counter()
+            results = backend.predict_batch(inputs)
+            elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self.inference_calls += 1
+            self.inference_items += len(inputs)
+            self.inference_seconds += elapsed
+            self.max_batch_size = max(self.max_batch_size, len(inputs))
+
+        info = {
+            "backend": self.backend_name,
+            "batch_size": len(inputs),
+            "inference_ms": round(elapsed * 1000, 2),
+            "instance": index,
+            "model_load_ms": round(self.load_seconds / self.instances * 1000, 2),
+        }
+        return results, info
+
+    def stats(self) -> Dict[str, Any]:
+        """返回模型池的运行指标"""
+        calls = self.inference_calls
+        return {
+            "backend": self.backend_name,
+            "instances": self.instances,
+            "loaded": self.loaded,
+            "available": self._available.qsize(),
+            "load_seconds": round(self.load_seconds, 3),
+            "warmup_seconds": round(self.warmup_seconds, 3),
+            "inference_calls": calls,
+            "inference_items": self.inference_items,
+            "avg_batch_size": round(self.inference_items / calls, 2) if calls else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_inference_ms": round(self.inference_seconds / calls * 1000, 2) if calls else 0.0,
+        }
+
+
+_model_pool: Optional[ModelPool] = None
+_model_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """获取全局模型池（首次调用时根据环境变量创建，模型在首次推理或显式 load 时加载）"""
+    global _model_pool
+    with _model_pool_lock:
+        if _model_pool is None:
+            _model_pool = ModelPool.from_env()
+        return _model_pool
+
+
+def configure_model_pool(**kwargs) -> ModelPool:
+    """替换全局模型池，参数同 ModelPool"""
+    global _model_pool
+    with _model_pool_lock:
+        _model_pool = ModelPool(**kwargs)
+        return _model_pool
+
+
+def run_inference(inputs: List[DetectionInput]):
+    """
+    执行池中运行的推理入口（模块级函数，可被进程池 pickle）
+
+    线程模式下使用主进程的模型池；进程模式下每个工作进程使用自己的模型池。
+    """
+    return get_model_pool().infer(inputs)
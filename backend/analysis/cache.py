@@ -0,0 +1,195 @@
+"""
+检测结果缓存
+
+以图片内容摘要为键缓存分析结果：第一级为有容量上限的内存 LRU，
+第二级为可选的 SQLite 磁盘缓存（重启后仍可命中）。同一张图片重复上传时直接返回缓存结果。
+
+相关环境变量：
+- DETECT_CACHE_SIZE: 内存 LRU 容量（条），0 表示关闭内存缓存，默认 4096
+- DETECT_CACHE_DB: 磁盘缓存的 SQLite 文件路径，默认为空（不启用磁盘缓存）
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+CACHE_TIER_MEMORY = "memory"
+CACHE_TIER_DISK = "disk"
+
+
+class ResultCache:
+    """
+    以摘要为键的两级结果缓存（线程安全）
+
+    参数：
+    - max_entries: 内存 LRU 容量
+    - db_path: 磁盘缓存 SQLite 文件路径，为空则不启用
+    - namespace: 缓存命名空间，分析算法变化时更换命名空间即可使旧结果失效
+    """
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None, namespace: str = "synthetic-v1"):
+        self.max_entries = max(0, int(max_entries))
+        self.db_path = db_path or None
+        self.namespace = namespace
+
+        self._entries: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.db_path:
+            self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        """根据环境变量创建缓存"""
+        from analysis.backends import backend_cache_namespace
+
+        return cls(
+            max_entries=int(os.getenv("DETECT_CACHE_SIZE", "4096")),
+            db_path=os.getenv("DETECT_CACHE_DB") or None,
+            namespace=backend_cache_namespace(),
+        )
+
+    # ---- 磁盘层 ----
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 连接不能跨线程共享，每个线程各自持有一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS detection_cache ("
+            " namespace TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, digest))"
+        )
+        conn.commit()
+
+    def _disk_get(self, digest: str) -> Optional[Dict[str, float]]:
+        row = self._connect().execute(
+            "SELECT result FROM detection_cache WHERE namespace = ? AND digest = ?",
+            (self.namespace, digest),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, digest: str, result: Dict[str, float]):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO detection_cache (namespace, digest, result, created_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, digest, json.dumps(result), time.time()),
+        )
+        conn.commit()
+
+    # ---- 内存层 ----
+
+    def _memory_get(self, digest: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            result = self._entries.get(digest)
+            if result is not None:
+                self._entries.move_to_end(digest)
+            return result
+
+    def _memory_put(self, digest: str, result: Dict[str, float]):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[digest] = result
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    # ---- 对外接口 ----
+
+    def get(self, digest: str) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+        """
+        查询缓存
+
+        返回：
+        - (结果, 命中层级)，未命中时为 (None, None)
+        """
+        result = self._memory_get(digest)
+        if result is not None:
+            self._count("memory_hits")
+            return dict(result), CACHE_TIER_MEMORY
+
+        if self.db_path:
+            result = self._disk_get(digest)
+            if result is not None:
+                self._count("disk_hits")
+                self._memory_put(digest, result)
+                return dict(result), CACHE_TIER_DISK
+
+        self._count("misses")
+        return None, None
+
+    def put(self, digest: str, result: Dict[str, Any]):
+        """写入缓存（数值统一转为 Python float 以便序列化）"""
+        result = {key: float(value) for key, value in result.items()}
+        self._memory_put(digest, result)
+        if self.db_path:
+            self._disk_put(digest, result)
+
+    def clear(self):
+        """清空内存缓存与当前命名空间下的磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            conn = self._connect()
+            conn.execute("DELETE FROM detection_cache WHERE namespace = ?", (self.namespace,))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存命中统计"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_enabled": bool(self.db_path),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """获取全局检测结果缓存（首次调用时根据环境变量创建）"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache.from_env()
+    return _result_cache
+
+
+def configure_result_cache(**kwargs) -> ResultCache:
+    """替换全局检测结果缓存，参数同 ResultCache"""
+    global _result_cache
+    _result_cache = ResultCache(**kwargs)
+    return _result_cache
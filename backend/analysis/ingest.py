@@ -0,0 +1,263 @@
+"""
+上传流式接收
+
+直接解析请求体的 multipart 数据流，在分块到达时增量计算文件摘要，
+默认不向磁盘写入任何内容，峰值内存只与分块大小有关、与图片大小无关
+（推理后端需要图片像素时可选择在内存中保留文件内容）。
+如配置了暂存目录，则同时将文件写入该目录下的唯一文件名，由调用方在处理完成后清理。
+
+相关环境变量：
+- DETECT_SPOOL_DIR: 上传暂存目录，默认为空（不落盘）
+- DETECT_MAX_UPLOAD_MB: 单个上传文件大小上限（MB），默认 50
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+DEFAULT_MAX_UPLOAD_MB = 50
+
+# OpenAPI 文档中的请求体描述，与原先 File(...) 参数生成的结构一致
+UPLOAD_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+BATCH_UPLOAD_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@dataclass
+class IngestedUpload:
+    """流式接收完成的上传文件"""
+    filename: str
+    digest: str
+    size: int
+    spool_path: Optional[str] = None
+    data: Optional[bytes] = None
+
+    def cleanup(self):
+        """删除暂存文件（如有）并释放保留的文件内容"""
+        if self.spool_path and os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+        self.spool_path = None
+        self.data = None
+
+
+@dataclass
+class _PartState:
+    headers: dict = field(default_factory=dict)
+    header_field: bytes = b""
+    header_value: bytes = b""
+    name: Optional[str] = None
+    filename: Optional[str] = None
+
+
+def _spool_dir() -> Optional[str]:
+    return os.getenv("DETECT_SPOOL_DIR") or None
+
+
+def _max_upload_bytes() -> int:
+    return int(float(os.getenv("DETECT_MAX_UPLOAD_MB", DEFAULT_MAX_UPLOAD_MB)) * 1024 * 1024)
+
+
+def _remove_spooled(uploads):
+    for upload in uploads:
+        upload.cleanup()
+
+
+async def _stream_multipart(
+    request: Request,
+    field_name: str,
+    spool_dir: Optional[str],
+    max_bytes: Optional[int],
+    max_files: Optional[int],
+    keep_data: bool = False,
+) -> List[IngestedUpload]:
+    """流式解析请求体, 返回所有名为 field_name 的文件部分"""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="请求必须为 multipart/form-data 格式")
+
+    spool_dir = spool_dir or _spool_dir()
+    max_bytes = max_bytes or _max_upload_bytes()
+
+    uploads: List[IngestedUpload] = []
+    part = _PartState()
+    current = {"md5": None, "size": 0, "spool_file": None, "buffer": None}
+
+    def on_part_begin():
+        nonlocal part
+        part = _PartState()
+
+    def on_header_field(data, start, end):
+        part.header_field += data[start:end]
+
+    def on_header_value(data, start, end):
+        part.header_value += data[start:end]
+
+    def on_header_end():
+        part.headers[part.header_field.lower()] = part.header_value
+        part.header_field = b""
+        part.header_value = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name")
+        filename = disposition.get(b"filename")
+        part.name = name.decode("utf-8", "replace") if name is not None else None
+        part.filename = filename.decode("utf-8", "replace") if filename is not None else None
+        if part.name != field_name:
+            return
+
+        if max_files is not None and len(uploads) >= max_files:
+            raise HTTPException(status_code=413, detail=f"单次最多上传 {max_files} 个文件")
+
+        upload = IngestedUpload(filename=part.filename or "", digest="", size=0)
+        current["md5"] = hashlib.md5()
+        current["size"] = 0
+        current["spool_file"] = None
+        current["buffer"] = bytearray() if keep_data else None
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            suffix = os.path.splitext(part.filename or "")[1]
+            fd, upload.spool_path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=spool_dir)
+            current["spool_file"] = os.fdopen(fd, "wb")
+        uploads.append(upload)
+
+    def on_part_data(data, start, end):
+        if part.name != field_name:
+            return
+        chunk = data[start:end]
+        current["size"] += len(chunk)
+        if current["size"] > max_bytes:
+            raise HTTPException(status_code=413, detail=f"上传文件超过 {max_bytes // (1024 * 1024)} MB 上限")
+        current["md5"].update(chunk)
+        if current["spool_file"] is not None:
+            current["spool_file"].write(chunk)
+        if current["buffer"] is not None:
+            current["buffer"] += chunk
+
+    def on_part_end():
+        if part.name != field_name:
+            return
+        upload = uploads[-1]
+        upload.digest = current["md5"].hexdigest()
+        upload.size = current["size"]
+        if current["buffer"] is not None:
+            upload.data = bytes(current["buffer"])
+            current["buffer"] = None
+        if current["spool_file"] is not None:
+            current["spool_file"].close()
+            current["spool_file"] = None
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except Exception as e:
+        if current["spool_file"] is not None:
+            current["spool_file"].close()
+        _remove_spooled(uploads)
+        if isinstance(e, MultipartParseError):
+            raise HTTPException(status_code=400, detail=f"无法解析上传数据: {e}")
+        raise
+
+    # 未正常结束的文件部分（请求体被截断）视为无效
+    complete = [upload for upload in uploads if upload.digest]
+    _remove_spooled([upload for upload in uploads if not upload.digest])
+    if not complete:
+        raise HTTPException(status_code=422, detail=f"缺少上传文件字段: {field_name}")
+    return complete
+
+
+async def ingest_upload(
+    request: Request,
+    field_name: str = "file",
+    spool_dir: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    keep_data: bool = False,
+) -> IngestedUpload:
+    """
+    从 multipart/form-data 请求体中流式读取指定文件字段
+
+    参数：
+    - request: FastAPI 请求对象
+    - field_name: 文件字段名，默认为 file
+    - spool_dir: 暂存目录，为空时读取环境变量 DETECT_SPOOL_DIR，仍为空则不落盘
+    - max_bytes: 文件大小上限，超出返回 413
+    - keep_data: 是否在内存中保留文件内容（推理后端需要图片像素时使用）
+
+    返回：
+    - IngestedUpload: 文件名、MD5 摘要、大小、暂存路径及（可选的）文件内容
+    """
+    uploads = await _stream_multipart(request, field_name, spool_dir, max_bytes, max_files=1, keep_data=keep_data)
+    return uploads[0]
+
+
+async def ingest_uploads(
+    request: Request,
+    field_name: str = "files",
+    spool_dir: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    max_files: Optional[int] = None,
+    keep_data: bool = False,
+) -> List[IngestedUpload]:
+    """
+    从 multipart/form-data 请求体中流式读取同名的多个文件字段
+
+    参数同 ingest_upload，另有：
+    - max_files: 文件数量上限，超出返回 413
+
+    返回：
+    - List[IngestedUpload]: 按上传顺序排列的文件列表
+    """
+    return await _stream_multipart(request, field_name, spool_dir, max_bytes, max_files, keep_data)
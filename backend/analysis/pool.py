@@ -0,0 +1,217 @@
+"""
+检测任务执行池
+
+将推理、评分等阻塞型分析任务从事件循环中移出，交由有界的线程池或进程池执行
+（上传图片的摘要在接收分块时增量计算，见 analysis/ingest.py），
+并通过信号量限制同时在途的分析数量。池满时请求会排队等待一段时间，
+超时仍未获得执行槽位则抛出 PoolSaturatedError，由接口层转换为 429 响应。
+
+相关环境变量：
+- DETECT_EXECUTOR: 执行模式，thread 或 process，默认 thread
+- DETECT_WORKERS: 工作线程/进程数，默认 4
+- DETECT_MAX_INFLIGHT: 最大在途分析数（含正在执行的任务），默认 DETECT_WORKERS 的 2 倍
+- DETECT_QUEUE_TIMEOUT: 池满时的排队等待秒数，0 表示立即拒绝，负数表示无限等待，默认 10
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+EXECUTOR_MODES = ("thread", "process")
+# forkserver 预先导入的模块: 工作进程不从已启动后台线程的 Web 服务进程直接 fork,
+# 也无需各自重新导入推理后端（包含 __main__, 见 charts/renderer.py）
+PRELOAD_MODULES = ["__main__", "analysis.backends"]
+
+
+class PoolSaturatedError(RuntimeError):
+    """执行池已满且排队等待超时"""
+
+
+def _init_process_worker():
+    # 进程模式下每个工作进程只持有一个模型实例，在进程启动时加载并预热
+    from analysis.backends import configure_model_pool, backend_name_from_env
+
+    configure_model_pool(backend_name=backend_name_from_env(), instances=1).load()
+
+
+def _ping():
+    return os.getpid()
+
+
+class DetectionExecutor:
+    """
+    有界的检测任务执行池
+
+    参数：
+    - mode: 执行模式，"thread" 使用线程池，"process" 使用进程池
+    - workers: 工作线程/进程数
+    - max_inflight: 最大在途任务数，超出后新任务进入排队
+    - queue_timeout: 排队等待秒数，0 表示立即拒绝，None 或负数表示无限等待
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 4,
+        max_inflight: Optional[int] = None,
+        queue_timeout: Optional[float] = 10.0,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"不支持的执行模式: {mode}，可选值: {EXECUTOR_MODES}")
+
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self.max_inflight = max(1, int(max_inflight or self.workers * 2))
+        self.queue_timeout = queue_timeout if queue_timeout is None or queue_timeout >= 0 else None
+
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self._inflight = 0
+        self._waiting = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "DetectionExecutor":
+        """根据环境变量创建执行池"""
+        max_inflight = os.getenv("DETECT_MAX_INFLIGHT")
+        return cls(
+            mode=os.getenv("DETECT_EXECUTOR", "thread").lower(),
+            workers=int(os.getenv("DETECT_WORKERS", "4")),
+            max_inflight=int(max_inflight) if max_inflight else None,
+            queue_timeout=float(os.getenv("DETECT_QUEUE_TIMEOUT", "10")),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        """懒加载底层执行器，避免导入阶段就拉起进程"""
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload(PRELOAD_MODULES)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=context, initializer=_init_process_worker
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="detect-worker"
+                    )
+            return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+        return self._semaphore
+
+    async def _acquire_slot(self):
+        semaphore = self._get_semaphore()
+
+        if self.queue_timeout == 0:
+            if semaphore.locked():
+                self._rejected += 1
+                raise PoolSaturatedError("检测任务繁忙，请稍后重试")
+            await semaphore.acquire()
+            return
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise PoolSaturatedError(
+                f"检测任务繁忙，排队超过 {self.queue_timeout} 秒，请稍后重试"
+            )
+        finally:
+            self._waiting -= 1
+
+    async def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        提交一个阻塞任务并等待其结果
+
+        进程模式下 fn 及其参数必须可以被 pickle（模块级函数）。
+        """
+        await self._acquire_slot()
+        self._inflight += 1
+        self._submitted += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._busy_seconds += time.perf_counter() - started
+            self._inflight -= 1
+            self._get_semaphore().release()
+
+    async def prestart(self):
+        """预先拉起全部工作进程（进程模式下会同时完成模型加载），线程模式下无操作"""
+        if self.mode != "process":
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回执行池的运行指标"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_inflight": self.max_inflight,
+            "queue_timeout": self.queue_timeout,
+            "inflight": self._inflight,
+            "waiting": self._waiting,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "busy_seconds": round(self._busy_seconds, 3),
+        }
+
+    def shutdown(self, wait: bool = True):
+        """关闭底层执行器"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_detection_executor: Optional[DetectionExecutor] = None
+
+
+def get_detection_executor() -> DetectionExecutor:
+    """获取全局检测执行池（首次调用时根据环境变量创建）"""
+    global _detection_executor
+    if _detection_executor is None:
+        _detection_executor = DetectionExecutor.from_env()
+    return _detection_executor
+
+
+def configure_detection_executor(**kwargs) -> DetectionExecutor:
+    """替换全局检测执行池，参数同 DetectionExecutor"""
+    global _detection_executor
+    if _detection_executor is not None:
+        _detection_executor.shutdown(wait=False)
+    _detection_executor = DetectionExecutor(**kwargs)
+    return _detection_executor
+
+
+def shutdown_detection_executor(wait: bool = True):
+    """关闭全局检测执行池"""
+    global _detection_executor
+    if _detection_executor is not None:
+        _detection_executor.shutdown(wait=wait)
+        _detection_executor = None
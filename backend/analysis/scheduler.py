@@ -0,0 +1,201 @@
+"""
+动态微批调度器
+
+将并发到达的单张检测请求在最多 max_wait_ms 毫秒、最多 max_batch_size 张的窗口内聚合，
+作为一次批量推理提交到检测执行池，再把结果逐一分发给各自的调用方。
+聚合窗口越长，批越大、吞吐越高，但每个请求额外增加的排队延迟也越大；
+可通过 /detect/stats 中的队列深度、实际批大小与排队延迟分位数调节二者的取舍。
+
+相关环境变量：
+- DETECT_MICROBATCH_WAIT_MS: 最长聚合等待时间（毫秒），0 表示关闭微批，默认 5
+- DETECT_MICROBATCH_MAX_SIZE: 单批最大图片数，默认 16
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analysis.backends import DetectionInput, run_inference
+from analysis.pool import DetectionExecutor, get_detection_executor
+
+# 保留最近多少个请求的排队延迟用于计算分位数
+LATENCY_WINDOW = 2048
+
+
+class MicroBatchScheduler:
+    """
+    动态微批调度器（需在事件循环中使用）
+
+    参数：
+    - max_wait_ms: 收到一批中第一个请求后最多再等待的毫秒数
+    - max_batch_size: 单批最大请求数，达到后立即提交
+    - executor: 检测执行池，为空时使用全局执行池
+    - runner: 执行池中运行的批量推理函数，接收输入列表，返回 (结果列表, 推理信息)
+    """
+
+    def __init__(
+        self,
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 16,
+        executor: Optional[DetectionExecutor] = None,
+        runner: Callable[[List[DetectionInput]], Tuple[List[Any], Dict[str, Any]]] = run_inference,
+    ):
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._executor = executor
+        self.runner = runner
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatches: set = set()
+
+        # 运行指标
+        self.requests = 0
+        self.batches = 0
+        self.batch_size_total = 0
+        self.max_observed_batch = 0
+        self.full_batches = 0
+        self._queue_latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @classmethod
+    def from_env(cls) -> "MicroBatchScheduler":
+        """根据环境变量创建调度器"""
+        return cls(
+            max_wait_ms=float(os.getenv("DETECT_MICROBATCH_WAIT_MS", "5")),
+            max_batch_size=int(os.getenv("DETECT_MICROBATCH_MAX_SIZE", "16")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch_size > 1
+
+    @property
+    def executor(self) -> DetectionExecutor:
+        return self._executor or get_detection_executor()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._collector is None or self._collector.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+
+    async def submit(self, item: DetectionInput):
+        """
+        提交单张图片并等待其所在批次完成
+
+        返回：
+        - (评分结果, 推理信息)，推理信息在批量推理信息基础上增加 queue_ms（聚合排队耗时）
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self.requests += 1
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # 调用方已取消的请求不再参与推理
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        dispatched = time.perf_counter()
+        queue_ms = [(dispatched - enqueued) * 1000 for _, _, enqueued in batch]
+        self.batches += 1
+        self.batch_size_total += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+        if len(batch) == self.max_batch_size:
+            self.full_batches += 1
+        self._queue_latencies.extend(queue_ms)
+
+        try:
+            results, info = await self.executor.submit(self.runner, [item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result, waited in zip(batch, results, queue_ms):
+            if not future.done():
+                future.set_result((result, dict(info, queue_ms=round(waited, 2))))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度器的运行指标"""
+        latencies = np.array(self._queue_latencies) if self._queue_latencies else None
+        return {
+            "enabled": self.enabled,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._dispatches),
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batch_size_total / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_observed": self.max_observed_batch,
+            "full_batches": self.full_batches,
+            "queue_ms_p50": round(float(np.percentile(latencies, 50)), 2) if latencies is not None else 0.0,
+            "queue_ms_p99": round(float(np.percentile(latencies, 99)), 2) if latencies is not None else 0.0,
+            "queue_ms_max": round(float(latencies.max()), 2) if latencies is not None else 0.0,
+        }
+
+    def shutdown(self):
+        """停止聚合任务并取消尚未完成的批次"""
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        for task in list(self._dispatches):
+            task.cancel()
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+
+_scheduler: Optional[MicroBatchScheduler] = None
+
+
+def get_microbatch_scheduler() -> MicroBatchScheduler:
+    """获取全局微批调度器（首次调用时根据环境变量创建）"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MicroBatchScheduler.from_env()
+    return _scheduler
+
+
+def configure_microbatch_scheduler(**kwargs) -> MicroBatchScheduler:
+    """替换全局微批调度器，参数同 MicroBatchScheduler"""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown()
+    _scheduler = MicroBatchScheduler(**kwargs)
+    return _scheduler
+
+
+def shutdown_microbatch_scheduler():
+    """关闭全局微批调度器"""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown()
+        _scheduler = None
@@ -0,0 +1,102 @@
+"""
+批量评分引擎
+
+将 N 张图片（以内容 MD5 摘要表示）的评分计算为 N×4 的评分矩阵：
+每张图片使用由摘要派生种子的独立随机状态抽样，不触碰全局 np.random 状态（线程安全），
+截断、取整与综合得分计算均以数组运算完成。单张图片的评分即 N=1 的特例，两条路径结果逐位一致。
+
+说明：随机状态使用与 np.random.seed 相同算法的 RandomState（MT19937），
+以保证与历史评分及已缓存结果完全一致；np.random.Generator 的抽样算法不同，会改变已有图片的得分。
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# 评分矩阵的列顺序
+SCORE_DIMENSIONS = ("speed", "angle", "depth", "defect")
+SCORE_MIN = 70
+SCORE_MAX = 99
+
+
+def digest_seed(digest: str) -> int:
+    """由 MD5 摘要派生随机种子"""
+    return int(digest[:8], 16) % 2**32
+
+
+def draw_raw_scores(digests: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    为每个摘要抽取基础得分与调整系数
+
+    返回：
+    - base_scores: (N, 4) 基础得分
+    - adjustment: (N,) 调整系数
+    """
+    n = len(digests)
+    base_scores = np.empty((n, len(SCORE_DIMENSIONS)), dtype=np.float64)
+    uniforms = np.empty(n, dtype=np.float64)
+    # 每次调用持有独立的随机状态，逐项重新播种；重新播种比逐项创建 RandomState 快一个数量级
+    rng = np.random.RandomState()
+    for i, digest in enumerate(digests):
+        rng.seed(digest_seed(digest))
+        base_scores[i] = rng.normal(85, 8, len(SCORE_DIMENSIONS))
+        uniforms[i] = rng.random_sample()
+    # 与 RandomState.uniform(0.9, 1.1) 的计算方式一致: low + (high - low) * u
+    adjustment = 0.9 + (1.1 - 0.9) * uniforms
+    return base_scores, adjustment
+
+
+def score_digests(digests: Sequence[str]) -> np.ndarray:
+    """
+    批量计算评分
+
+    参数：
+    - digests: 图片内容的 MD5 摘要列表
+
+    返回：
+    - np.ndarray: (N, 4) 未取整的评分矩阵，列顺序见 SCORE_DIMENSIONS
+    """
+    if len(digests) == 0:
+        return np.empty((0, len(SCORE_DIMENSIONS)), dtype=np.float64)
+    base_scores, adjustment = draw_raw_scores(digests)
+    return np.clip(base_scores * adjustment[:, None], SCORE_MIN, SCORE_MAX)
+
+
+def round_score_matrix(score_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将评分矩阵取两位小数并计算综合得分（四项取整后的平均值再取两位小数）
+
+    返回：
+    - rounded: (N, 4) 取整后的评分矩阵
+    - totals: (N,) 综合得分
+    """
+    rounded = np.round(np.asarray(score_matrix, dtype=np.float64), 2)
+    # 按列依次相加，与逐项相加的求和顺序保持一致
+    totals = np.round((((rounded[:, 0] + rounded[:, 1]) + rounded[:, 2]) + rounded[:, 3]) / 4, 2)
+    return rounded, totals
+
+
+def matrix_to_results(score_matrix: np.ndarray) -> List[Dict[str, float]]:
+    """将未取整的评分矩阵转换为 {维度: 得分} 字典列表"""
+    return [dict(zip(SCORE_DIMENSIONS, row)) for row in np.asarray(score_matrix).tolist()]
+
+
+def results_to_matrix(results: Iterable[Dict[str, float]]) -> np.ndarray:
+    """将 {维度: 得分} 字典列表转换为评分矩阵"""
+    rows = [[result[dim] for dim in SCORE_DIMENSIONS] for result in results]
+    return np.asarray(rows, dtype=np.float64).reshape(-1, len(SCORE_DIMENSIONS))
+
+
+def score_rows(score_matrix: np.ndarray) -> List[Dict[str, float]]:
+    """
+    将未取整的评分矩阵转换为可直接写库/返回的得分字典列表
+
+    返回：
+    - [{"speed_score", "angle_score", "depth_score", "defect_score", "total_score"}, ...]
+    """
+    rounded, totals = round_score_matrix(score_matrix)
+    rows = []
+    for values, total in zip(rounded.tolist(), totals.tolist()):
+        row = {f"{dim}_score": value for dim, value in zip(SCORE_DIMENSIONS, values)}
+        row["total_score"] = total
+        rows.append(row)
+    return rows
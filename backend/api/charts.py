@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Path, Request, Response
+
+from charts.cache import get_chart_cache
+from charts.style import CHART_FORMATS
+
+router = APIRouter()
+
+# 图片内容由哈希唯一确定, 同一 URL 的内容永不改变, 允许浏览器长期缓存
+CHART_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 图片文件名: 64 位十六进制内容哈希 + 格式扩展名
+CHART_FILENAME_PATTERN = r"^[0-9a-f]{64}\.(" + "|".join(CHART_FORMATS) + r")$"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """判断 If-None-Match 请求头是否包含当前 ETag（忽略弱校验前缀 W/）"""
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@router.get("/charts/{filename}", name="get_chart")
+async def get_chart(
+    request: Request,
+    filename: str = Path(..., pattern=CHART_FILENAME_PATTERN, description="图片文件名: {内容哈希}.{格式}"),
+):
+    """
+    按内容哈希获取已渲染的图表图片（如 /charts/{hash}.png、/charts/{hash}.webp）
+
+    文件名由 /predict、/predict/charts-only 返回的 charts 字段给出;
+    携带匹配的 If-None-Match 时返回 304。
+    """
+    key, extension = filename.split(".")
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": CHART_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = get_chart_cache().get(filename)
+    if data is None:
+        raise HTTPException(status_code=404, detail="图表不存在或已过期，请重新请求预测接口")
+    return Response(content=data, media_type=CHART_FORMATS[extension], headers=headers)
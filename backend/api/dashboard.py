@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, case, func, literal, select, tuple_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Literal, Optional
+import base64
+import json
 
 from database import SessionLocal
 import models
+from rollups import summarize_rollup
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter()
 
+# 单页记录数的默认值与上限
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 500
+
+# 参与统计的评分维度
+SCORE_COLUMNS = ("speed_score", "angle_score", "depth_score", "defect_score", "total_score")
+# 统计的分位数
+PERCENTILES = {"p50": 0.5, "p90": 0.9}
+# 未指定起始时间时的默认统计窗口
+AGGREGATE_DEFAULT_WINDOW = {"hour": timedelta(days=7), "day": timedelta(days=90), "week": timedelta(weeks=52)}
+# 各粒度的桶长度
+AGGREGATE_BUCKET_SPAN = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(days=7)}
+
 # Pydantic model for response
 class WeldingRecordOut(BaseModel):
     id: int
@@ -22,6 +39,34 @@ class WeldingRecordOut(BaseModel):
     class Config:
         from_attributes = True
 
+class ScoreSummary(BaseModel):
+    """单个评分维度在一个时间桶内的统计量, 分位数仅在请求时计算"""
+    mean: float
+    std: float
+    min: float
+    max: float
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+
+class AggregateBucket(BaseModel):
+    """一个时间桶（小时、天或周）的统计结果"""
+    bucket_start: str
+    count: int
+    scores: Dict[str, ScoreSummary]
+
+class AggregatesResponse(BaseModel):
+    """按时间分桶的评分统计"""
+    granularity: str
+    start_time: datetime
+    end_time: datetime
+    buckets: List[AggregateBucket]
+
+class HistoryPage(BaseModel):
+    """历史记录分页结果"""
+    items: List[WeldingRecordOut]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
@@ -30,10 +75,274 @@ def get_db():
     finally:
         db.close()
 
-@router.get("/dashboard/history", response_model=List[WeldingRecordOut])
-async def get_welding_history(db: Session = Depends(get_db)):
+def encode_cursor(timestamp: datetime, record_id: int) -> str:
+    """将一页最后一条记录的 (timestamp, id) 编码为不透明的游标字符串"""
+    raw = json.dumps([timestamp.isoformat(), record_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    """解析游标字符串, 返回 (timestamp, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp_str, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp_str), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def query_history_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = HISTORY_DEFAULT_LIMIT,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+) -> HistoryPage:
+    """
+    按 (timestamp, id) 倒序的游标分页查询
+
+    通过复合索引 ix_welding_records_timestamp_id 定位游标位置, 每页只读取 limit + 1 行,
+    查询代价与翻页深度无关。
     """
-    从数据库获取所有的焊接记录
+    record = models.WeldingRecord
+    query = select(
+        record.id,
+        record.timestamp,
+        record.speed_score,
+        record.angle_score,
+        record.depth_score,
+        record.defect_score,
+        record.total_score,
+    )
+
+    if cursor:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        # 游标值需按列类型绑定, 才能使用与存储值一致的时间格式
+        query = query.where(
+            tuple_(record.timestamp, record.id)
+            < tuple_(literal(cursor_time, record.timestamp.type), literal(cursor_id, record.id.type))
+        )
+    if start_time is not None:
+        query = query.where(record.timestamp >= start_time)
+    if end_time is not None:
+        query = query.where(record.timestamp <= end_time)
+    if min_score is not None:
+        query = query.where(record.total_score >= min_score)
+    if max_score is not None:
+        query = query.where(record.total_score <= max_score)
+
+    query = query.order_by(record.timestamp.desc(), record.id.desc()).limit(limit + 1)
+    rows = db.execute(query).mappings().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
+    return HistoryPage(
+        items=[WeldingRecordOut.model_validate(dict(row)) for row in rows],
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+
+@router.get("/dashboard/history", response_model=HistoryPage)
+def get_welding_history(
+    cursor: Optional[str] = Query(default=None, description="上一页返回的 next_cursor"),
+    limit: int = Query(default=HISTORY_DEFAULT_LIMIT, ge=1, le=HISTORY_MAX_LIMIT, description="每页记录数"),
+    start_time: Optional[datetime] = Query(default=None, description="起始时间（含）"),
+    end_time: Optional[datetime] = Query(default=None, description="结束时间（含）"),
+    min_score: Optional[float] = Query(default=None, description="综合得分下限（含）"),
+    max_score: Optional[float] = Query(default=None, description="综合得分上限（含）"),
+    db: Session = Depends(get_db),
+):
+    """
+    分页获取焊接记录, 按时间倒序排列
+
+    首次请求不带 cursor, 之后以上一页返回的 next_cursor 请求下一页, has_more 为 false 时已到末页。
+    支持按时间范围与综合得分范围过滤。
+    """
+    return query_history_page(
+        db,
+        cursor=cursor,
+        limit=limit,
+        start_time=start_time,
+        end_time=end_time,
+        min_score=min_score,
+        max_score=max_score,
+    )
+
+def _utc_naive(value: datetime) -> datetime:
+    """转换为与库中 timestamp 一致的无时区 UTC 时间（无时区的输入视为 UTC）"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _align_range(granularity: str, start_time: datetime, end_time: datetime):
+    """将时间范围对齐到整桶: 返回 [起始桶起点, 结束桶终点), 周桶以周一为起点"""
+    if granularity == "hour":
+        range_start = start_time.replace(minute=0, second=0, microsecond=0)
+        range_end = end_time.replace(minute=0, second=0, microsecond=0)
+    else:
+        range_start = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        range_end = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        range_start -= timedelta(days=range_start.weekday())
+        range_end -= timedelta(days=range_end.weekday())
+    return range_start, range_end + AGGREGATE_BUCKET_SPAN[granularity]
+
+def _bucket_label(value, granularity: str) -> str:
+    """统一桶起点的展示格式: 小时桶为 'YYYY-MM-DD HH:00:00', 天/周桶为 'YYYY-MM-DD'"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if granularity == "hour":
+        return value.strftime("%Y-%m-%d %H:00:00")
+    return value.strftime("%Y-%m-%d")
+
+def _week_expr(day_column, dialect_name: str):
+    """天桶所在周的起始日期（周一）"""
+    if dialect_name == "sqlite":
+        return func.date(day_column, "-6 days", "weekday 1")
+    return func.date_trunc("week", day_column)
+
+def _bucket_expr(granularity: str, dialect_name: str):
+    """原始记录的时间桶表达式: 返回桶起始时间（周以周一为起点）"""
+    timestamp = models.WeldingRecord.timestamp
+    if dialect_name == "sqlite":
+        if granularity == "hour":
+            return func.strftime("%Y-%m-%d %H:00:00", timestamp)
+        if granularity == "week":
+            return _week_expr(timestamp, dialect_name)
+        return func.date(timestamp)
+    return func.date_trunc(granularity, timestamp)
+
+def query_rollup_summaries(db: Session, granularity: str, range_start: datetime, range_end: datetime):
+    """
+    从汇总表读取各桶各维度的 count、sum、sum_sq、min、max
+
+    小时/天直接读取对应粒度的汇总行, 周由天汇总再按周分组合并。
+    读取的行数只与桶数有关, 与原始记录数无关。
+    """
+    rollup = models.ScoreRollup
+    source_granularity = "hour" if granularity == "hour" else "day"
+    if granularity == "week":
+        bucket = _week_expr(rollup.bucket_start, db.get_bind().dialect.name)
+    else:
+        bucket = rollup.bucket_start
+    bucket = bucket.label("bucket")
+
+    query = (
+        select(
+            bucket,
+            rollup.dimension,
+            func.sum(rollup.count).label("count"),
+            func.sum(rollup.sum).label("sum"),
+            func.sum(rollup.sum_sq).label("sum_sq"),
+            func.min(rollup.min).label("min"),
+            func.max(rollup.max).label("max"),
+        )
+        .where(
+            rollup.granularity == source_granularity,
+            rollup.bucket_start >= range_start,
+            rollup.bucket_start < range_end,
+        )
+        .group_by(bucket, rollup.dimension)
+    )
+    return db.execute(query).mappings().all()
+
+def query_raw_percentiles(db: Session, granularity: str, range_start: datetime, range_end: datetime):
+    """
+    在原始记录上按桶计算各维度的分位数
+
+    分位数无法由汇总值合并得到, 仍需扫描范围内的原始记录。
+    采用最近秩法: 桶内升序排名 rn 满足 rn >= p × count 的最小值。
+    """
+    record = models.WeldingRecord
+    bucket = _bucket_expr(granularity, db.get_bind().dialect.name).label("bucket")
+    in_range = and_(record.timestamp >= range_start, record.timestamp < range_end)
+
+    percentile_rows: Dict[str, Dict[str, dict]] = {}
+    for name in SCORE_COLUMNS:
+        column = getattr(record, name)
+        ranked = (
+            select(
+                bucket,
+                column.label("value"),
+                func.row_number().over(partition_by=bucket, order_by=column).label("rn"),
+                func.count().over(partition_by=bucket).label("cnt"),
+            )
+            .where(in_range, column.is_not(None))
+            .subquery()
+        )
+        percentile_columns = [
+            func.min(case((ranked.c.rn >= fraction * ranked.c.cnt, ranked.c.value))).label(label)
+            for label, fraction in PERCENTILES.items()
+        ]
+        for row in db.execute(select(ranked.c.bucket, *percentile_columns).group_by(ranked.c.bucket)).mappings():
+            percentile_rows.setdefault(_bucket_label(row["bucket"], granularity), {})[name] = row
+    return percentile_rows
+
+def query_aggregates(
+    db: Session,
+    granularity: str = "day",
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    percentiles: bool = True,
+) -> AggregatesResponse:
+    """
+    按小时/天/周分桶返回各评分维度的均值、标准差与最值
+
+    统计量由汇总表 welding_score_rollups 合并得到, 查询代价只与桶数有关。
+    时间范围按整桶对齐: 起止时间所在的桶均完整计入。
+    percentiles 为 True 时额外在原始记录上计算 p50、p90。
+    时间均按无时区的 UTC 处理（与库中记录的 timestamp 一致）。
+    """
+    end_time = _utc_naive(end_time) if end_time else datetime.now(timezone.utc).replace(tzinfo=None)
+    start_time = _utc_naive(start_time) if start_time else end_time - AGGREGATE_DEFAULT_WINDOW[granularity]
+    range_start, range_end = _align_range(granularity, start_time, end_time)
+
+    summaries: Dict[str, Dict[str, dict]] = {}
+    for row in query_rollup_summaries(db, granularity, range_start, range_end):
+        summaries.setdefault(_bucket_label(row["bucket"], granularity), {})[row["dimension"]] = row
+    percentile_rows = query_raw_percentiles(db, granularity, range_start, range_end) if percentiles else {}
+
+    buckets = []
+    for label in sorted(summaries):
+        scores = {}
+        for name in SCORE_COLUMNS:
+            row = summaries[label].get(name)
+            if row is None or not row["count"]:
+                continue
+            quantiles = percentile_rows.get(label, {}).get(name, {})
+            scores[name] = ScoreSummary(
+                **summarize_rollup(row["count"], row["sum"], row["sum_sq"], row["min"], row["max"]),
+                **{key: quantiles[key] for key in PERCENTILES if key in quantiles},
+            )
+        count = max(row["count"] for row in summaries[label].values())
+        buckets.append(AggregateBucket(bucket_start=label, count=count, scores=scores))
+
+    return AggregatesResponse(
+        granularity=granularity,
+        start_time=start_time,
+        end_time=end_time,
+        buckets=buckets,
+    )
+
+@router.get("/dashboard/aggregates", response_model=AggregatesResponse)
+def get_welding_aggregates(
+    granularity: Literal["hour", "day", "week"] = Query(default="day", description="分桶粒度: hour、day 或 week"),
+    start_time: Optional[datetime] = Query(default=None, description="起始时间（含）, 默认按粒度取最近 7 天、90 天或 52 周"),
+    end_time: Optional[datetime] = Query(default=None, description="结束时间（含）, 默认当前 UTC 时间"),
+    percentiles: bool = Query(default=True, description="是否在原始记录上额外计算 p50、p90, 为 false 时只读取汇总表"),
+    db: Session = Depends(get_db),
+):
+    """
+    按小时/天/周分桶返回各评分维度的均值、标准差、最小值、最大值及记录数
+
+    统计读取增量维护的汇总表, 响应大小与查询代价只与桶数有关;
+    分位数（默认计算）需扫描范围内的原始记录, percentiles=false 时跳过。
     """
-    records = db.query(models.WeldingRecord).order_by(models.WeldingRecord.timestamp.desc()).all()
-    return records
+    start_time = _utc_naive(start_time) if start_time else None
+    end_time = _utc_naive(end_time) if end_time else None
+    if start_time and end_time and start_time > end_time:
+        raise HTTPException(status_code=400, detail="起始时间不能晚于结束时间")
+    return query_aggregates(
+        db, granularity=granularity, start_time=start_time, end_time=end_time, percentiles=percentiles
+    )
@@ -1,16 +1,39 @@
-import shutil
-from fastapi import APIRouter, File, UploadFile, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import random
-import numpy as np
-import time
-import hashlib
+from typing import Dict, List, Optional
+import asyncio
+import json
+import os
+import sys
 
 from database import SessionLocal
 import models
+from rollups import update_rollups
+from forecasting.online import update_online_states
+from forecasting.snapshots import get_snapshot_scheduler
+from analysis.backends import DetectionInput, get_model_pool, run_inference
+from analysis.cache import get_result_cache
+from analysis.ingest import (
+    BATCH_UPLOAD_OPENAPI_EXTRA,
+    UPLOAD_OPENAPI_EXTRA,
+    IngestedUpload,
+    ingest_upload,
+    ingest_uploads,
+)
+from analysis.pool import PoolSaturatedError, get_detection_executor
+from analysis.scheduler import get_microbatch_scheduler
+from analysis.scoring import results_to_matrix, score_rows
+from singleflight import get_singleflight
 
 router = APIRouter()
 
+# 批量检测单次最多接收的文件数
+BATCH_MAX_FILES = int(os.getenv("DETECT_BATCH_MAX_FILES", "100"))
+# 批量检测时单次提交到执行池的最大图片数
+BATCH_CHUNK_SIZE = int(os.getenv("DETECT_BATCH_CHUNK_SIZE", "16"))
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
@@ -19,68 +42,285 @@ def get_db():
     finally:
         db.close()
 
-def _analyze_image_features(file_path: str):
-    """基于文件特征生成评分的内部函数"""
-    with open(file_path, 'rb') as f:
-        file_hash = hashlib.md5(f.read()).hexdigest()
-    
-    seed = int(file_hash[:8], 16) % 2**32
-    np.random.seed(seed)
-    
-    base_scores = np.random.normal(85, 8, 4) 
-    
-    adjustment_factor = np.random.uniform(0.9, 1.1)
-    
-    scores = {
-        'speed': max(70, min(99, base_scores[0] * adjustment_factor)),
-        'angle': max(70, min(99, base_scores[1] * adjustment_factor)),
-        'depth': max(70, min(99, base_scores[2] * adjustment_factor)),
-        'defect': max(70, min(99, base_scores[3] * adjustment_factor))
-    }
-    
-    time.sleep(random.uniform(0.5, 1.2))
-    
-    return scores
+def _to_detection_input(upload: IngestedUpload) -> DetectionInput:
+    return DetectionInput(digest=upload.digest, data=upload.data, path=upload.spool_path)
+
+def _round_scores(analysis_results: Dict[str, float]) -> Dict[str, float]:
+    """将分析结果取两位小数并计算综合得分"""
+    return score_rows(results_to_matrix([analysis_results]))[0]
+
+def _record_student_id(student_id: Optional[str]) -> Optional[str]:
+    """写入记录的 student_id: 未标注学员以 NULL 存储, 显式传入的 "default" 同样按未标注处理"""
+    return None if student_id == models.DEFAULT_STUDENT_ID else student_id
+
+def _append_features(db: Session, record_ids: List[int]):
+    """
+    把已提交的新记录追加到特征库中已缓存学员的特征上, 下次预测无需重新对齐历史
+
+    特征库（连同 pandas）在首次随机森林预测时才加载, 此前没有可追加的学员, 直接跳过。
+    """
+    features = sys.modules.get("forecasting.features")
+    if features is None or not features.get_feature_store().enabled:
+        return
+    from forecasting.history import load_records_frame
+
+    store = features.get_feature_store()
+    try:
+        store.append_records(load_records_frame(db, record_ids))
+    except Exception:
+        # 追加失败时丢弃全部缓存的特征, 下次预测时重建
+        store.invalidate()
+
+def _save_record(db: Session, scores: Dict[str, float], student_id: Optional[str] = None):
+    """
+    写入检测记录并在同一事务中更新评分汇总表与在线预测状态, 提交后将该学员的预测快照标记为待刷新
+    （同步阻塞，需在线程池中调用）
+    """
+    student_id = _record_student_id(student_id)
+    db_record = models.WeldingRecord(**scores, student_id=student_id)
+    try:
+        db.add(db_record)
+        db.flush()
+        update_rollups(db, [db_record.id])
+        update_online_states(db, [db_record.id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    get_snapshot_scheduler().mark_dirty([student_id])
+    _append_features(db, [db_record.id])
+    db.refresh(db_record)
+    return db_record
 
-@router.post("/detect")
-async def detect_welding(file: UploadFile = File(...), db: Session = Depends(get_db)):
+def _save_records_bulk(score_rows: List[Dict[str, float]], student_id: Optional[str] = None) -> List[int]:
+    """在单个事务中批量写入检测记录, 返回按顺序排列的记录ID（同步阻塞，需在线程池中调用）"""
+    student_id = _record_student_id(student_id)
+    db = SessionLocal()
+    try:
+        db_records = [models.WeldingRecord(**scores, student_id=student_id) for scores in score_rows]
+        db.add_all(db_records)
+        db.flush()
+        record_ids = [db_record.id for db_record in db_records]
+        update_rollups(db, record_ids)
+        update_online_states(db, record_ids)
+        db.commit()
+        get_snapshot_scheduler().mark_dirty([student_id])
+        _append_features(db, record_ids)
+        return record_ids
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def _run_cache_io(cache, fn, *args):
+    """启用磁盘缓存时在线程池中访问缓存, 纯内存缓存直接调用"""
+    if cache.db_path:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+async def _infer_and_store(detection_input: DetectionInput):
+    """
+    推理单张图片并写入结果缓存（启用微批调度时与其他并发请求聚合为一次批量推理）,
+    完成后删除其暂存文件（如有）
+    """
+    try:
+        scheduler = get_microbatch_scheduler()
+        if scheduler.enabled:
+            analysis_results, inference = await scheduler.submit(detection_input)
+        else:
+            results, inference = await get_detection_executor().submit(run_inference, [detection_input])
+            analysis_results = results[0]
+        cache = get_result_cache()
+        await _run_cache_io(cache, cache.put, detection_input.digest, analysis_results)
+        return analysis_results, inference
+    finally:
+        if detection_input.path and os.path.exists(detection_input.path):
+            os.remove(detection_input.path)
+
+async def _analyze_upload(upload: IngestedUpload):
+    """
+    优先查询结果缓存, 未命中时才提交到检测执行池推理;
+    同一图片（内容摘要相同）的并发请求只推理一次, 共享同一结果
+
+    返回：
+    - (分析结果, 缓存命中层级, 推理信息), 命中缓存时推理信息为 None
+    """
+    cache = get_result_cache()
+    analysis_results, cache_tier = await _run_cache_io(cache, cache.get, upload.digest)
+    inference = None
+    if analysis_results is None:
+        def start():
+            # 暂存文件交由推理任务删除: 发起请求断开时推理仍会完成, 供其他等待的请求使用
+            detection_input = _to_detection_input(upload)
+            upload.spool_path = None
+            return _infer_and_store(detection_input)
+
+        (analysis_results, inference), _ = await get_singleflight("detect").do(upload.digest, start)
+    return analysis_results, cache_tier, inference
+
+@router.post("/detect", openapi_extra=UPLOAD_OPENAPI_EXTRA)
+async def detect_welding(
+    request: Request,
+    student_id: Optional[str] = Query(default=None, max_length=64, description="学员/工位标识"),
+    db: Session = Depends(get_db),
+):
     """
     接收焊接图片, 进行AI检测分析, 生成评分并存入数据库
+
+    上传内容以流式分块接收, 在接收每个分块时于事件循环中增量计算 MD5 摘要, 默认不落盘;
+    相同摘要的图片直接返回缓存的评分, 响应中的 cached 字段标明评分是否来自缓存;
+    推理在检测执行池中运行, 数据库写入在线程池中运行, 均不阻塞事件循环。
+    执行池饱和且排队超时时返回 429。响应中的 inference 字段给出推理后端、批大小、
+    推理耗时与模型加载耗时（命中缓存时为 null）。
+    可通过查询参数 student_id 标明所属学员/工位, 用于按学员预测。
     """
-    temp_file_path = f"temp_{file.filename}"
-    with open(temp_file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # 执行图像分析
-    analysis_results = _analyze_image_features(temp_file_path)
-    
-    speed_score = round(analysis_results['speed'], 2)
-    angle_score = round(analysis_results['angle'], 2)
-    depth_score = round(analysis_results['depth'], 2)
-    defect_score = round(analysis_results['defect'], 2)
-    total_score = round((speed_score + angle_score + depth_score + defect_score) / 4, 2)
+    upload = await ingest_upload(request, keep_data=get_model_pool().needs_image)
+
+    try:
+        analysis_results, cache_tier, inference = await _analyze_upload(upload)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    finally:
+        upload.cleanup()
+
+    scores = _round_scores(analysis_results)
 
     # 创建数据库记录
-    db_record = models.WeldingRecord(
-        speed_score=speed_score,
-        angle_score=angle_score,
-        depth_score=depth_score,
-        defect_score=defect_score,
-        total_score=total_score,
-    )
-    db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
+    db_record = await run_in_threadpool(_save_record, db, scores, student_id)
 
     return {
-        "filename": file.filename,
+        "filename": upload.filename,
         "detection_result": "AI analysis completed successfully",
-        "scores": {
-            "speed_score": speed_score,
-            "angle_score": angle_score,
-            "depth_score": depth_score,
-            "defect_score": defect_score,
-            "total_score": total_score,
-        },
-        "db_record_id": db_record.id
-    }
\ No newline at end of file
+        "scores": scores,
+        "db_record_id": db_record.id,
+        "cached": cache_tier is not None,
+        "cache_tier": cache_tier,
+        "inference": inference,
+    }
+
+def _ndjson_line(payload: dict) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+@router.post("/detect/batch", openapi_extra=BATCH_UPLOAD_OPENAPI_EXTRA)
+async def detect_welding_batch(
+    request: Request,
+    student_id: Optional[str] = Query(default=None, max_length=64, description="学员/工位标识"),
+):
+    """
+    批量检测: 一次上传多张焊接图片（multipart 字段名 files）
+
+    缓存命中的图片立即返回; 其余图片去重后分块, 每块在检测执行池中作为一次批量推理
+    （单次前向计算）并发执行, 每完成一块即以 NDJSON 流式返回其中每张图片的一行结果 (type=item),
+    单张失败只影响对应的行 (status=error)。全部完成后, 所有成功的记录
+    在同一事务中批量写入数据库, 最后返回一行汇总 (type=summary), 其中
+    record_ids 按 index 给出每张图片对应的记录ID（失败项为 null）。
+    """
+    uploads = await ingest_uploads(
+        request, field_name="files", max_files=BATCH_MAX_FILES, keep_data=get_model_pool().needs_image
+    )
+
+    cache = get_result_cache()
+    executor = get_detection_executor()
+
+    async def analyze_chunk(chunk: List[IngestedUpload]):
+        digests = [upload.digest for upload in chunk]
+        try:
+            results, inference = await executor.submit(run_inference, [_to_detection_input(u) for u in chunk])
+            for digest, analysis_results in zip(digests, results):
+                await _run_cache_io(cache, cache.put, digest, analysis_results)
+            return digests, results, inference, None
+        except Exception as e:
+            return digests, None, None, e
+        finally:
+            for upload in chunk:
+                upload.cleanup()
+
+    async def stream_results():
+        succeeded: Dict[int, Dict[str, float]] = {}
+        tasks = []
+
+        def item_line(index: int, scores=None, cache_tier=None, error=None, inference=None):
+            item = {"type": "item", "index": index, "filename": uploads[index].filename}
+            if error is None:
+                succeeded[index] = scores
+                item.update(status="ok", scores=scores, cached=cache_tier is not None, cache_tier=cache_tier,
+                            inference=inference)
+            else:
+                item.update(status="error", error=str(error) or type(error).__name__)
+            return _ndjson_line(item)
+
+        try:
+            # 先查询缓存, 命中项立即返回; 未命中的摘要去重后分块, 每块作为一次批量评分提交到执行池
+            pending: Dict[str, List[int]] = {}
+            misses: List[IngestedUpload] = []
+            for index, upload in enumerate(uploads):
+                try:
+                    analysis_results, cache_tier = await _run_cache_io(cache, cache.get, upload.digest)
+                except Exception as e:
+                    upload.cleanup()
+                    yield item_line(index, error=e)
+                    continue
+                if analysis_results is None:
+                    if upload.digest not in pending:
+                        misses.append(upload)
+                    else:
+                        upload.cleanup()
+                    pending.setdefault(upload.digest, []).append(index)
+                else:
+                    upload.cleanup()
+                    yield item_line(index, _round_scores(analysis_results), cache_tier)
+
+            chunk_size = max(1, min(BATCH_CHUNK_SIZE, -(-len(misses) // executor.workers)))
+            tasks = [
+                asyncio.create_task(analyze_chunk(misses[i:i + chunk_size]))
+                for i in range(0, len(misses), chunk_size)
+            ]
+            for finished in asyncio.as_completed(tasks):
+                chunk_digests, results, inference, error = await finished
+                if error is None:
+                    rows = score_rows(results_to_matrix(results))
+                for k, digest in enumerate(chunk_digests):
+                    for index in pending[digest]:
+                        if error is None:
+                            yield item_line(index, rows[k], inference=inference)
+                        else:
+                            yield item_line(index, error=error)
+
+            record_ids: List = [None] * len(uploads)
+            summary = {"type": "summary", "total": len(uploads), "succeeded": len(succeeded),
+                       "failed": len(uploads) - len(succeeded)}
+            if succeeded:
+                indexes = sorted(succeeded)
+                try:
+                    ids = await run_in_threadpool(_save_records_bulk, [succeeded[i] for i in indexes], student_id)
+                    for index, record_id in zip(indexes, ids):
+                        record_ids[index] = record_id
+                except Exception as e:
+                    summary["db_error"] = str(e)
+            summary["record_ids"] = record_ids
+            yield _ndjson_line(summary)
+        finally:
+            # 客户端中途断开时取消尚未完成的分析, 并释放所有上传内容
+            for task in tasks:
+                task.cancel()
+            for upload in uploads:
+                upload.cleanup()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.get("/detect/stats")
+async def get_detection_stats():
+    """
+    获取检测执行池、微批调度器、模型池、结果缓存与并发请求合并的运行指标
+
+    进程模式下模型实例位于各工作进程中, 此处的模型池指标仅反映主进程;
+    每次推理的耗时与批大小见 /detect 响应中的 inference 字段。
+    """
+    return {
+        "executor": get_detection_executor().stats(),
+        "scheduler": get_microbatch_scheduler().stats(),
+        "model": get_model_pool().stats(),
+        "cache": get_result_cache().stats(),
+        "singleflight": get_singleflight("detect").stats(),
+    }
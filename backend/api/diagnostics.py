@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+
+from singleflight import singleflight_stats
+from startup import get_startup_profile
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/startup")
+async def get_startup_diagnostics():
+    """
+    启动过程诊断
+
+    Returns:
+        启动模式、服务就绪耗时、后台预热状态、延迟导入的模块是否已加载，
+        以及启动与预热阶段各模块的导入耗时（按耗时从高到低排序）
+    """
+    return get_startup_profile().snapshot()
+
+
+@router.get("/diagnostics/singleflight")
+async def get_singleflight_diagnostics():
+    """
+    并发相同请求的合并指标
+
+    Returns:
+        各分组（predict、detect）的调用数、实际执行数、被合并的调用数、合并率与单次计算的最大等待数
+    """
+    return singleflight_stats()
@@ -1,16 +1,36 @@
+import base64
 from datetime import datetime
 import logging
 import os
-import sys
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, List, Literal, Optional, Tuple
+import asyncio
+import zlib
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 
-# 添加项目根目录到路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-backend_dir = os.path.dirname(current_dir)
-sys.path.insert(0, backend_dir)
+# 模块级只导入轻量依赖; pandas、scikit-learn（prediction）、matplotlib（charts.engine）
+# 在首次使用时导入, 或由启动预热提前导入（见 startup.py）
+from charts.cache import get_chart_cache
+from charts.renderer import get_chart_renderer
+from charts.specs import defect_radar_spec, generate_sample_data, prediction_chart_spec, skill_radar_spec
+from charts.style import ChartStyle
+from database import SessionLocal
+from forecasting.online import (
+    compare_modes,
+    default_forecast_mode,
+    get_online_forecaster,
+    load_online_state,
+    predict_online,
+)
+from forecasting.snapshots import get_snapshot_scheduler
+from models import DEFAULT_STUDENT_ID
+from singleflight import get_singleflight, singleflight_stats
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 # 设置日志
@@ -19,6 +39,222 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 同一时间只运行一个批量预测任务
+_batch_lock = asyncio.Lock()
+
+# Dependency to get the database session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _load_forecast_history(db: Session, student_id: Optional[str]) -> Tuple["pd.DataFrame", str]:
+    """
+    读取学员的焊接历史（单次批量查询）
+
+    未指定学员时读取未标注学员的记录; 数据库中尚无任何记录时回退到模拟数据集,
+    指定的学员没有记录时返回 404。
+
+    返回：
+    - (历史数据框, 数据来源 "records" 或 "synthetic")
+    """
+    from forecasting.history import load_student_history
+
+    history = load_student_history(db, student_id or DEFAULT_STUDENT_ID)
+    if not history.empty:
+        return history, "records"
+    if student_id is not None:
+        raise HTTPException(status_code=404, detail=f"学员 {student_id} 暂无焊接记录")
+    from data_generator import generate_dataset
+    return generate_dataset(), "synthetic"
+
+def _forecast_online(
+    db: Session,
+    history: "pd.DataFrame",
+    source: str,
+    student_id: Optional[str],
+    days: int,
+    extra: Optional["pd.DataFrame"] = None,
+):
+    """
+    在线模式预测: 读取 /detect 增量维护的学员状态直接外推, 请求路径上不做拟合
+
+    历史来自数据库时按主键读取状态, 再吸收请求中附加的记录（extra）;
+    没有已维护的状态时（模拟数据、仅自定义记录）由历史重放得到。
+    """
+    state = None
+    if source.startswith("records"):
+        state = load_online_state(db, student_id or DEFAULT_STUDENT_ID)
+        if state is not None and extra is not None and not extra.empty:
+            state = get_online_forecaster().replay(extra, state)
+    return predict_online(history, days=days, state=state)
+
+def _forecast_rf(history: "pd.DataFrame", source: str, student_id: Optional[str], days: int):
+    """
+    随机森林预测: 历史来自数据库时从特征库取已物化的特征切片, 只为新增记录计算特征
+    """
+    from forecasting.features import get_feature_store
+    from prediction import predict_future_scores
+
+    feature_rows = None
+    if source == "records":
+        feature_rows = get_feature_store().features_for(student_id or DEFAULT_STUDENT_ID, history)
+    return predict_future_scores(history, days=days, feature_rows=feature_rows)
+
+def _snapshot_forecast(db: Session, student_id: Optional[str], refresh: bool = False):
+    """
+    读取学员最新的随机森林预测快照（单次索引查询, 请求路径上不做拟合）
+
+    refresh 为 True 或学员还没有可用快照时, 先同步为该学员重新预测并写入快照;
+    指定的学员没有记录时返回 404。（同步阻塞，需在线程池中调用）
+
+    返回：
+    - ({history, forecast}, 数据来源 "records" 或 "synthetic", 快照时效信息)
+    """
+    scheduler = get_snapshot_scheduler()
+    snapshot = None if refresh else scheduler.latest(db, student_id or DEFAULT_STUDENT_ID)
+    refreshed = snapshot is None
+    if snapshot is None:
+        summary = scheduler.refresh([student_id or DEFAULT_STUDENT_ID], on_demand=True)
+        error = summary["errors"].get(student_id or DEFAULT_STUDENT_ID)
+        if error is not None:
+            raise ValueError(error)
+        snapshot = scheduler.latest(db, student_id or DEFAULT_STUDENT_ID)
+        if snapshot is None:
+            if student_id is not None:
+                raise HTTPException(status_code=404, detail=f"学员 {student_id} 暂无焊接记录")
+            raise RuntimeError("预测快照生成失败")
+    prediction_result = {"history": snapshot.history, "forecast": snapshot.forecast}
+    return prediction_result, snapshot.source or "records", scheduler.describe(snapshot, refreshed=refreshed)
+
+def _use_snapshot(mode: str, days: int = 5) -> bool:
+    """随机森林模式且启用了预测快照、预测天数与快照一致时读取快照"""
+    scheduler = get_snapshot_scheduler()
+    return mode == "rf" and scheduler.enabled and days == scheduler.days
+
+def chart_style_params(
+    chart_format: Literal["png", "webp", "svg", "data"] = Query(
+        default="png", alias="format", description="图片格式: png、webp、svg; data 表示只返回图表数据, 由前端绘制"
+    ),
+    dpi: int = Query(default=100, ge=50, le=300, description="每英寸像素数"),
+    width: Optional[int] = Query(default=None, ge=200, le=4000, description="图片宽度（像素），高度按各图表的宽高比计算; 默认使用图表的默认尺寸"),
+    compress_level: int = Query(default=6, ge=0, le=9, description="PNG 压缩等级，越大文件越小、编码越慢"),
+) -> Optional[ChartStyle]:
+    """图表输出样式的查询参数, format=data 时返回 None"""
+    if chart_format == "data":
+        return None
+    return ChartStyle(format=chart_format, dpi=dpi, width=width, compress_level=compress_level)
+
+async def _chart_images(
+    prediction_result: Dict[str, Any],
+    defect_data: Dict[str, float],
+    skill_data: Dict[str, float],
+    style: ChartStyle,
+):
+    """
+    按输出样式生成三张图表: 在渲染进程池中并发渲染, 输入数据与样式不变时直接从图表缓存读取
+
+    返回：
+    - {图表名: (图片文件名, 图片内容)}
+    """
+    return await get_chart_renderer().render_many(
+        {
+            "line_chart": (prediction_result['history'], prediction_result['forecast']),
+            "defect_radar": (defect_data,),
+            "skill_radar": (skill_data,),
+        },
+        style=style,
+    )
+
+def _chart_specs(
+    prediction_result: Dict[str, Any],
+    defect_data: Dict[str, float],
+    skill_data: Dict[str, float],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    format=data 时的图表数据: 与绘图相同的输入整理为紧凑的数组, 由前端绘制, 不调用 matplotlib
+    """
+    return {
+        "line_chart": prediction_chart_spec(prediction_result['history'], prediction_result['forecast']),
+        "defect_radar": defect_radar_spec(defect_data),
+        "skill_radar": skill_radar_spec(skill_data),
+    }
+
+def _sample_seed(student_id: Optional[str]) -> int:
+    """雷达图示例数据的随机种子（由学员标识确定）"""
+    return zlib.crc32((student_id or DEFAULT_STUDENT_ID).encode("utf-8"))
+
+async def _predict_with_charts(
+    student_id: Optional[str],
+    mode: str,
+    refresh: bool,
+    style: Optional[ChartStyle],
+) -> Dict[str, Any]:
+    """
+    预测并生成三张图表（/predict 与 /predict/charts-only 共用, 相同参数的并发请求只执行一次）
+
+    使用独立的数据库会话: 发起计算的请求断开后计算仍会完成, 供其他等待的请求使用。
+
+    返回：
+    - {prediction, source, snapshot, images（style 为 None 时为 chart_data）}
+    """
+    db = SessionLocal()
+    try:
+        snapshot = None
+        if _use_snapshot(mode):
+            # 步骤1-2: 读取预测快照
+            logger.info("步骤1-2: 读取预测快照...")
+            prediction_result, source, snapshot = await run_in_threadpool(
+                _snapshot_forecast, db, student_id, refresh
+            )
+            logger.info(f"快照 {snapshot['id']}（来源: {source}，已生成 {snapshot['age_seconds']} 秒，过期: {snapshot['stale']}）")
+        else:
+            # 步骤1: 读取历史数据
+            logger.info("步骤1: 读取历史数据...")
+            historical_data, source = await run_in_threadpool(_load_forecast_history, db, student_id)
+            logger.info(f"读取了 {len(historical_data)} 条历史数据（来源: {source}）")
+            
+            # 步骤2: 预测未来得分
+            logger.info(f"步骤2: 执行预测算法（模式: {mode}）...")
+            if mode == "online":
+                prediction_result = await run_in_threadpool(
+                    _forecast_online, db, historical_data, source, student_id, 5
+                )
+            else:
+                # 随机森林训练与预测占用 CPU, 在线程池中执行, 不阻塞事件循环
+                prediction_result = await run_in_threadpool(
+                    _forecast_rf, historical_data, source, student_id, 5
+                )
+    finally:
+        db.close()
+    logger.info(f"预测完成，历史数据点: {len(prediction_result['history'])}, 预测数据点: {len(prediction_result['forecast'])}")
+    
+    # 步骤3-5: 生成预测趋势图、缺陷分析雷达图与操作手法雷达图（输入不变时直接读取图表缓存）
+    # 生成示例缺陷数据与手法数据（在实际应用中，这些数据应该来自检测系统与操作评估系统）
+    # 以学员标识为种子: 同一学员的雷达图不变, 命中图表缓存, 不会每次请求都渲染并写入新图片
+    defect_data, skill_data = generate_sample_data(seed=_sample_seed(student_id))
+    result = {"prediction": prediction_result, "source": source, "snapshot": snapshot}
+    if style is None:
+        result["chart_data"] = _chart_specs(prediction_result, defect_data, skill_data)
+    else:
+        logger.info("步骤3: 生成图表...")
+        result["images"] = await _chart_images(prediction_result, defect_data, skill_data, style)
+        logger.info(f"图表生成完成，图片大小: { {name: len(data) for name, (_, data) in result['images'].items()} }")
+    return result
+
+def _chart_fields(request: Request, images: Dict[str, Tuple[str, bytes]], embed: bool) -> Dict[str, Any]:
+    """图表的返回字段: base64 图片（embed 为 False 时为空字符串）与 charts 中的 /charts/{hash}.{格式} 地址"""
+    fields: Dict[str, Any] = {
+        name: base64.b64encode(data).decode('utf-8') if embed else ""
+        for name, (_, data) in images.items()
+    }
+    fields["charts"] = {
+        name: str(request.url_for("get_chart", filename=filename)) for name, (filename, _) in images.items()
+    }
+    return fields
+
 # Pydantic 模型定义
 class PredictionResponse(BaseModel):
     """预测接口返回模型"""
@@ -27,6 +263,13 @@ class PredictionResponse(BaseModel):
     line_chart: str
     defect_radar: str
     skill_radar: str
+    charts: Dict[str, str] = {}
+    chart_data: Optional[Dict[str, Dict[str, Any]]] = None
+    chart_format: str = "png"
+    student_id: str = DEFAULT_STUDENT_ID
+    source: str = "records"
+    mode: str = "rf"
+    snapshot: Optional[Dict[str, Any]] = None
 
 class PredictionStats(BaseModel):
     """预测统计信息模型"""
@@ -36,85 +279,75 @@ class PredictionStats(BaseModel):
     last_updated: str
 
 @router.get("/predict", response_model=PredictionResponse)
-async def get_prediction():
+async def get_prediction(
+    request: Request,
+    student_id: Optional[str] = Query(default=None, description="学员/工位标识, 默认为未标注学员的记录"),
+    mode: Optional[Literal["rf", "online"]] = Query(default=None, description="预测模式: rf 或 online, 默认由 FORECAST_MODE 决定"),
+    embed: bool = Query(default=True, description="是否内嵌base64图片; 为 false 时图片字段为空, 通过 charts 中的地址获取"),
+    refresh: bool = Query(default=False, description="随机森林模式下是否先同步刷新该学员的预测快照"),
+    style: Optional[ChartStyle] = Depends(chart_style_params),
+):
     """
     获取焊缝质量预测数据和可视化图表
     
     调用顺序：
-    1. generate_dataset() - 生成30条历史模拟数据
-    2. predict_future_scores() - 预测未来5天得分
-    3. plot_prediction_chart() - 生成预测趋势图
-    4. plot_defect_radar() - 生成缺陷分析雷达图
-    5. plot_skill_radar() - 生成操作手法雷达图
-    
+    1-2. 随机森林模式：读取该学员最新的预测快照（由后台调度定期及有新记录时生成，
+       snapshot 中给出生成时间与是否过期；refresh=true 时先同步刷新）；
+       在线模式或未启用快照时：load_student_history() 读取历史记录（无记录时使用模拟数据），
+       再预测未来5天得分
+    3. render_prediction_chart() - 生成预测趋势图
+    4. render_defect_radar() - 生成缺陷分析雷达图
+    5. render_skill_radar() - 生成操作手法雷达图
+    （三张图表在渲染进程池中并发渲染，等待期间不阻塞其他请求；
+    图表的格式、dpi、宽度与 PNG 压缩等级由查询参数 format、dpi、width、compress_level 控制；
+    图表按内容哈希缓存，输入不变时不重新渲染，也可通过 charts 中的 /charts/{hash}.{格式} 地址获取；
+    format=data 时不渲染图片，chart_data 中返回各图表的数据，由前端绘制）
+    学员、模式、refresh 与图表样式相同的并发请求合并为一次计算，共享同一结果（见 singleflight.py）
+
     Returns:
-        PredictionResponse: 包含历史数据、预测数据和所有图表的base64字符串
+        PredictionResponse: 包含历史数据、预测数据、所有图表的base64字符串与图片地址
     """
     try:
         logger.info("开始执行预测流程...")
         
-        # 动态导入模块（如果之前导入失败）
-        import importlib
-        try:
-            data_gen = importlib.import_module('data_generator')
-            prediction_mod = importlib.import_module('prediction')
-            line_chart_mod = importlib.import_module('charts.line_chart')
-            radar_chart_mod = importlib.import_module('charts.radar_chart')
-            
-            generate_dataset = data_gen.generate_dataset
-            predict_future_scores = prediction_mod.predict_future_scores
-            plot_prediction_chart = line_chart_mod.plot_prediction_chart
-            plot_defect_radar = radar_chart_mod.plot_defect_radar
-            plot_skill_radar = radar_chart_mod.plot_skill_radar
-            generate_sample_data = radar_chart_mod.generate_sample_data
-        except ImportError as e:
-            logger.error(f"导入模块失败: {e}")
-            raise HTTPException(status_code=500, detail=f"服务器配置错误: {e}")
-        
-        # 步骤1: 生成历史数据集
-        logger.info("步骤1: 生成历史数据集...")
-        historical_data = generate_dataset()
-        logger.info(f"生成了 {len(historical_data)} 条历史数据")
-        
-        # 步骤2: 预测未来得分
-        logger.info("步骤2: 执行预测算法...")
-        prediction_result = predict_future_scores(historical_data, days=5)
-        logger.info(f"预测完成，历史数据点: {len(prediction_result['history'])}, 预测数据点: {len(prediction_result['forecast'])}")
-        
-        # 步骤3: 生成预测趋势线性图
-        logger.info("步骤3: 生成预测趋势图...")
-        line_chart_base64 = plot_prediction_chart(
-            prediction_result['history'], 
-            prediction_result['forecast']
+        mode = mode or default_forecast_mode()
+        # 步骤1-5: 预测并生成图表（相同参数的并发请求共享同一次计算）
+        result, shared = await get_singleflight("predict").do(
+            (student_id or DEFAULT_STUDENT_ID, mode, refresh, style),
+            lambda: _predict_with_charts(student_id, mode, refresh, style),
         )
-        logger.info(f"趋势图生成完成，Base64长度: {len(line_chart_base64)}")
+        if shared:
+            logger.info("与进行中的相同请求合并, 共享其结果")
         
-        # 步骤4: 生成缺陷分析雷达图
-        logger.info("步骤4: 生成缺陷分析雷达图...")
-        # 生成示例缺陷数据（在实际应用中，这些数据应该来自检测系统）
-        defect_data, _ = generate_sample_data()
-        defect_radar_base64 = plot_defect_radar(defect_data)
-        logger.info(f"缺陷雷达图生成完成，Base64长度: {len(defect_radar_base64)}")
-        
-        # 步骤5: 生成操作手法雷达图
-        logger.info("步骤5: 生成操作手法雷达图...")
-        # 生成示例手法数据（在实际应用中，这些数据应该来自操作评估系统）
-        _, skill_data = generate_sample_data()
-        skill_radar_base64 = plot_skill_radar(skill_data)
-        logger.info(f"手法雷达图生成完成，Base64长度: {len(skill_radar_base64)}")
+        prediction_result = result["prediction"]
+        if style is None:
+            # format=data: 只返回图表数据, 不渲染图片
+            chart_fields = {
+                "line_chart": "",
+                "defect_radar": "",
+                "skill_radar": "",
+                "chart_data": result["chart_data"],
+            }
+        else:
+            chart_fields = _chart_fields(request, result["images"], embed)
         
         # 构建返回结果
         response = PredictionResponse(
             history=prediction_result['history'],
             forecast=prediction_result['forecast'],
-            line_chart=line_chart_base64,
-            defect_radar=defect_radar_base64,
-            skill_radar=skill_radar_base64
+            **chart_fields,
+            chart_format=style.format if style is not None else "data",
+            student_id=student_id or DEFAULT_STUDENT_ID,
+            source=result["source"],
+            mode=mode,
+            snapshot=result["snapshot"],
         )
         
         logger.info("预测流程执行完成")
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"预测流程执行失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"预测服务异常: {str(e)}")
@@ -150,14 +383,26 @@ async def get_prediction_stats():
 @router.post("/predict/custom")
 async def custom_prediction(
     data: Dict[str, Any],
-    days: int = 5
+    days: int = 5,
+    mode: Optional[Literal["rf", "online"]] = Query(default=None, description="预测模式: rf 或 online, 默认由 FORECAST_MODE 决定"),
+    refresh: bool = Query(default=False, description="读取预测快照时是否先同步刷新该学员的快照"),
+    db: Session = Depends(get_db),
 ):
     """
     自定义数据预测接口
     
     Args:
-        data: 自定义的历史数据
+        data: 自定义的历史数据，可包含：
+            - student_id: 学员/工位标识，读取该学员在数据库中的历史记录
+            - records: 附加的记录列表，每条为 {t, x, y, z, score} 或
+              {timestamp, speed_score, angle_score, depth_score, total_score}，
+              与数据库中的历史合并后参与预测
+            仅提供 records 时只使用这些记录；两者都未提供时与 /predict 相同
+            未提供 records 时随机森林模式读取该学员的预测快照（预测天数需与快照一致），
+            返回的 snapshot 中给出快照的生成时间与是否过期
         days: 预测天数，默认5天
+        mode: 预测模式，rf（随机森林）或 online（在线模型）
+        refresh: 读取快照时是否先同步刷新
         
     Returns:
         自定义预测结果
@@ -165,92 +410,181 @@ async def custom_prediction(
     try:
         logger.info(f"执行自定义预测，预测天数: {days}")
         
-        # 动态导入模块
-        import importlib
-        try:
-            data_gen = importlib.import_module('data_generator')
-            prediction_mod = importlib.import_module('prediction')
-            
-            generate_dataset = data_gen.generate_dataset
-            predict_future_scores = prediction_mod.predict_future_scores
-        except ImportError as e:
-            logger.error(f"导入模块失败: {e}")
-            raise HTTPException(status_code=500, detail=f"服务器配置错误: {e}")
+        from forecasting.history import frame_from_records
+        from prediction import predict_future_scores
         
-        # 这里可以处理用户传入的实时检测数据
-        # 目前先使用默认数据集，实际应用中应该处理传入的data
+        student_id = data.get("student_id")
+        records = data.get("records") or []
+        if not isinstance(records, list):
+            raise HTTPException(status_code=422, detail="records 必须是记录列表")
+        try:
+            extra_data = frame_from_records(records)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"records 格式错误: {e}")
         
-        # 生成基础数据集
-        base_data = generate_dataset()
+        mode = mode or default_forecast_mode()
+        if extra_data.empty and _use_snapshot(mode, days):
+            # 只读取学员数据库中的历史: 直接返回预测快照
+            prediction_result, source, snapshot = await run_in_threadpool(
+                _snapshot_forecast, db, student_id, refresh
+            )
+            return {
+                "history": prediction_result['history'],
+                "forecast": prediction_result['forecast'],
+                "student_id": student_id or DEFAULT_STUDENT_ID,
+                "source": source,
+                "mode": mode,
+                "snapshot": snapshot,
+                "generated_at": datetime.now().isoformat()
+            }
         
-        # 如果用户提供了数据，可以在这里处理合并逻辑
-        # 例如：将实时检测数据添加到历史数据中
+        # 读取学员历史并与传入的实时检测数据合并
+        if student_id is not None or extra_data.empty:
+            base_data, source = await run_in_threadpool(_load_forecast_history, db, student_id)
+            if not extra_data.empty:
+                import pandas as pd
+                base_data = pd.concat([base_data, extra_data], ignore_index=True)
+                source = "records+custom"
+        else:
+            base_data, source = extra_data, "custom"
         
         # 执行预测
-        prediction_result = predict_future_scores(base_data, days=days)
+        if mode == "online":
+            prediction_result = await run_in_threadpool(
+                _forecast_online, db, base_data, source, student_id, days, extra_data
+            )
+        else:
+            prediction_result = await run_in_threadpool(predict_future_scores, base_data, days=days)
         
         # 只返回数值数据，不生成图表（减少响应时间）
         return {
             "history": prediction_result['history'],
             "forecast": prediction_result['forecast'],
+            "student_id": student_id or DEFAULT_STUDENT_ID,
+            "source": source,
+            "mode": mode,
             "generated_at": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"自定义预测失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"自定义预测异常: {str(e)}")
 
 
+@router.post("/predict/batch")
+async def batch_prediction(
+    days: int = Query(default=5, ge=1, le=365, description="预测天数"),
+    workers: Optional[int] = Query(default=None, ge=1, le=os.cpu_count() or 1, description="工作进程数，默认 CPU 核数，不超过 CPU 核数"),
+    student_id: Optional[List[str]] = Query(default=None, description="只预测指定学员，可重复，默认全部学员"),
+    db: Session = Depends(get_db),
+):
+    """
+    批量预测全部（或指定）学员并写入 forecast_snapshots
+    
+    单次查询读取所有学员的历史, 在进程池中并行训练与预测, 最后在一个事务中批量写入。
+    已有批量任务在运行时返回 409。
+    
+    Returns:
+        任务摘要：学员数、成功/失败数及各阶段耗时
+    """
+    if _batch_lock.locked():
+        raise HTTPException(status_code=409, detail="已有批量预测任务正在运行")
+    async with _batch_lock:
+        logger.info(f"开始批量预测，预测天数: {days}")
+        try:
+            from forecasting.batch import run_batch_forecast
+            summary = await run_in_threadpool(
+                run_batch_forecast, db, student_ids=student_id, days=days, workers=workers
+            )
+        except Exception as e:
+            logger.error(f"批量预测失败: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"批量预测异常: {str(e)}")
+    logger.info(f"批量预测完成，成功 {summary['succeeded']}，失败 {summary['failed']}")
+    return summary
+
+
+@router.get("/predict/compare")
+async def compare_prediction_modes(
+    student_id: Optional[str] = Query(default=None, description="学员/工位标识, 默认为未标注学员的记录"),
+    holdout: int = Query(default=5, ge=1, le=60, description="留出用于检验的最后记录数"),
+    db: Session = Depends(get_db),
+):
+    """
+    对比随机森林与在线模型的预测精度
+    
+    用除最后 holdout 条以外的历史分别预测 holdout 步, 与留出的真实得分比较 MAE、RMSE;
+    同时返回在线模型在 /detect 增量更新过程中累计的一步预测误差。
+    """
+    try:
+        historical_data, source = await run_in_threadpool(_load_forecast_history, db, student_id)
+        try:
+            result = await run_in_threadpool(compare_modes, historical_data, holdout)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        
+        state = load_online_state(db, student_id or DEFAULT_STUDENT_ID) if source == "records" else None
+        result.update(
+            student_id=student_id or DEFAULT_STUDENT_ID,
+            source=source,
+            online_running={
+                "records": state.count,
+                "one_step_mae": round(state.mae, 3) if state.mae is not None else None,
+                "one_step_rmse": round(state.rmse, 3) if state.rmse is not None else None,
+            } if state is not None else None,
+        )
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"预测模式对比失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"预测模式对比异常: {str(e)}")
+
+
 @router.get("/predict/charts-only")
-async def get_charts_only():
+async def get_charts_only(
+    request: Request,
+    student_id: Optional[str] = Query(default=None, description="学员/工位标识, 默认为未标注学员的记录"),
+    mode: Optional[Literal["rf", "online"]] = Query(default=None, description="预测模式: rf 或 online, 默认由 FORECAST_MODE 决定"),
+    embed: bool = Query(default=True, description="是否内嵌base64图片; 为 false 时图片字段为空, 通过 charts 中的地址获取"),
+    refresh: bool = Query(default=False, description="随机森林模式下是否先同步刷新该学员的预测快照"),
+    style: Optional[ChartStyle] = Depends(chart_style_params),
+):
     """
     仅获取图表数据的接口（用于前端图表更新）
     
+    随机森林模式下预测趋势图使用该学员最新的预测快照（与 /predict 相同）;
+    与参数相同的 /predict 并发请求共享同一次计算
+    
     Returns:
-        仅包含图表base64字符串的响应
+        仅包含图表base64字符串与图片地址的响应; format=data 时为图表数据 chart_data
     """
     try:
         logger.info("生成仅图表数据...")
         
-        # 动态导入模块
-        import importlib
-        try:
-            data_gen = importlib.import_module('data_generator')
-            prediction_mod = importlib.import_module('prediction')
-            line_chart_mod = importlib.import_module('charts.line_chart')
-            radar_chart_mod = importlib.import_module('charts.radar_chart')
-            
-            generate_dataset = data_gen.generate_dataset
-            predict_future_scores = prediction_mod.predict_future_scores
-            plot_prediction_chart = line_chart_mod.plot_prediction_chart
-            plot_defect_radar = radar_chart_mod.plot_defect_radar
-            plot_skill_radar = radar_chart_mod.plot_skill_radar
-            generate_sample_data = radar_chart_mod.generate_sample_data
-        except ImportError as e:
-            logger.error(f"导入模块失败: {e}")
-            raise HTTPException(status_code=500, detail=f"服务器配置错误: {e}")
-        
-        # 生成基础数据
-        historical_data = generate_dataset()
-        prediction_result = predict_future_scores(historical_data, days=5)
-        
-        # 生成图表
-        line_chart_base64 = plot_prediction_chart(
-            prediction_result['history'], 
-            prediction_result['forecast']
+        mode = mode or default_forecast_mode()
+        result, _ = await get_singleflight("predict").do(
+            (student_id or DEFAULT_STUDENT_ID, mode, refresh, style),
+            lambda: _predict_with_charts(student_id, mode, refresh, style),
         )
-        
-        defect_data, skill_data = generate_sample_data()
-        defect_radar_base64 = plot_defect_radar(defect_data)
-        skill_radar_base64 = plot_skill_radar(skill_data)
+        if style is None:
+            # format=data: 只返回图表数据, 不渲染图片
+            return {
+                "chart_data": result["chart_data"],
+                "chart_format": "data",
+                "generated_at": datetime.now().isoformat()
+            }
         
         return {
-            "line_chart": line_chart_base64,
-            "defect_radar": defect_radar_base64,
-            "skill_radar": skill_radar_base64,
+            **_chart_fields(request, result["images"], embed),
+            "chart_format": style.format,
             "generated_at": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"生成图表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"图表生成异常: {str(e)}")
@@ -266,24 +600,27 @@ async def health_check():
     """
     try:
         # 执行简单的功能测试
-        import importlib
-        try:
-            data_gen = importlib.import_module('data_generator')
-            prediction_mod = importlib.import_module('prediction')
-            
-            generate_dataset = data_gen.generate_dataset
-            predict_future_scores = prediction_mod.predict_future_scores
-        except ImportError as e:
-            raise Exception(f"模块导入失败: {e}")
+        from charts.engine import get_template_pool
+        from data_generator import generate_dataset
+        from forecasting.features import get_feature_store
+        from forecasting.registry import get_model_registry
+        from prediction import predict_future_scores
         
         test_data = generate_dataset()
-        test_result = predict_future_scores(test_data, days=1)
+        test_result = await run_in_threadpool(predict_future_scores, test_data, days=1)
         
         return {
             "status": "healthy",
             "message": "预测服务运行正常",
             "test_data_points": len(test_data),
             "test_prediction_points": len(test_result['forecast']),
+            "model_cache": get_model_registry().stats(),
+            "feature_store": get_feature_store().stats(),
+            "chart_cache": get_chart_cache().stats(),
+            "chart_templates": get_template_pool().stats(),
+            "chart_renderer": get_chart_renderer().stats(),
+            "forecast_snapshots": get_snapshot_scheduler().stats(),
+            "singleflight": singleflight_stats(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -1,18 +1,24 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from openai import OpenAI
+from typing import AsyncIterator, List, Optional, Dict, Any
+import asyncio
+import json
+import logging
 import os
 from dotenv import load_dotenv
 
+from llm_client import GenerationStats, get_teacher_llm
+
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir) 
 env_path = os.path.join(parent_dir, '.env')  
 load_dotenv(dotenv_path=env_path)
 
-API_KEY = os.getenv("ERNIE_ACCESS_TOKEN")
+SYSTEM_PROMPT = "你是一个专业的焊接技术教学AI助手。你的任务是根据用户提供的检测报告和问题，给出具体、可行的分析和改进建议。"
 
 class ChatInput(BaseModel):
     message: str
@@ -44,21 +50,9 @@ def format_context_for_prompt(context: Dict[str, Any]) -> str:
 """
     return prompt
 
-@router.post("/teacher/chat")
-async def chat_with_teacher(payload: ChatInput):
-    """
-    与AI教师进行聊天，可以接收检测结果作为上下文。
-    """
-    print(f"Received payload: {payload.model_dump_json(indent=2)}")
-    if not API_KEY:
-        raise HTTPException(status_code=500, detail="ERNIE API key not configured")
-
-    client = OpenAI(
-    api_key=API_KEY,
-    base_url="https://qianfan.baidubce.com/v2"
-)
-
-    messages = [{"role": "system", "content": "你是一个专业的焊接技术教学AI助手。你的任务是根据用户提供的检测报告和问题，给出具体、可行的分析和改进建议。"}]
+def build_messages(payload: ChatInput) -> List[Dict[str, str]]:
+    """由系统提示、历史对话与本轮问题（首轮对话时附带检测报告）组装对话消息"""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     
     # 如果有上下文（检测结果），将其格式化并加到用户第一条消息前
     user_message = payload.message
@@ -74,17 +68,110 @@ async def chat_with_teacher(payload: ChatInput):
             messages.append({"role": "assistant", "content": item["assistant"]})
             
     messages.append({"role": "user", "content": user_message})
+    return messages
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _wait_for_disconnect(request: Request):
+    """请求体已读取完毕, 之后收到的消息只会是客户端断开"""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+async def _until_disconnect(request: Request, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    在独立任务中消费生成的文本并转发; 客户端断开时（包括仍在等待首字时）立即取消该任务,
+    生成器随之关闭上游连接
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    end = object()
+
+    async def produce():
+        try:
+            async for delta in deltas:
+                queue.put_nowait(delta)
+        finally:
+            queue.put_nowait(end)
+
+    producer = asyncio.ensure_future(produce())
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                return
+            item = getter.result()
+            if item is end:
+                # 生成结束或出错: 抛出生成中的异常
+                await producer
+                return
+            yield item
+    finally:
+        disconnected.cancel()
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+@router.post("/teacher/chat")
+async def chat_with_teacher(payload: ChatInput):
+    """
+    与AI教师进行聊天，可以接收检测结果作为上下文。
+
+    整段回答生成完毕后一次返回; metrics 中给出耗时与输出 token 数。
+    需要逐字显示时使用 /teacher/chat/stream。
+    """
+    llm = get_teacher_llm()
+    if not llm.configured:
+        raise HTTPException(status_code=500, detail="ERNIE API key not configured")
 
     try:
-        response = client.chat.completions.create(
-            model="ernie-3.5-8k",
-            messages=[{"role": "user", "content": user_message}],
-            max_tokens=1024,
-            temperature=0.7,
-            stream=False
-        ) 
-        ai_response = response.choices[0].message.content
-        return {"response": ai_response}
+        ai_response, stats = await llm.complete(build_messages(payload))
+        return {"response": ai_response, "metrics": stats.to_dict()}
     except Exception as e:
-        print(f"Error calling ERNIE API: {e}")
+        logger.error(f"Error calling ERNIE API: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get response from AI teacher. {e}")
+
+@router.post("/teacher/chat/stream")
+async def chat_with_teacher_stream(payload: ChatInput, request: Request):
+    """
+    与AI教师进行流式聊天（Server-Sent Events），请求体与 /teacher/chat 相同。
+
+    事件：
+    - token: {"content": 文本片段}，模型输出一段即转发一段
+    - done: 生成结束，给出首字延迟 ttft_ms、总耗时 total_ms、输出 token 数与生成速度 tokens_per_second
+    - error: {"detail": 错误信息}
+    客户端断开时立即停止转发并中止上游生成。
+    """
+    llm = get_teacher_llm()
+    if not llm.configured:
+        raise HTTPException(status_code=500, detail="ERNIE API key not configured")
+    messages = build_messages(payload)
+
+    async def events():
+        stats = GenerationStats()
+        try:
+            async for delta in _until_disconnect(request, llm.stream(messages, stats)):
+                yield _sse("token", {"content": delta})
+        except Exception as e:
+            logger.error(f"Error calling ERNIE API: {e}")
+            yield _sse("error", {"detail": f"Failed to get response from AI teacher. {e}"})
+            return
+        if stats.status == "completed":
+            yield _sse("done", stats.to_dict())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/teacher/stats")
+async def get_teacher_stats():
+    """
+    AI 助教大模型客户端的运行指标
+
+    Returns:
+        请求数、进行中/完成/取消/失败数、平均首字延迟与平均生成速度，以及最近一次生成的耗时统计
+    """
+    return get_teacher_llm().stats()
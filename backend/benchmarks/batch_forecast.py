@@ -0,0 +1,77 @@
+"""
+批量预测扩展性压测：不同工作进程数下预测全部学员的耗时与加速比
+
+为每个学员生成与 data_generator 相同规模的合成历史（默认 30 条），
+分别以 1、2、4 … 个工作进程调用 forecast_histories，输出耗时、加速比与并行效率，
+并校验各组结果与单进程结果完全一致。
+
+用法（在 backend 目录下）：
+    python benchmarks/batch_forecast.py --students 5000 --rows 30 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from forecasting.batch import forecast_histories  # noqa: E402
+
+
+def _synthetic_histories(n_students: int, n_rows: int):
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp("2025-01-01 09:00:00")
+    histories = {}
+    for i in range(n_students):
+        trend = np.linspace(rng.uniform(40, 70), rng.uniform(70, 95), n_rows)
+        x, y, z = (np.clip(trend + rng.normal(0, 6, n_rows), 0, 100) for _ in range(3))
+        histories[f"student-{i:05d}"] = pd.DataFrame({
+            "t": start + pd.to_timedelta(np.arange(n_rows), unit="D"),
+            "x": x,
+            "y": y,
+            "z": z,
+            "score": (x + y + z) / 3,
+        })
+    return histories
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_workers = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= cpu_count], cpu_count})
+    parser = argparse.ArgumentParser(description="批量预测扩展性压测")
+    parser.add_argument("--students", type=int, default=5000, help="学员数")
+    parser.add_argument("--rows", type=int, default=30, help="每个学员的历史记录数")
+    parser.add_argument("--days", type=int, default=5, help="预测天数")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers, help="工作进程数")
+    args = parser.parse_args()
+
+    histories = _synthetic_histories(args.students, args.rows)
+    print(f"学员 {args.students} 个, 每人 {args.rows} 条记录, CPU 核数 {cpu_count}")
+    print(f"{'workers':>8} {'seconds':>9} {'students/s':>11} {'speedup':>8} {'efficiency':>11}")
+
+    baseline_seconds = None
+    baseline_results = None
+    for workers in args.workers:
+        started = time.perf_counter()
+        results = forecast_histories(histories, days=args.days, workers=workers)
+        seconds = time.perf_counter() - started
+
+        failed = sum(1 for _, error in results.values() if error is not None)
+        if baseline_results is None:
+            baseline_seconds, baseline_results = seconds, results
+        elif results != baseline_results:
+            print(f"警告: {workers} 个工作进程的结果与单进程不一致")
+        speedup = baseline_seconds / seconds
+        print(
+            f"{workers:>8} {seconds:>9.1f} {args.students / seconds:>11.1f} "
+            f"{speedup:>8.2f} {speedup / workers * args.workers[0]:>10.0%}"
+            + (f"  (失败 {failed})" if failed else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
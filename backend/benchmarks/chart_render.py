@@ -0,0 +1,85 @@
+"""
+图表渲染参数对比：不同格式、dpi、尺寸与压缩等级下的渲染耗时与输出大小
+
+使用同一份预测结果与雷达图数据，分别以各组输出样式渲染三张图表
+（趋势图、缺陷雷达图、手法雷达图），输出每组的渲染+编码耗时中位数、
+图片字节数以及 base64 内嵌到 JSON 时的字节数。第一组为改造前的 PNG + dpi=300。
+
+用法（在 backend 目录下）：
+    python benchmarks/chart_render.py --repeat 5
+"""
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from charts.line_chart import render_prediction_chart  # noqa: E402
+from charts.radar_chart import generate_sample_data, render_defect_radar, render_skill_radar  # noqa: E402
+from charts.style import ChartStyle  # noqa: E402
+from data_generator import generate_dataset  # noqa: E402
+from prediction import predict_future_scores  # noqa: E402
+
+SETTINGS = [
+    ("png dpi=300 (旧)", ChartStyle(format="png", dpi=300)),
+    ("png dpi=100 (默认)", ChartStyle()),
+    ("png dpi=100 压缩1", ChartStyle(compress_level=1)),
+    ("png dpi=100 压缩9", ChartStyle(compress_level=9)),
+    ("png 宽600", ChartStyle(width=600)),
+    ("png dpi=150", ChartStyle(dpi=150)),
+    ("webp dpi=100", ChartStyle(format="webp")),
+    ("svg", ChartStyle(format="svg")),
+]
+
+
+def _measure(render, repeat: int):
+    seconds = []
+    data = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = render()
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds), data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图表渲染参数对比")
+    parser.add_argument("--repeat", type=int, default=5, help="每组样式的重复渲染次数")
+    args = parser.parse_args()
+
+    result = predict_future_scores(generate_dataset(), days=5)
+    np.random.seed(42)
+    defect_data, skill_data = generate_sample_data()
+    charts = {
+        "line_chart": lambda style: render_prediction_chart(result["history"], result["forecast"], style),
+        "defect_radar": lambda style: render_defect_radar(defect_data, style),
+        "skill_radar": lambda style: render_skill_radar(skill_data, style),
+    }
+    # 预热字体缓存等一次性开销
+    for render in charts.values():
+        render(ChartStyle())
+
+    print(f"{'setting':<20} {'ms/3 charts':>12} {'bytes':>10} {'base64 bytes':>13} {'vs old':>8}")
+    baseline_bytes = None
+    for label, style in SETTINGS:
+        total_seconds, total_bytes, encoded = 0.0, 0, 0
+        for render in charts.values():
+            seconds, data = _measure(lambda: render(style), args.repeat)
+            total_seconds += seconds
+            total_bytes += len(data)
+            encoded += len(base64.b64encode(data))
+        baseline_bytes = baseline_bytes or total_bytes
+        print(
+            f"{label:<20} {total_seconds * 1000:>12.1f} {total_bytes:>10} {encoded:>13} "
+            f"{total_bytes / baseline_bytes:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
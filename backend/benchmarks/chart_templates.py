@@ -0,0 +1,76 @@
+"""
+图表模板复用对比：每次新建图表 vs 复用每线程的图表模板
+
+使用同一份预测结果与雷达图数据（每次渲染轮换几组不同的数据，模拟不同请求），
+分别在不复用模板（CHART_TEMPLATE_POOL_SIZE=0，每次构建 Figure、坐标轴与布局，
+与改造前逐次创建图表的开销相当）和复用模板两种模式下渲染三张图表，
+输出每张图的渲染+编码耗时中位数与加速比。
+
+用法（在 backend 目录下）：
+    python benchmarks/chart_templates.py --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from charts.engine import configure_template_pool  # noqa: E402
+from charts.line_chart import render_prediction_chart  # noqa: E402
+from charts.radar_chart import generate_sample_data, render_defect_radar, render_skill_radar  # noqa: E402
+from charts.style import ChartStyle  # noqa: E402
+from data_generator import generate_dataset  # noqa: E402
+from prediction import predict_future_scores  # noqa: E402
+
+VARIANTS = 4
+
+
+def _measure(render, repeat: int) -> float:
+    seconds = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        render(i % VARIANTS)
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图表模板复用对比")
+    parser.add_argument("--repeat", type=int, default=20, help="每张图表的重复渲染次数")
+    parser.add_argument("--format", default="png", choices=["png", "webp", "svg"], help="输出格式")
+    args = parser.parse_args()
+    style = ChartStyle(format=args.format)
+
+    results = [predict_future_scores(generate_dataset(), days=5) for _ in range(VARIANTS)]
+    np.random.seed(42)
+    samples = [generate_sample_data() for _ in range(VARIANTS)]
+    charts = {
+        "line_chart": lambda i: render_prediction_chart(results[i]["history"], results[i]["forecast"], style),
+        "defect_radar": lambda i: render_defect_radar(samples[i][0], style),
+        "skill_radar": lambda i: render_skill_radar(samples[i][1], style),
+    }
+
+    timings = {}
+    for mode, pool_size in (("fresh", 0), ("pooled", 8)):
+        configure_template_pool(max_templates=pool_size)
+        # 预热字体缓存与模板
+        for render in charts.values():
+            render(0)
+        timings[mode] = {name: _measure(render, args.repeat) for name, render in charts.items()}
+
+    print(f"{'chart':<14} {'fresh ms':>10} {'pooled ms':>10} {'speedup':>8}")
+    for name in charts:
+        fresh, pooled = timings["fresh"][name], timings["pooled"][name]
+        print(f"{name:<14} {fresh * 1000:>10.1f} {pooled * 1000:>10.1f} {fresh / pooled:>7.1f}x")
+    fresh_total = sum(timings["fresh"].values())
+    pooled_total = sum(timings["pooled"].values())
+    print(f"{'total':<14} {fresh_total * 1000:>10.1f} {pooled_total * 1000:>10.1f} {fresh_total / pooled_total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
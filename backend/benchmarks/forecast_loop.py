@@ -0,0 +1,59 @@
+"""
+predict_future_scores 多步预测耗时压测
+
+在合成历史数据上先调用一次完成模型训练（写入模型注册表），
+再测量不同预测天数下命中缓存模型时的单次预测耗时，即特征构建、历史序列化与逐天预测的开销。
+
+用法（在 backend 目录下）：
+    python benchmarks/forecast_loop.py --rows 100000 --days 5 30 365
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from prediction import predict_future_scores  # noqa: E402
+
+
+def _synthetic_history(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "t": pd.date_range("2015-01-01", periods=n_rows, freq="h"),
+        "x": rng.uniform(0, 100, n_rows),
+        "y": rng.uniform(0, 100, n_rows),
+        "z": rng.uniform(0, 100, n_rows),
+    })
+    df["score"] = 0.3 * df["x"] + 0.3 * df["y"] + 0.4 * df["z"]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多步预测耗时压测")
+    parser.add_argument("--rows", type=int, default=100_000, help="历史记录数")
+    parser.add_argument("--days", type=int, nargs="+", default=[5, 30, 365], help="预测天数")
+    parser.add_argument("--repeat", type=int, default=5, help="每组重复次数")
+    args = parser.parse_args()
+
+    history = _synthetic_history(args.rows)
+    started = time.perf_counter()
+    predict_future_scores(history, days=1)
+    print(f"{args.rows} 条历史记录, 首次调用（含训练）耗时 {time.perf_counter() - started:.1f} 秒")
+
+    print(f"{'days':>6} {'best(ms)':>10} {'mean(ms)':>10}")
+    for days in args.days:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            predict_future_scores(history, days=days)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{days:>6} {min(timings):>10.1f} {np.mean(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+/dashboard/history 游标分页压测：在 100 万条合成记录上验证翻页耗时与深度无关
+
+在临时 SQLite 数据库中批量写入合成记录，分别测量不同深度处
+游标分页（keyset）与 OFFSET 分页取一页的耗时，并输出查询计划确认使用了复合索引。
+
+用法（在 backend 目录下）：
+    python benchmarks/history_pagination.py --rows 1000000 --limit 50
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+work_dir = tempfile.mkdtemp(prefix="history_pagination_")
+db_path = os.path.join(work_dir, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+from sqlalchemy import text  # noqa: E402
+
+import models  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from api.dashboard import encode_cursor, query_history_page  # noqa: E402
+
+
+def _populate(n_rows: int):
+    """写入 n_rows 条合成记录：约每 30 秒一条，部分记录时间戳相同以覆盖 id 决胜的情况"""
+    models.Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(42)
+    start = datetime(2024, 9, 1)
+    offsets = np.cumsum(rng.integers(0, 60, n_rows))
+    scores = np.round(rng.uniform(70, 99, (n_rows, 4)), 2)
+    totals = np.round(scores.mean(axis=1), 2)
+
+    conn = sqlite3.connect(db_path)
+    batch = 100_000
+    for begin in range(0, n_rows, batch):
+        rows = [
+            (
+                (start + timedelta(seconds=int(offsets[i]))).strftime("%Y-%m-%d %H:%M:%S"),
+                *scores[i].tolist(),
+                float(totals[i]),
+            )
+            for i in range(begin, min(begin + batch, n_rows))
+        ]
+        conn.executemany(
+            "INSERT INTO welding_records (timestamp, speed_score, angle_score, depth_score, defect_score, total_score)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def _time_call(fn, repeat: int = 5) -> float:
+    """返回多次调用中的最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/dashboard/history 游标分页压测")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="合成记录数")
+    parser.add_argument("--limit", type=int, default=50, help="每页记录数")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _populate(args.rows)
+    print(f"写入 {args.rows} 条记录耗时 {time.perf_counter() - started:.1f} 秒")
+
+    db = SessionLocal()
+    try:
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM welding_records"
+            " WHERE (timestamp, id) < ('2025-01-01 00:00:00', 1)"
+            " ORDER BY timestamp DESC, id DESC LIMIT 51"
+        )).fetchall()
+        print("查询计划:", "; ".join(row[-1] for row in plan))
+
+        print(f"{'depth':>10} {'keyset(ms)':>11} {'offset(ms)':>11}")
+        for depth in [0, 1_000, 10_000, 100_000, 500_000, args.rows - args.limit - 1]:
+            if depth >= args.rows:
+                continue
+            cursor = None
+            if depth > 0:
+                row = db.execute(text(
+                    "SELECT timestamp, id FROM welding_records ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET :o"
+                ), {"o": depth - 1}).one()
+                cursor = encode_cursor(datetime.fromisoformat(row[0]), row[1])
+
+            keyset_ms = _time_call(lambda: query_history_page(db, cursor=cursor, limit=args.limit))
+            offset_ms = _time_call(lambda: db.execute(text(
+                "SELECT * FROM welding_records ORDER BY timestamp DESC, id DESC LIMIT :l OFFSET :o"
+            ), {"l": args.limit, "o": depth}).fetchall())
+            print(f"{depth:>10} {keyset_ms:>11.2f} {offset_ms:>11.2f}")
+
+        filtered_ms = _time_call(lambda: query_history_page(
+            db, limit=args.limit, start_time=datetime(2024, 10, 1), end_time=datetime(2024, 10, 8),
+            min_score=85, max_score=95,
+        ))
+        print(f"带时间与得分范围过滤的首页: {filtered_ms:.2f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
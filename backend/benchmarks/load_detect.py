@@ -0,0 +1,103 @@
+"""
+/detect 接口压测：验证吞吐量随检测执行池大小的扩展情况
+
+在进程内通过 httpx 的 ASGITransport 直接调用应用，使用独立的临时数据库，
+对每个池大小并发发送一批上传请求，统计吞吐量与延迟分位数。
+
+用法（在 backend 目录下）：
+    python benchmarks/load_detect.py --requests 32 --pools 1 2 4 8 --mode thread
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 添加 backend 目录到路径，并使用独立的临时数据库与工作目录
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+work_dir = tempfile.mkdtemp(prefix="load_detect_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+os.chdir(work_dir)
+
+import httpx  # noqa: E402
+
+from main import app  # noqa: E402
+from database import init_database  # noqa: E402
+from analysis.backends import configure_model_pool  # noqa: E402
+from analysis.cache import configure_result_cache  # noqa: E402
+from analysis.pool import configure_detection_executor, shutdown_detection_executor  # noqa: E402
+from analysis.scheduler import configure_microbatch_scheduler, get_microbatch_scheduler  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+async def _run_round(n_requests: int, image_bytes: bytes):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    statuses = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int):
+            started = time.perf_counter()
+            # 每个请求使用不同内容，避免命中同一评分
+            payload = image_bytes + i.to_bytes(4, "little")
+            resp = await client.post(
+                "/api/v1/detect",
+                files={"file": (f"bench_{i}.png", payload, "image/png")},
+            )
+            latencies.append(time.perf_counter() - started)
+            statuses.append(resp.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, np.array(latencies), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/detect 吞吐量压测")
+    parser.add_argument("--requests", type=int, default=32, help="每轮并发请求数")
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, 4, 8], help="待测试的池大小")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread", help="执行模式")
+    parser.add_argument("--image-kb", type=int, default=256, help="模拟图片大小（KB）")
+    parser.add_argument("--backend", choices=["synthetic", "yolo"], default="synthetic", help="检测后端")
+    parser.add_argument("--microbatch-wait-ms", type=float, default=0, help="微批聚合等待（毫秒），0 表示关闭")
+    parser.add_argument("--microbatch-size", type=int, default=16, help="微批最大图片数")
+    args = parser.parse_args()
+
+    # ASGITransport 不触发 lifespan, 这里自行建表
+    init_database()
+
+    image_bytes = os.urandom(args.image_kb * 1024)
+
+    print(f"模式: {args.mode}, 后端: {args.backend}, 每轮请求数: {args.requests}, 图片大小: {args.image_kb} KB, "
+          f"微批: {args.microbatch_wait_ms} ms / {args.microbatch_size}")
+    print(f"{'workers':>8} {'elapsed(s)':>11} {'req/s':>8} {'p50(s)':>8} {'p95(s)':>8} {'429':>5} "
+          f"{'batch':>6} {'queue_p99(ms)':>14}")
+    for workers in args.pools:
+        configure_detection_executor(
+            mode=args.mode, workers=workers, max_inflight=workers * 2, queue_timeout=None
+        )
+        # 模型实例数与工作线程数一致；每轮清空结果缓存，保证每个请求都执行推理
+        configure_model_pool(backend_name=args.backend, instances=workers).load()
+        configure_result_cache(max_entries=0)
+        configure_microbatch_scheduler(max_wait_ms=args.microbatch_wait_ms, max_batch_size=args.microbatch_size)
+        elapsed, latencies, statuses = asyncio.run(_run_round(args.requests, image_bytes))
+        rejected = sum(1 for s in statuses if s == 429)
+        scheduler_stats = get_microbatch_scheduler().stats()
+        print(
+            f"{workers:>8} {elapsed:>11.2f} {args.requests / elapsed:>8.2f} "
+            f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} {rejected:>5} "
+            f"{scheduler_stats['avg_batch_size']:>6} {scheduler_stats['queue_ms_p99']:>14}"
+        )
+        shutdown_detection_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+本地模拟的 OpenAI 兼容大模型服务（/v1/chat/completions）
+
+按固定的首字延迟与逐字间隔返回一段预设回答，支持流式（SSE，含 stream_options.include_usage）
+与非流式两种调用，用于在无法访问线上模型时测试 AI 助教接口。
+/stats 返回已完成与中途被客户端断开的流式生成数，可用来确认客户端断开后上游生成已停止。
+
+用法（在 backend 目录下）：
+    python benchmarks/mock_llm.py --port 8001 --ttft-ms 500 --token-ms 30
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 ERNIE_ACCESS_TOKEN=test python main.py
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ANSWER = (
+    "根据检测报告，你的焊接速度偏快，导致熔深不足。建议适当降低焊接速度，"
+    "保持焊枪角度在七十度左右，并注意观察熔池的形状与大小，使焊缝均匀饱满。"
+)
+
+
+def create_app(ttft_ms: float = 500.0, token_ms: float = 30.0, answer: str = ANSWER) -> FastAPI:
+    """创建模拟服务，每个汉字作为一个 token 返回"""
+    app = FastAPI(title="mock llm")
+    counters = {"requests": 0, "streams_completed": 0, "streams_aborted": 0}
+
+    def chunk(completion_id: str, model: str, content=None, finish_reason=None, usage=None):
+        choices = [] if usage is not None else [
+            {"index": 0, "delta": {"content": content} if content else {}, "finish_reason": finish_reason}
+        ]
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": choices,
+            "usage": usage,
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        model = body.get("model", "mock")
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        tokens = list(answer)[: body.get("max_tokens") or None]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await asyncio.sleep((ttft_ms + token_ms * len(tokens)) / 1000)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events():
+            completed = False
+            try:
+                await asyncio.sleep(ttft_ms / 1000)
+                for i, token in enumerate(tokens):
+                    if i:
+                        await asyncio.sleep(token_ms / 1000)
+                    yield f"data: {json.dumps(chunk(completion_id, model, token), ensure_ascii=False)}\n\n"
+                yield f"data: {json.dumps(chunk(completion_id, model, finish_reason='stop'))}\n\n"
+                if include_usage:
+                    yield f"data: {json.dumps(chunk(completion_id, model, usage=usage))}\n\n"
+                yield "data: [DONE]\n\n"
+                completed = True
+            finally:
+                counters["streams_completed" if completed else "streams_aborted"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟的 OpenAI 兼容大模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=500.0, help="首字延迟（毫秒）")
+    parser.add_argument("--token-ms", type=float, default=30.0, help="逐字间隔（毫秒）")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.ttft_ms, args.token_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
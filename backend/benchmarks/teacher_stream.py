@@ -0,0 +1,120 @@
+"""
+AI 助教对话延迟对比：非流式 vs 流式（SSE）
+
+在后台线程中启动本地模拟大模型服务（benchmarks/mock_llm.py），通过 /api/v1/teacher/chat 与
+/api/v1/teacher/chat/stream 各发起若干轮并发对话，输出用户看到第一个字的耗时
+（非流式为整段回答的耗时）与整段回答的耗时中位数；最后发起一次中途断开的流式对话，
+确认模拟服务端的生成随之中止。
+
+用法（在 backend 目录下）：
+    python benchmarks/teacher_stream.py --concurrency 8 --ttft-ms 500 --token-ms 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAYLOAD = {"message": "我的焊缝有气孔，应该怎么改进？", "history": []}
+
+
+def _serve(app, port: int) -> "threading.Thread":
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _chat(client: httpx.AsyncClient):
+    started = time.perf_counter()
+    response = await client.post("/api/v1/teacher/chat", json=PAYLOAD)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def _chat_stream(client: httpx.AsyncClient):
+    started = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/api/v1/teacher/chat/stream", json=PAYLOAD) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line == "event: token" and first is None:
+                first = time.perf_counter() - started
+            if line == "event: done":
+                break
+    return first, time.perf_counter() - started
+
+
+async def _abort_stream(client: httpx.AsyncClient, after_tokens: int):
+    """读到若干个片段后断开连接"""
+    async with client.stream("POST", "/api/v1/teacher/chat/stream", json=PAYLOAD) as response:
+        seen = 0
+        async for line in response.aiter_lines():
+            seen += line == "event: token"
+            if seen >= after_tokens:
+                break
+
+
+async def _run(args):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+        results = {}
+        for name, chat in (("chat", _chat), ("stream", _chat_stream)):
+            timings = []
+            for _ in range(args.rounds):
+                timings += await asyncio.gather(*(chat(client) for _ in range(args.concurrency)))
+            results[name] = timings
+
+        print(f"{'endpoint':<10} {'first char ms':>14} {'full answer ms':>15}")
+        for name, timings in results.items():
+            first = statistics.median(t[0] for t in timings) * 1000
+            full = statistics.median(t[1] for t in timings) * 1000
+            print(f"{name:<10} {first:>14.1f} {full:>15.1f}")
+
+        await _abort_stream(client, after_tokens=3)
+        await asyncio.sleep(0.5)
+        stats = (await client.get("/api/v1/teacher/stats")).json()
+        print(f"client stats: avg ttft {stats['avg_ttft_ms']} ms, avg {stats['avg_tokens_per_second']} tokens/s, "
+              f"completed {stats['completed']}, cancelled {stats['cancelled']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 助教对话延迟对比")
+    parser.add_argument("--concurrency", type=int, default=8, help="每轮并发对话数")
+    parser.add_argument("--rounds", type=int, default=3, help="轮数")
+    parser.add_argument("--ttft-ms", type=float, default=500.0, help="模拟服务的首字延迟（毫秒）")
+    parser.add_argument("--token-ms", type=float, default=30.0, help="模拟服务的逐字间隔（毫秒）")
+    parser.add_argument("--port", type=int, default=8010, help="后端服务端口（模拟服务使用 port+1）")
+    args = parser.parse_args()
+
+    from mock_llm import create_app
+
+    mock_port = args.port + 1
+    _serve(create_app(args.ttft_ms, args.token_ms), mock_port)
+    os.environ.update(
+        LLM_BASE_URL=f"http://127.0.0.1:{mock_port}/v1",
+        ERNIE_ACCESS_TOKEN=os.getenv("ERNIE_ACCESS_TOKEN") or "mock",
+        STARTUP_MODE="lazy",
+    )
+    import main as backend
+
+    _serve(backend.app, args.port)
+    asyncio.run(_run(args))
+    with httpx.Client() as client:
+        print(f"mock llm: {client.get(f'http://127.0.0.1:{mock_port}/stats').json()}")
+
+
+if __name__ == "__main__":
+    main()
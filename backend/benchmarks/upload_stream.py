@@ -0,0 +1,135 @@
+"""
+/detect 大文件上传压测：并发上传 20 MB 图片，报告服务进程 RSS 与请求延迟
+
+以子进程方式启动 uvicorn（独立的临时数据库与工作目录），客户端从磁盘文件流式上传，
+通过 /proc/<pid>/status 读取服务进程的当前 RSS（VmRSS）与峰值 RSS（VmHWM），仅支持 Linux。
+
+用法（在 backend 目录下）：
+    python benchmarks/upload_stream.py --size-mb 20 --concurrency 8 --rounds 3
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _read_rss_mb(pid: int):
+    """读取进程当前 RSS 与峰值 RSS（MB）"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values.get("VmRSS", 0.0), values.get("VmHWM", 0.0)
+
+
+def _start_server(work_dir: str, port: int, extra_env=None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    env["PYTHONPATH"] = backend_dir
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("服务启动超时")
+
+
+async def _upload_round(base_url: str, image_paths, concurrency: int):
+    latencies = []
+    statuses = []
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def one(path: str):
+            started = time.perf_counter()
+            with open(path, "rb") as f:
+                resp = await client.post(
+                    "/api/v1/detect", files={"file": (os.path.basename(path), f, "image/png")}
+                )
+            latencies.append(time.perf_counter() - started)
+            statuses.append(resp.status_code)
+
+        await asyncio.gather(*(one(p) for p in image_paths))
+
+    return np.array(latencies), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/detect 大文件并发上传压测")
+    parser.add_argument("--size-mb", type=int, default=20, help="单张图片大小（MB）")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发上传数")
+    parser.add_argument("--rounds", type=int, default=3, help="轮数")
+    parser.add_argument("--spool-dir", default="", help="可选：服务端上传暂存目录")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="upload_stream_")
+    image_paths = []
+    for i in range(args.concurrency):
+        path = os.path.join(work_dir, f"weld_{i}.png")
+        with open(path, "wb") as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        image_paths.append(path)
+
+    port = _free_port()
+    extra_env = {
+        "DETECT_WORKERS": str(args.concurrency),
+        "DETECT_MAX_INFLIGHT": str(args.concurrency),
+        "DETECT_QUEUE_TIMEOUT": "-1",
+    }
+    if args.spool_dir:
+        extra_env["DETECT_SPOOL_DIR"] = args.spool_dir
+    proc = _start_server(work_dir, port, extra_env)
+
+    try:
+        rss, hwm = _read_rss_mb(proc.pid)
+        print(f"图片大小: {args.size_mb} MB, 并发数: {args.concurrency}, 暂存目录: {args.spool_dir or '无'}")
+        print(f"启动后 RSS: {rss:.1f} MB, 峰值: {hwm:.1f} MB")
+        print(f"{'round':>6} {'p50(s)':>8} {'p95(s)':>8} {'max(s)':>8} {'MB/s':>8} {'RSS(MB)':>9} {'HWM(MB)':>9}")
+        for r in range(1, args.rounds + 1):
+            started = time.perf_counter()
+            latencies, statuses = asyncio.run(
+                _upload_round(f"http://127.0.0.1:{port}", image_paths, args.concurrency)
+            )
+            elapsed = time.perf_counter() - started
+            failed = [s for s in statuses if s != 200]
+            if failed:
+                print(f"警告: 第 {r} 轮有 {len(failed)} 个请求失败: {failed}")
+            rss, hwm = _read_rss_mb(proc.pid)
+            throughput = args.size_mb * args.concurrency / elapsed
+            print(
+                f"{r:>6} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+                f"{latencies.max():>8.2f} {throughput:>8.1f} {rss:>9.1f} {hwm:>9.1f}"
+            )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
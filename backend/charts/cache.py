@@ -0,0 +1,302 @@
+"""
+图表图片缓存
+
+以「图表类型 + 输入数据 + 样式参数」的 SHA-256 作为内容哈希缓存渲染好的图片：
+输入不变时直接返回已渲染的图片，不再调用 matplotlib。
+内存中按总字节数 LRU 淘汰，可选同时写入磁盘，内存淘汰或服务重启后从磁盘读回；
+磁盘上的图片同样按总字节数淘汰最久未使用的文件（启动时按修改时间恢复使用顺序）。
+图片以「哈希.格式」（如 {hash}.png）为名缓存，并通过 /charts/{hash}.png 等 URL 提供，
+内容由哈希唯一确定，可被浏览器长期缓存。
+
+相关环境变量：
+- CHART_CACHE_MAX_BYTES: 内存中缓存图片的总字节数上限，0 表示关闭内存缓存，默认 64MB
+- CHART_CACHE_DIR: 图片落盘目录，为空时只使用内存缓存
+- CHART_CACHE_DISK_MAX_BYTES: 磁盘上缓存图片的总字节数上限，默认 512MB
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from charts.style import DEFAULT_CHART_STYLE, ChartStyle
+
+# 图表样式（配色、布局等）变化时修改版本号，使旧哈希全部失效
+CHART_STYLE_VERSION = "charts-v2"
+
+
+def chart_key(kind: str, *payload: Any, style: Optional[ChartStyle] = None) -> str:
+    """
+    计算图表的内容哈希
+
+    参数：
+    - kind: 图表类型，如 "line_chart"
+    - payload: 绘图输入数据（dict 按插入顺序参与计算，与绘图时的顺序一致）
+    - style: 输出样式，默认为 DEFAULT_CHART_STYLE
+    """
+    document = [CHART_STYLE_VERSION, kind, (style or DEFAULT_CHART_STYLE).as_dict(), payload]
+    encoded = json.dumps(document, ensure_ascii=False, separators=(",", ":"), default=float)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    渲染结果缓存（线程安全）
+
+    参数：
+    - max_bytes: 内存中缓存图片的总字节数上限，0 表示不使用内存缓存
+    - cache_dir: 落盘目录，为空时只使用内存缓存
+    - disk_max_bytes: 磁盘上缓存图片的总字节数上限
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max(0, int(max_bytes))
+        self.cache_dir = cache_dir or None
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        # 磁盘上的图片: 文件名 -> 字节数, 按使用先后排列
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        # 同一图片同时只渲染一次, 其余调用方等待渲染结果
+        self._render_locks: Dict[str, threading.Lock] = {}
+
+        # 运行指标
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @classmethod
+    def from_env(cls) -> "ChartCache":
+        """根据环境变量创建图表缓存"""
+        return cls(
+            max_bytes=int(os.getenv("CHART_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            cache_dir=os.getenv("CHART_CACHE_DIR") or None,
+            disk_max_bytes=int(os.getenv("CHART_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+        )
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _put_memory(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def _scan_disk(self):
+        """读取落盘目录中已有的图片, 按修改时间恢复使用顺序, 超出上限时淘汰"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            # 跳过正在写入的临时文件
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+        with self._lock:
+            for _, name, size in sorted(files):
+                self._disk_entries[name] = size
+                self._disk_size += size
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """删除最久未使用的图片直到不超过上限（需持有 _lock）"""
+        while self._disk_size > self.disk_max_bytes and self._disk_entries:
+            name, size = self._disk_entries.popitem(last=False)
+            self._disk_size -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    def _load_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        with self._lock:
+            if key not in self._disk_entries:
+                return None
+            self._disk_entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                size = self._disk_entries.pop(key, None)
+                if size is not None:
+                    self._disk_size -= size
+            return None
+
+    def _save_disk(self, key: str, data: bytes):
+        if not self.cache_dir or len(data) > self.disk_max_bytes:
+            return
+        # 先写临时文件再原子替换, 避免并发读取到写了一半的图片
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            previous = self._disk_entries.pop(key, None)
+            if previous is not None:
+                self._disk_size -= previous
+            self._disk_entries[key] = len(data)
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取已缓存的图片（内存 -> 磁盘），不存在时返回 None"""
+        data = self._get_memory(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        data = self._load_disk(key)
+        if data is not None:
+            self.disk_hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """
+        获取缓存键（图片文件名）对应的图片, 不存在时调用 render() 渲染并缓存
+
+        返回：
+        - (图片内容, 来源)，来源为 "memory"、"disk" 或 "render"
+        """
+        data = self._get_memory(key)
+        if data is not None:
+            self.hits += 1
+            return data, "memory"
+
+        with self._lock:
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+        with render_lock:
+            try:
+                return self._load_or_render(key, render)
+            finally:
+                with self._lock:
+                    self._render_locks.pop(key, None)
+
+    def _load_or_render(self, key: str, render: Callable[[], bytes]) -> Tuple[bytes, str]:
+        # 等待期间其他线程可能已完成渲染
+        data = self._get_memory(key)
+        if data is not None:
+            self.hits += 1
+            return data, "memory"
+
+        data = self._load_disk(key)
+        if data is not None:
+            self.disk_hits += 1
+            self._put_memory(key, data)
+            return data, "disk"
+
+        data = render()
+        self.put(key, data)
+        return data, "render"
+
+    def put(self, key: str, data: bytes):
+        """写入新渲染的图片（内存 + 磁盘）"""
+        self.renders += 1
+        self._put_memory(key, data)
+        self._save_disk(key, data)
+
+    def clear(self):
+        """清空内存缓存（不删除磁盘上的图片）"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回图表缓存的运行指标"""
+        with self._lock:
+            entries, size = len(self._entries), self._size
+            disk_entries, disk_size = len(self._disk_entries), self._disk_size
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "cache_dir": self.cache_dir,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_size,
+            "disk_max_bytes": self.disk_max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+        }
+
+
+_cache: Optional[ChartCache] = None
+
+
+def get_chart_cache() -> ChartCache:
+    """获取全局图表缓存（首次调用时根据环境变量创建）"""
+    global _cache
+    if _cache is None:
+        _cache = ChartCache.from_env()
+    return _cache
+
+
+def configure_chart_cache(**kwargs) -> ChartCache:
+    """替换全局图表缓存，参数同 ChartCache"""
+    global _cache
+    _cache = ChartCache(**kwargs)
+    return _cache
+
+
+def chart_filename(key: str, style: Optional[ChartStyle] = None) -> str:
+    """缓存与 URL 中使用的图片文件名: {内容哈希}.{格式}"""
+    return f"{key}.{(style or DEFAULT_CHART_STYLE).format}"
+
+
+def render_cached(
+    kind: str,
+    render: Callable[..., bytes],
+    *payload: Any,
+    style: Optional[ChartStyle] = None,
+) -> Tuple[str, bytes]:
+    """
+    以内容哈希缓存 render(*payload, style=style) 的结果
+
+    返回：
+    - (图片文件名 {内容哈希}.{格式}, 图片内容)
+    """
+    style = style or DEFAULT_CHART_STYLE
+    name = chart_filename(chart_key(kind, *payload, style=style), style)
+    data, _ = get_chart_cache().get_or_render(name, lambda: render(*payload, style=style))
+    return name, data
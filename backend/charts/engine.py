@@ -0,0 +1,300 @@
+"""
+图表渲染引擎
+
+每种图表的静态部分（Figure、坐标轴、网格、刻度、标题、图例、字体）只在模板中构建一次，
+布局（tight_layout）也只在构建模板时计算一次；每次渲染只更新折线、填充与数值标注等
+数据相关的图元，再在模板自带的 Agg 画布上绘制并编码。
+
+模板直接使用 matplotlib.figure.Figure 与 FigureCanvasAgg，不经过 pyplot 的全局状态；
+模板池按线程隔离（每个线程只使用自己的模板），因此可在线程池中并发渲染。
+
+相关环境变量：
+- CHART_TEMPLATE_POOL_SIZE: 每个线程最多保留的图表模板数，0 表示不复用模板（每次新建），默认 8
+"""
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from charts.specs import PREDICTION_CHART_TITLE
+from charts.style import DEFAULT_CHART_STYLE, ChartStyle
+
+# 设置matplotlib的中文字体支持
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+LINE_CHART_FIGSIZE = (12, 6)
+RADAR_CHART_FIGSIZE = (8, 8)
+
+
+def _encode(figure: Figure, style: ChartStyle) -> bytes:
+    """在模板的画布上绘制并按输出样式编码"""
+    buffer = io.BytesIO()
+    figure.savefig(buffer, **style.savefig_kwargs())
+    return buffer.getvalue()
+
+
+class LineChartTemplate:
+    """预测趋势图模板: 历史数据（实线）、预测数据（虚线）、连接线与预测分界线"""
+
+    def __init__(self, figsize: Tuple[float, float], dpi: int):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        ax = self.ax = self.figure.add_subplot()
+        ax.xaxis_date()
+
+        # 绘制历史数据（实线）
+        self.history_line, = ax.plot([], [], color='#2E86AB', linewidth=2.5, marker='o', markersize=4,
+                                     label='实际数据', linestyle='-')
+        # 连接历史数据的最后一个点和预测数据的第一个点
+        self.connector, = ax.plot([], [], color='#A23B72', linewidth=2, linestyle='--', alpha=0.7)
+        # 绘制预测数据（虚线）
+        self.forecast_line, = ax.plot([], [], color='#A23B72', linewidth=2.5, marker='s', markersize=4,
+                                      label='预测数据', linestyle='--')
+
+        # 设置图表样式
+        ax.set_title(PREDICTION_CHART_TITLE, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('时间', fontsize=12)
+        ax.set_ylabel('综合评分', fontsize=12)
+        ax.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
+        ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True)
+        # 旋转时间标签以避免重叠
+        ax.tick_params(axis='x', labelrotation=45)
+
+        # 预测分界线与文本标注
+        self.divider = ax.axvline(x=0, color='gray', linestyle=':', alpha=0.7, linewidth=1)
+        self.divider_text = ax.text(0, 0, '预测开始', rotation=90, verticalalignment='top',
+                                    horizontalalignment='right', fontsize=9, alpha=0.7)
+
+        # 用示例数据确定一次布局, 之后的渲染沿用该布局
+        now = datetime(2025, 1, 1)
+        self.update(
+            [now + timedelta(days=i) for i in range(5)], [60.0, 65.0, 70.0, 72.0, 75.0],
+            [now + timedelta(days=i) for i in range(5, 10)], [76.0, 77.0, 78.0, 79.0, 80.0],
+            (55.0, 85.0),
+        )
+        self.figure.tight_layout()
+
+    def update(
+        self,
+        hist_times: Sequence[datetime],
+        hist_scores: Sequence[float],
+        forecast_times: Sequence[datetime],
+        forecast_scores: Sequence[float],
+        y_range: Tuple[float, float],
+    ):
+        """更新数据相关的图元"""
+        ax = self.ax
+        hist_x = mdates.date2num(hist_times)
+        forecast_x = mdates.date2num(forecast_times)
+        self.history_line.set_data(hist_x, hist_scores)
+        self.connector.set_data([hist_x[-1], forecast_x[0]], [hist_scores[-1], forecast_scores[0]])
+        self.forecast_line.set_data(forecast_x, forecast_scores)
+
+        # 预测分界线与文本标注（先于 relim 更新, 避免上一次的分界线位置影响坐标范围）
+        y_min, y_max = y_range
+        divider_x = hist_x[-1]
+        self.divider.set_xdata([divider_x, divider_x])
+        self.divider_text.set_position((divider_x, y_max - (y_max - y_min) * 0.1))
+
+        # 时间轴范围与格式
+        all_times = list(hist_times) + list(forecast_times)
+        time_range = max(all_times) - min(all_times)
+        ax.relim()
+        ax.autoscale_view(scalex=True, scaley=False)
+        if time_range.days > 30:
+            # 超过30天，按月显示
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+            ax.xaxis.set_major_locator(mdates.MonthLocator())
+        elif time_range.days > 7:
+            # 7-30天，按周显示
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+            ax.xaxis.set_major_locator(mdates.WeekdayLocator())
+        else:
+            # 7天以内，按天显示
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+            ax.xaxis.set_major_locator(mdates.DayLocator())
+
+        # 设置Y轴范围
+        ax.set_ylim(y_min, y_max)
+
+    def render(self, *args, style: ChartStyle) -> bytes:
+        self.update(*args)
+        return _encode(self.figure, style)
+
+
+class RadarChartTemplate:
+    """雷达图模板: 维度数、标题与配色固定, 每次只更新标签、折线、填充与数值标注"""
+
+    def __init__(self, n: int, title: str, color: str, alpha: float, figsize: Tuple[float, float], dpi: int):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        ax = self.ax = self.figure.add_subplot(projection='polar')
+
+        # 计算角度（闭合图形）
+        self.angles = [i / float(n) * 2 * math.pi for i in range(n)]
+        self.angles += self.angles[:1]
+
+        # 绘制数据
+        zeros = [0.0] * (n + 1)
+        self.line, = ax.plot(self.angles, zeros, 'o-', linewidth=2, color=color, markersize=6)
+        self.fill, = ax.fill(self.angles, zeros, alpha=alpha, color=color)
+
+        # 设置标签
+        ax.set_xticks(self.angles[:-1])
+        self.tick_labels = ax.set_xticklabels([''] * n, fontsize=12)
+
+        # 设置Y轴
+        ax.set_ylim(0, 100)
+        ax.set_yticks([20, 40, 60, 80, 100])
+        ax.set_yticklabels(['20', '40', '60', '80', '100'], fontsize=10, alpha=0.7)
+
+        # 添加网格与标题
+        ax.grid(True, alpha=0.3)
+        ax.set_title(title, size=16, fontweight='bold', pad=30)
+
+        # 在每个维度点上显示数值
+        self.value_texts = [
+            ax.text(angle, 0, '', ha='center', va='center', fontsize=10, fontweight='bold',
+                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
+            for angle in self.angles[:-1]
+        ]
+
+        # 用示例数据确定一次布局, 之后的渲染沿用该布局
+        self.update([f'维度{i + 1}' for i in range(n)], [50.0] * n)
+        self.figure.tight_layout()
+
+    def update(self, labels: Sequence[str], values: Sequence[float]):
+        """更新数据相关的图元, values 需已限制在 0-100 内"""
+        closed = list(values) + list(values[:1])
+        self.line.set_ydata(closed)
+        self.fill.set_xy(np.column_stack([self.angles, closed]))
+        for tick_label, label in zip(self.tick_labels, labels):
+            tick_label.set_text(label)
+        for text, angle, value in zip(self.value_texts, self.angles, values):
+            # 稍微向外偏移, 超出边界时改为向内
+            y_pos = value + 5
+            if y_pos > 100:
+                y_pos = value - 8
+            text.set_position((angle, y_pos))
+            text.set_text(f'{value:.0f}')
+
+    def render(self, *args, style: ChartStyle) -> bytes:
+        self.update(*args)
+        return _encode(self.figure, style)
+
+
+class TemplatePool:
+    """
+    按线程隔离的图表模板池（每个线程内按 LRU 保留最多 max_templates 个模板）
+
+    参数：
+    - max_templates: 每个线程最多保留的模板数，0 表示不复用模板
+    """
+
+    def __init__(self, max_templates: int = 8):
+        self.max_templates = max(0, int(max_templates))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self.hits = 0
+        self.builds = 0
+
+    @classmethod
+    def from_env(cls) -> "TemplatePool":
+        """根据环境变量创建模板池"""
+        return cls(max_templates=int(os.getenv("CHART_TEMPLATE_POOL_SIZE", "8")))
+
+    def _templates(self) -> "OrderedDict[Tuple, Any]":
+        templates = getattr(self._local, "templates", None)
+        if templates is None:
+            templates = self._local.templates = OrderedDict()
+        return templates
+
+    def get(self, key: Tuple, build) -> Any:
+        """获取当前线程中 key 对应的模板, 不存在时调用 build() 构建"""
+        if self.max_templates == 0:
+            with self._lock:
+                self.builds += 1
+            return build()
+        templates = self._templates()
+        template = templates.get(key)
+        if template is not None:
+            templates.move_to_end(key)
+            with self._lock:
+                self.hits += 1
+            return template
+        template = build()
+        templates[key] = template
+        while len(templates) > self.max_templates:
+            templates.popitem(last=False)
+        with self._lock:
+            self.builds += 1
+        return template
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"max_templates": self.max_templates, "hits": self.hits, "builds": self.builds}
+
+
+_pool: Optional[TemplatePool] = None
+
+
+def get_template_pool() -> TemplatePool:
+    """获取全局模板池（首次调用时根据环境变量创建）"""
+    global _pool
+    if _pool is None:
+        _pool = TemplatePool.from_env()
+    return _pool
+
+
+def configure_template_pool(**kwargs) -> TemplatePool:
+    """替换全局模板池，参数同 TemplatePool"""
+    global _pool
+    _pool = TemplatePool(**kwargs)
+    return _pool
+
+
+def render_line_chart(
+    hist_times: Sequence[datetime],
+    hist_scores: Sequence[float],
+    forecast_times: Sequence[datetime],
+    forecast_scores: Sequence[float],
+    y_range: Tuple[float, float],
+    style: Optional[ChartStyle] = None,
+) -> bytes:
+    """使用当前线程的模板渲染预测趋势图"""
+    style = style or DEFAULT_CHART_STYLE
+    figsize = style.figsize(LINE_CHART_FIGSIZE)
+    template = get_template_pool().get(
+        ("line", figsize, style.dpi), lambda: LineChartTemplate(figsize, style.dpi)
+    )
+    return template.render(hist_times, hist_scores, forecast_times, forecast_scores, y_range, style=style)
+
+
+def render_radar_chart(
+    labels: List[str],
+    values: List[float],
+    title: str,
+    color: str,
+    alpha: float,
+    style: Optional[ChartStyle] = None,
+) -> bytes:
+    """使用当前线程的模板渲染雷达图, values 需已限制在 0-100 内"""
+    style = style or DEFAULT_CHART_STYLE
+    figsize = style.figsize(RADAR_CHART_FIGSIZE)
+    key = ("radar", len(labels), title, color, alpha, figsize, style.dpi)
+    template = get_template_pool().get(
+        key, lambda: RadarChartTemplate(len(labels), title, color, alpha, figsize, style.dpi)
+    )
+    return template.render(labels, values, style=style)
@@ -1,162 +1,54 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import base64
-import io
-from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
-# 设置matplotlib的中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
+from charts.engine import render_line_chart
+from charts.specs import parse_prediction_series, score_range
+from charts.style import DEFAULT_CHART_STYLE, ChartStyle
 
 
-def plot_prediction_chart(history: Dict[str, float], forecast: Dict[str, float]) -> str:
+def render_prediction_chart(
+    history: Dict[str, float],
+    forecast: Dict[str, float],
+    style: Optional[ChartStyle] = None,
+) -> bytes:
     """
     绘制预测图表，包含历史数据（实线）和预测数据（虚线）
     
     参数：
     - history: dict，历史数据，格式为 {时间戳字符串: 得分}
     - forecast: dict，预测数据，格式为 {时间戳字符串: 得分}
+    - style: 输出样式（格式、dpi、像素尺寸、压缩参数），默认为 DEFAULT_CHART_STYLE
     
     返回：
-    - str: base64编码的图片字符串
+    - bytes: 图片内容
     """
+    style = style or DEFAULT_CHART_STYLE
     
-    # 数据验证
-    if not history:
-        raise ValueError("历史数据不能为空")
-    if not forecast:
-        raise ValueError("预测数据不能为空")
-    
-    # 转换数据格式
-    hist_times = []
-    hist_scores = []
-    for time_str, score in history.items():
-        try:
-            hist_times.append(datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S'))
-            hist_scores.append(float(score))
-        except ValueError:
-            # 如果解析失败，尝试其他格式
-            try:
-                hist_times.append(datetime.strptime(time_str, '%Y-%m-%d'))
-                hist_scores.append(float(score))
-            except ValueError:
-                continue
-    
-    forecast_times = []
-    forecast_scores = []
-    for time_str, score in forecast.items():
-        try:
-            forecast_times.append(datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S'))
-            forecast_scores.append(float(score))
-        except ValueError:
-            try:
-                forecast_times.append(datetime.strptime(time_str, '%Y-%m-%d'))
-                forecast_scores.append(float(score))
-            except ValueError:
-                continue
-    
-    if not hist_times or not forecast_times:
-        raise ValueError("无法解析时间数据")
-    
-    # 创建图表
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    # 绘制历史数据（实线）
-    ax.plot(hist_times, hist_scores, 
-            color='#2E86AB', 
-            linewidth=2.5, 
-            marker='o', 
-            markersize=4,
-            label='实际数据', 
-            linestyle='-')
-    
-    # 绘制预测数据（虚线）
-    # 连接历史数据的最后一个点和预测数据的第一个点
-    if hist_times and forecast_times:
-        # 连接线
-        ax.plot([hist_times[-1], forecast_times[0]], 
-                [hist_scores[-1], forecast_scores[0]], 
-                color='#A23B72', 
-                linewidth=2,
-                linestyle='--',
-                alpha=0.7)
-    
-    ax.plot(forecast_times, forecast_scores, 
-            color='#A23B72', 
-            linewidth=2.5, 
-            marker='s', 
-            markersize=4,
-            label='预测数据', 
-            linestyle='--')
-    
-    # 设置图表样式
-    ax.set_title('焊缝质量预测趋势图', fontsize=16, fontweight='bold', pad=20)
-    ax.set_xlabel('时间', fontsize=12)
-    ax.set_ylabel('综合评分', fontsize=12)
-    
-    # 设置网格
-    ax.grid(True, alpha=0.3, linestyle='-', linewidth=0.5)
-    
-    # 设置图例
-    ax.legend(loc='upper left', frameon=True, fancybox=True, shadow=True)
-    
-    # 设置时间轴格式
-    all_times = hist_times + forecast_times
-    time_range = max(all_times) - min(all_times)
-    
-    if time_range.days > 30:
-        # 超过30天，按月显示
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-        ax.xaxis.set_major_locator(mdates.MonthLocator())
-    elif time_range.days > 7:
-        # 7-30天，按周显示
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        ax.xaxis.set_major_locator(mdates.WeekdayLocator())
-    else:
-        # 7天以内，按天显示
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        ax.xaxis.set_major_locator(mdates.DayLocator())
-    
-    # 旋转时间标签以避免重叠
-    plt.xticks(rotation=45)
+    # 数据验证与格式转换
+    hist_times, hist_scores, forecast_times, forecast_scores = parse_prediction_series(history, forecast)
     
-    # 设置Y轴范围
-    all_scores = hist_scores + forecast_scores
-    y_min = max(0, min(all_scores) - 5)
-    y_max = min(100, max(all_scores) + 5)
-    ax.set_ylim(y_min, y_max)
-    
-    # 添加预测分界线
-    if hist_times and forecast_times:
-        divider_x = hist_times[-1]
-        ax.axvline(x=divider_x, color='gray', linestyle=':', alpha=0.7, linewidth=1)
-        
-        # 添加文本标注
-        ax.text(divider_x, y_max - (y_max - y_min) * 0.1, 
-                '预测开始', 
-                rotation=90, 
-                verticalalignment='top',
-                horizontalalignment='right',
-                fontsize=9,
-                alpha=0.7)
-    
-    # 调整布局
-    plt.tight_layout()
-    
-    # 将图片转换为base64字符串
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-    buffer.seek(0)
-    
-    # 编码为base64
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    # 使用当前线程的图表模板渲染
+    y_range = score_range(hist_scores + forecast_scores)
+    return render_line_chart(hist_times, hist_scores, forecast_times, forecast_scores, y_range, style)
+
+
+def plot_prediction_chart(
+    history: Dict[str, float],
+    forecast: Dict[str, float],
+    style: Optional[ChartStyle] = None,
+) -> str:
+    """
+    绘制预测图表并返回base64编码的图片
     
-    # 清理内存
-    plt.close(fig)
-    buffer.close()
+    参数：
+    - history: dict，历史数据，格式为 {时间戳字符串: 得分}
+    - forecast: dict，预测数据，格式为 {时间戳字符串: 得分}
+    - style: 输出样式，默认为 DEFAULT_CHART_STYLE
     
-    return image_base64
+    返回：
+    - str: base64编码的图片字符串
+    """
+    return base64.b64encode(render_prediction_chart(history, forecast, style)).decode('utf-8')
 
 
 def plot_prediction_chart_with_prefix(history: Dict[str, float], forecast: Dict[str, float]) -> str:
@@ -1,16 +1,22 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import base64
-import io
-from typing import Dict
-import math
-
-# 设置matplotlib的中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
-
-
-def _create_radar_chart_base(labels, values, title, color='#2E86AB', alpha=0.3):
+from typing import Dict, Optional
+
+from charts.engine import render_radar_chart
+from charts.specs import (
+    DEFECT_LABELS,
+    DEFECT_RADAR_COLOR,
+    DEFECT_RADAR_TITLE,
+    SKILL_LABELS,
+    SKILL_RADAR_COLOR,
+    SKILL_RADAR_TITLE,
+    generate_sample_data,
+    resolve_radar_values,
+)
+from charts.style import DEFAULT_CHART_STYLE, ChartStyle
+
+
+def _render_radar_chart(labels, values, title, color='#2E86AB', alpha=0.3, style: Optional[ChartStyle] = None) -> bytes:
     """
     创建雷达图的基础函数
     
@@ -20,10 +26,13 @@ def _create_radar_chart_base(labels, values, title, color='#2E86AB', alpha=0.3):
     - title: 图表标题
     - color: 填充颜色
     - alpha: 透明度
+    - style: 输出样式，默认为 DEFAULT_CHART_STYLE
     
     返回：
-    - base64编码的图片字符串
+    - 图片内容
     """
+    style = style or DEFAULT_CHART_STYLE
+    
     # 验证输入数据
     if not labels or not values:
         raise ValueError("标签和数值不能为空")
@@ -34,164 +43,82 @@ def _create_radar_chart_base(labels, values, title, color='#2E86AB', alpha=0.3):
     # 确保所有值在0-100范围内
     values = [max(0, min(100, float(v))) for v in values]
     
-    # 计算角度
-    N = len(labels)
-    angles = [n / float(N) * 2 * math.pi for n in range(N)]
-    angles += angles[:1]  # 闭合图形
-    
-    # 添加第一个值到末尾以闭合图形
-    values += values[:1]
-    
-    # 创建图表
-    fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
-    
-    # 绘制数据
-    ax.plot(angles, values, 'o-', linewidth=2, color=color, markersize=6)
-    ax.fill(angles, values, alpha=alpha, color=color)
-    
-    # 设置标签
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(labels, fontsize=12)
-    
-    # 设置Y轴
-    ax.set_ylim(0, 100)
-    ax.set_yticks([20, 40, 60, 80, 100])
-    ax.set_yticklabels(['20', '40', '60', '80', '100'], fontsize=10, alpha=0.7)
-    
-    # 添加网格
-    ax.grid(True, alpha=0.3)
-    
-    # 设置标题
-    plt.title(title, size=16, fontweight='bold', pad=30)
-    
-    # 在每个维度点上显示数值
-    for angle, value, label in zip(angles[:-1], values[:-1], labels):
-        # 计算文本位置
-        x_pos = angle
-        y_pos = value + 5  # 稍微向外偏移
-        
-        # 确保文本不超出边界
-        if y_pos > 100:
-            y_pos = value - 8
-        
-        ax.text(x_pos, y_pos, f'{value:.0f}', 
-                ha='center', va='center', 
-                fontsize=10, fontweight='bold',
-                bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
-    
-    # 调整布局
-    plt.tight_layout()
-    
-    # 转换为base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-    buffer.seek(0)
-    
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    # 清理内存
-    plt.close(fig)
-    buffer.close()
-    
-    return image_base64
+    # 使用当前线程的图表模板渲染
+    return render_radar_chart(labels, values, title, color, alpha, style)
+
+
+def _create_radar_chart_base(labels, values, title, color='#2E86AB', alpha=0.3, style: Optional[ChartStyle] = None):
+    """
+    创建雷达图的基础函数，返回base64编码的图片字符串（参数同 _render_radar_chart）
+    """
+    image_bytes = _render_radar_chart(labels, values, title, color=color, alpha=alpha, style=style)
+    return base64.b64encode(image_bytes).decode('utf-8')
 
 
-def plot_defect_radar(data: Dict[str, float]) -> str:
+def render_defect_radar(data: Dict[str, float], style: Optional[ChartStyle] = None) -> bytes:
     """
     绘制缺陷类别雷达图
     
     参数：
     - data: dict，缺陷数据，例如 {"气孔": 70, "夹渣": 50, ...}
             支持的维度：气孔、夹渣、未熔合、焊瘤、咬边、裂纹
+    - style: 输出样式，默认为 DEFAULT_CHART_STYLE
     
     返回：
-    - str: base64编码的图片字符串
+    - bytes: 图片内容
     """
-    # 定义标准维度
-    standard_labels = ['气孔', '夹渣', '未熔合', '焊瘤', '咬边', '裂纹']
+    # 按标准维度取值（全部为0时改用传入数据的前6项）
+    labels, values = resolve_radar_values(data, DEFECT_LABELS, "缺陷")
     
-    # 验证数据
-    if not data:
-        raise ValueError("缺陷数据不能为空")
-    
-    # 提取数值，如果某个维度缺失则使用0
-    values = []
-    for label in standard_labels:
-        values.append(data.get(label, 0))
-    
-    # 检查是否所有值都为0
-    if all(v == 0 for v in values):
-        # 如果所有标准维度都为0，使用传入数据的前6个
-        available_items = list(data.items())[:6]
-        if available_items:
-            labels = [item[0] for item in available_items]
-            values = [item[1] for item in available_items]
-            # 如果不足6个维度，用0补充
-            while len(labels) < 6:
-                labels.append(f'维度{len(labels)+1}')
-                values.append(0)
-        else:
-            raise ValueError("数据中没有有效的缺陷信息")
-    else:
-        labels = standard_labels
-    
-    return _create_radar_chart_base(
+    return _render_radar_chart(
         labels=labels,
         values=values,
-        title='焊缝缺陷分析雷达图',
-        color='#E74C3C',  # 红色系，表示缺陷
-        alpha=0.25
+        title=DEFECT_RADAR_TITLE,
+        color=DEFECT_RADAR_COLOR,
+        alpha=0.25,
+        style=style,
     )
 
 
-def plot_skill_radar(data: Dict[str, float]) -> str:
+def render_skill_radar(data: Dict[str, float], style: Optional[ChartStyle] = None) -> bytes:
     """
     绘制操作手法雷达图
     
     参数：
     - data: dict，手法数据，例如 {"速度": 80, "角度": 70, ...}
             支持的维度：速度、角度、深度、X光、平整度、光滑度
+    - style: 输出样式，默认为 DEFAULT_CHART_STYLE
     
     返回：
-    - str: base64编码的图片字符串
+    - bytes: 图片内容
     """
-    # 定义标准维度
-    standard_labels = ['速度', '角度', '深度', 'X光', '平整度', '光滑度']
-    
-    # 验证数据
-    if not data:
-        raise ValueError("手法数据不能为空")
-    
-    # 提取数值，如果某个维度缺失则使用0
-    values = []
-    for label in standard_labels:
-        values.append(data.get(label, 0))
+    # 按标准维度取值（全部为0时改用传入数据的前6项）
+    labels, values = resolve_radar_values(data, SKILL_LABELS, "手法")
     
-    # 检查是否所有值都为0
-    if all(v == 0 for v in values):
-        # 如果所有标准维度都为0，使用传入数据的前6个
-        available_items = list(data.items())[:6]
-        if available_items:
-            labels = [item[0] for item in available_items]
-            values = [item[1] for item in available_items]
-            # 如果不足6个维度，用0补充
-            while len(labels) < 6:
-                labels.append(f'维度{len(labels)+1}')
-                values.append(0)
-        else:
-            raise ValueError("数据中没有有效的手法信息")
-    else:
-        labels = standard_labels
-    
-    return _create_radar_chart_base(
+    return _render_radar_chart(
         labels=labels,
         values=values,
-        title='焊接操作手法雷达图',
-        color='#27AE60',  # 绿色系，表示技能
-        alpha=0.25
+        title=SKILL_RADAR_TITLE,
+        color=SKILL_RADAR_COLOR,
+        alpha=0.25,
+        style=style,
     )
 
 
+def plot_defect_radar(data: Dict[str, float], style: Optional[ChartStyle] = None) -> str:
+    """
+    绘制缺陷类别雷达图并返回base64编码的图片字符串
+    """
+    return base64.b64encode(render_defect_radar(data, style)).decode('utf-8')
+
+
+def plot_skill_radar(data: Dict[str, float], style: Optional[ChartStyle] = None) -> str:
+    """
+    绘制操作手法雷达图并返回base64编码的图片字符串
+    """
+    return base64.b64encode(render_skill_radar(data, style)).decode('utf-8')
+
+
 def plot_defect_radar_with_prefix(data: Dict[str, float]) -> str:
     """
     绘制缺陷雷达图并返回带有data URL前缀的base64字符串
@@ -208,33 +135,6 @@ def plot_skill_radar_with_prefix(data: Dict[str, float]) -> str:
     return f"data:image/png;base64,{base64_str}"
 
 
-def generate_sample_data():
-    """
-    生成示例数据用于测试
-    """
-    # 模拟缺陷数据
-    defect_data = {
-        '气孔': np.random.uniform(10, 90),
-        '夹渣': np.random.uniform(10, 90),
-        '未熔合': np.random.uniform(10, 90),
-        '焊瘤': np.random.uniform(10, 90),
-        '咬边': np.random.uniform(10, 90),
-        '裂纹': np.random.uniform(10, 90)
-    }
-    
-    # 模拟手法数据
-    skill_data = {
-        '速度': np.random.uniform(40, 95),
-        '角度': np.random.uniform(40, 95),
-        '深度': np.random.uniform(40, 95),
-        'X光': np.random.uniform(40, 95),
-        '平整度': np.random.uniform(40, 95),
-        '光滑度': np.random.uniform(40, 95)
-    }
-    
-    return defect_data, skill_data
-
-
 def test_radar_charts():
     """
     测试雷达图绘制功能
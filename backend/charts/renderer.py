@@ -0,0 +1,229 @@
+"""
+图表渲染进程池
+
+将图表渲染从事件循环中移出，交由一组常驻的渲染进程执行。渲染进程由预先导入了
+matplotlib 与图表模块的 forkserver 派生（不直接 fork 服务进程，避免继承其他线程持有的导入锁），
+启动时解析字体并以默认样式各渲染一次三种图表，构建好本进程的图表模板，
+之后的请求只需更新数据并编码。同一请求的三张图表并发提交、一起等待，期间事件循环可以继续处理其他请求。
+
+渲染前先按内容哈希查询图表缓存；同一张图片正在渲染时，其余请求等待同一个结果，不重复提交。
+
+相关环境变量：
+- CHART_RENDER_EXECUTOR: 执行模式，process 或 thread，默认 process
+- CHART_RENDER_WORKERS: 渲染进程/线程数，默认 3（三张图表可同时渲染）
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from charts.cache import chart_filename, chart_key, get_chart_cache
+from charts.style import DEFAULT_CHART_STYLE, ChartStyle
+
+RENDER_EXECUTOR_MODES = ("thread", "process")
+# forkserver 预先导入的模块, 渲染进程由其派生后无需重复导入
+# （包含 __main__: 否则每个渲染进程都会重新执行一次主模块）
+PRELOAD_MODULES = ["__main__", "charts.line_chart", "charts.radar_chart"]
+
+
+def _renderers():
+    from charts.line_chart import render_prediction_chart
+    from charts.radar_chart import render_defect_radar, render_skill_radar
+
+    return {
+        "line_chart": render_prediction_chart,
+        "defect_radar": render_defect_radar,
+        "skill_radar": render_skill_radar,
+    }
+
+
+def render_chart(kind: str, payload: Tuple[Any, ...], style: ChartStyle) -> bytes:
+    """在渲染进程中渲染一张图表（模块级函数, 可被 pickle）"""
+    return _renderers()[kind](*payload, style=style)
+
+
+def warm_up() -> int:
+    """导入 matplotlib、解析字体并以默认样式各渲染一次三种图表, 构建当前进程/线程的图表模板"""
+    history = {f"2025-01-0{day} 00:00:00": 60.0 + day for day in range(1, 6)}
+    forecast = {f"2025-01-0{day} 00:00:00": 70.0 + day for day in range(6, 9)}
+    render_chart("line_chart", (history, forecast), DEFAULT_CHART_STYLE)
+    render_chart("defect_radar", ({"气孔": 50.0},), DEFAULT_CHART_STYLE)
+    render_chart("skill_radar", ({"速度": 50.0},), DEFAULT_CHART_STYLE)
+    return os.getpid()
+
+
+class ChartRenderer:
+    """
+    图表渲染池
+
+    参数：
+    - mode: 执行模式，"process" 使用常驻的渲染进程，"thread" 使用线程池
+    - workers: 渲染进程/线程数
+    """
+
+    def __init__(self, mode: str = "process", workers: int = 3):
+        if mode not in RENDER_EXECUTOR_MODES:
+            raise ValueError(f"不支持的执行模式: {mode}，可选值: {RENDER_EXECUTOR_MODES}")
+
+        self.mode = mode
+        self.workers = max(1, int(workers))
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # 正在渲染的图片文件名 -> 渲染任务, 相同图片的并发请求共享同一个结果
+        self._pending: Dict[str, "asyncio.Future[bytes]"] = {}
+
+        # 运行指标
+        self._submitted = 0
+        self._shared = 0
+        self._cache_hits = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ChartRenderer":
+        """根据环境变量创建渲染池"""
+        return cls(
+            mode=os.getenv("CHART_RENDER_EXECUTOR", "process").lower(),
+            workers=int(os.getenv("CHART_RENDER_WORKERS", "3")),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        """懒加载底层执行器，避免导入阶段就拉起进程"""
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload(PRELOAD_MODULES)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=context, initializer=warm_up
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="chart-renderer"
+                    )
+            return self._executor
+
+    async def _submit(self, kind: str, payload: Tuple[Any, ...], style: ChartStyle) -> bytes:
+        self._submitted += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, render_chart, kind, payload, style)
+        except BrokenProcessPool:
+            # 渲染进程异常退出: 丢弃当前进程池, 下次提交时重新创建
+            self._failed += 1
+            self.shutdown(wait=False)
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._busy_seconds += time.perf_counter() - started
+
+    async def render(self, kind: str, *payload: Any, style: Optional[ChartStyle] = None) -> Tuple[str, bytes]:
+        """
+        渲染一张图表（输入与样式不变时直接读取图表缓存）
+
+        返回：
+        - (图片文件名 {内容哈希}.{格式}, 图片内容)
+        """
+        style = style or DEFAULT_CHART_STYLE
+        name = chart_filename(chart_key(kind, *payload, style=style), style)
+        cache = get_chart_cache()
+        data = cache.get(name)
+        if data is not None:
+            self._cache_hits += 1
+            return name, data
+
+        pending = self._pending.get(name)
+        if pending is not None:
+            self._shared += 1
+            return name, await asyncio.shield(pending)
+
+        # 渲染任务独立于当前请求: 请求被取消时渲染仍会完成并写入缓存, 供其他等待者使用
+        task = asyncio.ensure_future(self._render_and_store(name, kind, payload, style))
+        self._pending[name] = task
+        task.add_done_callback(lambda _: self._pending.pop(name, None))
+        return name, await asyncio.shield(task)
+
+    async def _render_and_store(self, name: str, kind: str, payload: Tuple[Any, ...], style: ChartStyle) -> bytes:
+        data = await self._submit(kind, payload, style)
+        get_chart_cache().put(name, data)
+        return data
+
+    async def render_many(
+        self, charts: Dict[str, Tuple[Any, ...]], style: Optional[ChartStyle] = None
+    ) -> Dict[str, Tuple[str, bytes]]:
+        """
+        并发渲染多张图表
+
+        参数：
+        - charts: {图表类型: 绘图输入}
+
+        返回：
+        - {图表类型: (图片文件名, 图片内容)}
+        """
+        results = await asyncio.gather(
+            *(self.render(kind, *payload, style=style) for kind, payload in charts.items())
+        )
+        return dict(zip(charts, results))
+
+    async def prestart(self):
+        """预先拉起全部渲染进程并完成预热（线程模式下提交同样数量的预热任务）"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, warm_up) for _ in range(self.workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回渲染池的运行指标"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "pending": len(self._pending),
+            "submitted": self._submitted,
+            "shared": self._shared,
+            "cache_hits": self._cache_hits,
+            "failed": self._failed,
+            "busy_seconds": round(self._busy_seconds, 3),
+        }
+
+    def shutdown(self, wait: bool = True):
+        """关闭底层执行器"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+_renderer: Optional[ChartRenderer] = None
+
+
+def get_chart_renderer() -> ChartRenderer:
+    """获取全局图表渲染池（首次调用时根据环境变量创建）"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer.from_env()
+    return _renderer
+
+
+def configure_chart_renderer(**kwargs) -> ChartRenderer:
+    """替换全局图表渲染池，参数同 ChartRenderer"""
+    global _renderer
+    if _renderer is not None:
+        _renderer.shutdown(wait=False)
+    _renderer = ChartRenderer(**kwargs)
+    return _renderer
+
+
+def shutdown_chart_renderer(wait: bool = True):
+    """关闭全局图表渲染池"""
+    global _renderer
+    if _renderer is not None:
+        _renderer.shutdown(wait=wait)
+        _renderer = None
@@ -0,0 +1,177 @@
+"""
+图表数据（不依赖 matplotlib）
+
+整理三张图表的绘图输入：解析趋势图的时间/得分序列，确定雷达图的维度标签与数值。
+图片渲染（line_chart、radar_chart）与前端绘图模式（format=data）共用这里的结果，
+format=data 时直接返回紧凑的图表描述，由前端绘制，服务端不调用 matplotlib。
+雷达图的示例数据（generate_sample_data）也在这里生成。
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+PREDICTION_CHART_TITLE = '焊缝质量预测趋势图'
+DEFECT_RADAR_TITLE = '焊缝缺陷分析雷达图'
+SKILL_RADAR_TITLE = '焊接操作手法雷达图'
+DEFECT_RADAR_COLOR = '#E74C3C'  # 红色系，表示缺陷
+SKILL_RADAR_COLOR = '#27AE60'  # 绿色系，表示技能
+
+# 雷达图的标准维度
+DEFECT_LABELS = ['气孔', '夹渣', '未熔合', '焊瘤', '咬边', '裂纹']
+SKILL_LABELS = ['速度', '角度', '深度', 'X光', '平整度', '光滑度']
+
+
+def parse_series(series: Dict[str, float]) -> Tuple[List[datetime], List[float]]:
+    """
+    将 {时间戳字符串: 得分} 解析为时间与得分序列
+
+    支持 "%Y-%m-%d %H:%M:%S" 与 "%Y-%m-%d" 两种格式，无法解析的时间点被跳过。
+    """
+    times = []
+    scores = []
+    for time_str, score in series.items():
+        try:
+            times.append(datetime.strptime(time_str, TIME_FORMAT))
+            scores.append(float(score))
+        except ValueError:
+            # 如果解析失败，尝试其他格式
+            try:
+                times.append(datetime.strptime(time_str, '%Y-%m-%d'))
+                scores.append(float(score))
+            except ValueError:
+                continue
+    return times, scores
+
+
+def parse_prediction_series(history: Dict[str, float], forecast: Dict[str, float]):
+    """
+    校验并解析趋势图的历史与预测序列
+
+    返回：
+    - (历史时间, 历史得分, 预测时间, 预测得分)
+    """
+    if not history:
+        raise ValueError("历史数据不能为空")
+    if not forecast:
+        raise ValueError("预测数据不能为空")
+
+    hist_times, hist_scores = parse_series(history)
+    forecast_times, forecast_scores = parse_series(forecast)
+    if not hist_times or not forecast_times:
+        raise ValueError("无法解析时间数据")
+    return hist_times, hist_scores, forecast_times, forecast_scores
+
+
+def score_range(scores: List[float]) -> Tuple[float, float]:
+    """趋势图的Y轴范围: 得分范围上下各留 5 分, 限制在 0-100 内"""
+    return max(0, min(scores) - 5), min(100, max(scores) + 5)
+
+
+def resolve_radar_values(data: Dict[str, float], standard_labels: List[str], name: str):
+    """
+    确定雷达图的维度标签与数值
+
+    按标准维度取值，缺失的维度记为 0；所有标准维度都为 0 时改用传入数据的前 6 项，不足 6 项时用 0 补齐。
+
+    参数：
+    - data: 维度数据
+    - standard_labels: 标准维度
+    - name: 数据名称，用于错误信息，如 "缺陷"
+
+    返回：
+    - (标签列表, 数值列表)
+    """
+    if not data:
+        raise ValueError(f"{name}数据不能为空")
+
+    # 提取数值，如果某个维度缺失则使用0
+    values = [data.get(label, 0) for label in standard_labels]
+
+    # 检查是否所有值都为0
+    if not all(v == 0 for v in values):
+        return list(standard_labels), values
+
+    # 如果所有标准维度都为0，使用传入数据的前6个
+    available_items = list(data.items())[:6]
+    if not available_items:
+        raise ValueError(f"数据中没有有效的{name}信息")
+    labels = [item[0] for item in available_items]
+    values = [item[1] for item in available_items]
+    # 如果不足6个维度，用0补充
+    while len(labels) < 6:
+        labels.append(f'维度{len(labels)+1}')
+        values.append(0)
+    return labels, values
+
+
+def prediction_chart_spec(history: Dict[str, float], forecast: Dict[str, float]) -> Dict[str, Any]:
+    """趋势图的数据描述: 历史与预测的时间、得分数组, Y轴范围与预测分界点"""
+    hist_times, hist_scores, forecast_times, forecast_scores = parse_prediction_series(history, forecast)
+    y_min, y_max = score_range(hist_scores + forecast_scores)
+    return {
+        "type": "line",
+        "title": PREDICTION_CHART_TITLE,
+        "history": {"t": [t.strftime(TIME_FORMAT) for t in hist_times], "score": hist_scores},
+        "forecast": {"t": [t.strftime(TIME_FORMAT) for t in forecast_times], "score": forecast_scores},
+        "y_range": [y_min, y_max],
+        "divider": hist_times[-1].strftime(TIME_FORMAT),
+    }
+
+
+def _radar_spec(labels: List[str], values: List[float], title: str, color: str) -> Dict[str, Any]:
+    return {
+        "type": "radar",
+        "title": title,
+        "color": color,
+        "labels": labels,
+        # 与图片相同: 数值限制在 0-100 内
+        "values": [round(max(0, min(100, float(v))), 2) for v in values],
+    }
+
+
+def defect_radar_spec(data: Dict[str, float]) -> Dict[str, Any]:
+    """缺陷雷达图的数据描述: 维度标签与数值"""
+    labels, values = resolve_radar_values(data, DEFECT_LABELS, "缺陷")
+    return _radar_spec(labels, values, DEFECT_RADAR_TITLE, DEFECT_RADAR_COLOR)
+
+
+def skill_radar_spec(data: Dict[str, float]) -> Dict[str, Any]:
+    """操作手法雷达图的数据描述: 维度标签与数值"""
+    labels, values = resolve_radar_values(data, SKILL_LABELS, "手法")
+    return _radar_spec(labels, values, SKILL_RADAR_TITLE, SKILL_RADAR_COLOR)
+
+
+def generate_sample_data(seed: Optional[int] = None):
+    """
+    生成示例数据用于测试
+
+    参数：
+    - seed: 随机种子; 指定时使用独立的随机数生成器, 相同种子得到相同的数据
+      （图表内容不变, 可命中图表缓存）, 不影响全局随机状态
+    """
+    rng = np.random.RandomState(seed) if seed is not None else np.random
+
+    # 模拟缺陷数据
+    defect_data = {
+        '气孔': rng.uniform(10, 90),
+        '夹渣': rng.uniform(10, 90),
+        '未熔合': rng.uniform(10, 90),
+        '焊瘤': rng.uniform(10, 90),
+        '咬边': rng.uniform(10, 90),
+        '裂纹': rng.uniform(10, 90)
+    }
+    
+    # 模拟手法数据
+    skill_data = {
+        '速度': rng.uniform(40, 95),
+        '角度': rng.uniform(40, 95),
+        '深度': rng.uniform(40, 95),
+        'X光': rng.uniform(40, 95),
+        '平整度': rng.uniform(40, 95),
+        '光滑度': rng.uniform(40, 95)
+    }
+    
+    return defect_data, skill_data
@@ -0,0 +1,80 @@
+"""
+图表输出样式
+
+控制图表的输出格式、分辨率、像素尺寸与压缩参数。默认值与前端展示尺寸匹配：
+dpi=100 时趋势图为 1200×600 像素、雷达图为 800×800 像素，
+已高于仪表盘中的显示尺寸（趋势图高约 320 像素、雷达图高约 256 像素）。
+"""
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# 支持的输出格式及其 MIME 类型
+CHART_FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+@dataclass(frozen=True)
+class ChartStyle:
+    """
+    图表输出样式
+
+    参数：
+    - format: 输出格式, png、webp 或 svg
+    - dpi: 每英寸像素数
+    - width: 输出宽度（像素）, 为空时使用图表的默认尺寸
+    - height: 输出高度（像素）, 为空时按图表默认的宽高比由 width 推算
+    - compress_level: PNG 压缩等级 0-9, 越大文件越小、编码越慢
+    - quality: WebP 质量 1-100
+    """
+    format: str = "png"
+    dpi: int = 100
+    width: Optional[int] = None
+    height: Optional[int] = None
+    compress_level: int = 6
+    quality: int = 80
+
+    def __post_init__(self):
+        if self.format not in CHART_FORMATS:
+            raise ValueError(f"不支持的图片格式: {self.format}，可选值: {tuple(CHART_FORMATS)}")
+        if self.dpi <= 0:
+            raise ValueError("dpi 必须为正数")
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError("PNG 压缩等级需在 0-9 之间")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("WebP 质量需在 1-100 之间")
+
+    @property
+    def media_type(self) -> str:
+        return CHART_FORMATS[self.format]
+
+    @property
+    def fixed_size(self) -> bool:
+        """是否指定了像素尺寸"""
+        return self.width is not None or self.height is not None
+
+    def figsize(self, default: Tuple[float, float]) -> Tuple[float, float]:
+        """根据像素尺寸计算图表尺寸（英寸）, 未指定时返回 default"""
+        if not self.fixed_size:
+            return default
+        aspect = default[1] / default[0]
+        width = self.width if self.width is not None else self.height / aspect
+        height = self.height if self.height is not None else width * aspect
+        return width / self.dpi, height / self.dpi
+
+    def savefig_kwargs(self) -> Dict[str, Any]:
+        """传给 Figure.savefig 的参数（布局由图表模板确定, 输出严格为 figsize × dpi）"""
+        kwargs: Dict[str, Any] = {"format": self.format, "dpi": self.dpi}
+        if self.format == "png":
+            kwargs["pil_kwargs"] = {"compress_level": self.compress_level}
+        elif self.format == "webp":
+            kwargs["pil_kwargs"] = {"quality": self.quality}
+        return kwargs
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+DEFAULT_CHART_STYLE = ChartStyle()
@@ -1,14 +1,17 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# 数据库文件路径
-SQLALCHEMY_DATABASE_URL = "sqlite:///./welding.db"
+# 数据库文件路径（可通过环境变量 DATABASE_URL 覆盖，便于压测时使用独立数据库）
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./welding.db")
 
 # 创建数据库引擎
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False} # "check_same_thread" is only needed for SQLite.
+    # "check_same_thread" is only needed for SQLite.
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 )
 
 # 创建数据库会话
@@ -16,3 +19,26 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # 创建ORM模型的基础类
 Base = declarative_base()
+
+
+def init_database(bind=None):
+    """
+    创建数据库表, 并为已存在的表补建新增的可空列与索引（create_all 不会修改已存在的表）
+
+    在服务启动（main.py 的 lifespan）或命令行工具开始时调用一次, 不在模块导入时执行,
+    避免渲染进程等预加载 __main__ 的子进程重复迁移。
+    """
+    import models
+
+    bind = bind or engine
+    models.Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    for table in models.Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns and column.nullable:
+                column_type = column.type.compile(dialect=bind.dialect)
+                with bind.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
@@ -0,0 +1,282 @@
+"""
+全体学员的批量并行预测
+
+随机森林的训练是 CPU 密集且持有 GIL 的, 这里把各学员的 predict_future_scores
+分块分发到进程池中并行执行。每块学员的历史以紧凑的 NumPy 数组传给工作进程
+（时间戳 int64、x/y/z/score float64 拼接为一个矩阵, 再加每个学员的起止偏移），
+不传递 DataFrame; 工作进程只返回预测部分。全部完成后在单个事务中批量写入 forecast_snapshots
+（连同参与预测的历史, /predict 读取快照时无需再查询记录）, 并删除每个学员最新若干份以外的旧快照。
+
+用法（在 backend 目录下）：
+    python -m forecasting.batch --days 5 --workers 4
+
+相关环境变量：
+- FORECAST_BATCH_WORKERS: 工作进程数，默认 CPU 核数
+- FORECAST_BATCH_CHUNK_SIZE: 单次分发给工作进程的最大学员数，默认 64
+- FORECAST_SNAPSHOT_KEEP: 每个学员保留的最新快照数，默认 3
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import models
+from forecasting.history import load_student_histories
+
+VALUE_COLUMNS = ["x", "y", "z", "score"]
+
+# forkserver 预先导入的模块: 工作进程由干净的 forkserver 派生, 不继承 Web 服务进程中的线程与锁,
+# 也无需各自重新导入 sklearn（包含 __main__, 见 charts/renderer.py）
+PRELOAD_MODULES = ["__main__", "prediction"]
+
+
+class PackedHistories:
+    """
+    多个学员历史的紧凑表示
+
+    - student_ids: 学员标识列表
+    - times: 全部记录的时间戳（datetime64[ns] 的 int64 表示）
+    - values: 全部记录的 [x, y, z, score] 矩阵（float64）
+    - offsets: 第 i 个学员的记录为 [offsets[i], offsets[i + 1])
+    """
+
+    def __init__(self, student_ids: List[str], times: np.ndarray, values: np.ndarray, offsets: np.ndarray):
+        self.student_ids = student_ids
+        self.times = times
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, histories: Dict[str, pd.DataFrame]) -> "PackedHistories":
+        student_ids = list(histories)
+        frames = [histories[student_id] for student_id in student_ids]
+        lengths = [len(frame) for frame in frames]
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if frames:
+            times = np.concatenate([frame["t"].to_numpy(dtype="datetime64[ns]") for frame in frames]).view(np.int64)
+            values = np.concatenate([frame[VALUE_COLUMNS].to_numpy(dtype=np.float64) for frame in frames])
+        else:
+            times = np.empty(0, dtype=np.int64)
+            values = np.empty((0, len(VALUE_COLUMNS)), dtype=np.float64)
+        return cls(student_ids, times, values, offsets)
+
+    def chunk(self, start: int, stop: int) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """第 [start, stop) 个学员的数据, 偏移量从 0 开始"""
+        begin, end = self.offsets[start], self.offsets[stop]
+        return (
+            self.student_ids[start:stop],
+            self.times[begin:end],
+            self.values[begin:end],
+            self.offsets[start:stop + 1] - begin,
+        )
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+
+def _forecast_chunk(student_ids: List[str], times: np.ndarray, values: np.ndarray, offsets: np.ndarray, days: int):
+    """
+    工作进程中执行: 逐个学员还原数据框并预测
+
+    返回：
+    - [(student_id, forecast 或 None, 错误信息或 None)]
+    """
+    from prediction import predict_future_scores
+
+    results = []
+    for i, student_id in enumerate(student_ids):
+        begin, end = offsets[i], offsets[i + 1]
+        frame = pd.DataFrame({
+            "t": times[begin:end].view("datetime64[ns]"),
+            **{col: values[begin:end, j] for j, col in enumerate(VALUE_COLUMNS)},
+        })
+        try:
+            results.append((student_id, predict_future_scores(frame, days=days)["forecast"], None))
+        except Exception as e:
+            results.append((student_id, None, str(e) or type(e).__name__))
+    return results
+
+
+def forecast_histories(
+    histories: Dict[str, pd.DataFrame],
+    days: int = 5,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Tuple[Optional[Dict[str, float]], Optional[str]]]:
+    """
+    在进程池中并行预测多个学员
+
+    参数：
+    - histories: {student_id: DataFrame[t, x, y, z, score]}
+    - days: 预测天数
+    - workers: 工作进程数, 1 表示在当前进程中顺序执行
+    - chunk_size: 单次分发的最大学员数
+
+    返回：
+    - {student_id: (forecast 或 None, 错误信息或 None)}
+    """
+    workers = max(1, int(workers or os.getenv("FORECAST_BATCH_WORKERS") or os.cpu_count() or 1))
+    chunk_size = max(1, int(chunk_size or os.getenv("FORECAST_BATCH_CHUNK_SIZE", "64")))
+    packed = PackedHistories.pack(histories)
+    # 每个工作进程至少分到约 4 块, 使各进程的负载大致均衡
+    chunk_size = max(1, min(chunk_size, -(-len(packed) // (workers * 4))))
+    bounds = [(start, min(start + chunk_size, len(packed))) for start in range(0, len(packed), chunk_size)]
+
+    results: Dict[str, Tuple[Optional[Dict[str, float]], Optional[str]]] = {}
+    if workers == 1:
+        for start, stop in bounds:
+            for student_id, forecast, error in _forecast_chunk(*packed.chunk(start, stop), days):
+                results[student_id] = (forecast, error)
+        return results
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(_forecast_chunk, *packed.chunk(start, stop), days) for start, stop in bounds]
+        for future in as_completed(futures):
+            for student_id, forecast, error in future.result():
+                results[student_id] = (forecast, error)
+    return results
+
+
+def snapshot_keep() -> int:
+    """读取 FORECAST_SNAPSHOT_KEEP 环境变量（至少保留 1 份）"""
+    return max(1, int(os.getenv("FORECAST_SNAPSHOT_KEEP", "3")))
+
+
+def prune_forecast_snapshots(db: Session, student_ids: Iterable[str], keep: Optional[int] = None) -> int:
+    """
+    删除学员最新 keep 份以外的旧快照（不提交事务），返回删除的快照数
+
+    每个学员按 (student_id, id) 索引取第 keep 新的快照 ID, 删除更早的快照。
+    """
+    keep = keep or snapshot_keep()
+    snapshot = models.ForecastSnapshot
+    deleted = 0
+    for student_id in student_ids:
+        cutoff = (
+            select(snapshot.id)
+            .where(snapshot.student_id == student_id)
+            .order_by(snapshot.id.desc())
+            .offset(keep - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = db.execute(delete(snapshot).where(snapshot.student_id == student_id, snapshot.id < cutoff))
+        deleted += result.rowcount or 0
+    return deleted
+
+
+def save_forecast_snapshots(
+    db: Session,
+    histories: Dict[str, pd.DataFrame],
+    results: Dict[str, Tuple[Optional[Dict[str, float]], Optional[str]]],
+    days: int,
+    mode: str = "rf",
+    source: str = "records",
+) -> int:
+    """
+    在单个事务中批量写入成功的预测结果（连同参与预测的历史）并清理这些学员的旧快照,
+    返回写入的快照数
+    """
+    from prediction import format_history
+
+    created_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    rows = []
+    for student_id, (forecast, error) in results.items():
+        if forecast is None:
+            continue
+        history = histories[student_id].sort_values("t", kind="stable")
+        rows.append({
+            "student_id": student_id,
+            "created_at": created_at,
+            "mode": mode,
+            "days": days,
+            "history_points": len(history),
+            "last_record_time": history["t"].iloc[-1].to_pydatetime(),
+            "forecast": forecast,
+            "history": format_history(history),
+            "source": source,
+        })
+    if not rows:
+        return 0
+    try:
+        db.execute(insert(models.ForecastSnapshot), rows)
+        prune_forecast_snapshots(db, [row["student_id"] for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def run_batch_forecast(
+    db: Session,
+    student_ids: Optional[Iterable[str]] = None,
+    days: int = 5,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    批量预测并写入快照: 单次查询读取历史 -> 进程池并行预测 -> 单个事务写入
+
+    返回：
+    - 任务摘要（学员数、成功/失败数、各阶段耗时、失败学员的错误信息）
+    """
+    started = time.perf_counter()
+    histories = load_student_histories(db, student_ids=student_ids)
+    loaded = time.perf_counter()
+    results = forecast_histories(histories, days=days, workers=workers)
+    forecasted = time.perf_counter()
+    saved = save_forecast_snapshots(db, histories, results, days=days)
+    finished = time.perf_counter()
+
+    errors = {student_id: error for student_id, (_, error) in results.items() if error is not None}
+    return {
+        "students": len(histories),
+        "succeeded": saved,
+        "failed": len(errors),
+        "errors": errors,
+        "days": days,
+        "load_seconds": round(loaded - started, 3),
+        "forecast_seconds": round(forecasted - loaded, 3),
+        "save_seconds": round(finished - forecasted, 3),
+        "total_seconds": round(finished - started, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="全体学员批量预测")
+    parser.add_argument("--days", type=int, default=5, help="预测天数")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认 CPU 核数")
+    parser.add_argument("--student", action="append", dest="student_ids", help="只预测指定学员，可重复")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, init_database
+
+    init_database()
+    db = SessionLocal()
+    try:
+        summary = run_batch_forecast(db, student_ids=args.student_ids, days=args.days, workers=args.workers)
+    finally:
+        db.close()
+    print(
+        f"学员 {summary['students']} 个, 成功 {summary['succeeded']}, 失败 {summary['failed']}, "
+        f"读取 {summary['load_seconds']}s, 预测 {summary['forecast_seconds']}s, 写入 {summary['save_seconds']}s"
+    )
+    for student_id, error in summary["errors"].items():
+        print(f"  {student_id}: {error}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+预测特征库
+
+把 predict_future_scores 使用的派生特征（时间特征、score/x/y/z 的滞后、3 点移动平均）
+按学员物化为按行连续存储的特征矩阵，新记录到来时只为新增的行计算特征并追加，
+预测时直接返回已物化行的只读视图，不再对整段历史重复 shift / rolling / dt 计算，也不复制矩阵。
+
+特征使用 float64 而不是 float32：训练特征与请求中重算的特征必须逐位相同，
+模型注册表的训练数据指纹与随机森林的分裂阈值才会一致, 降为 float32 会改变预测结果。
+
+/detect 与批量写入记录后调用 append_records 把新记录直接追加到已缓存学员的特征上,
+此时每条记录的代价为 O(1)。读取时（features_for）只检查传入历史的首行与已物化部分的末行,
+并只转换与计算新增的行, 代价与历史长度无关; 首行或末行不一致（历史被修改或删除）、
+或新增的行早于已物化的行时, 该学员的特征整体重建。记录表只追加不修改, 修改已有记录后需调用 invalidate。
+每个学员持有自己的锁, 不同学员的特征计算互不阻塞; 单个进程内按 LRU 保留最多 max_students 个学员。
+已物化全部行的时间戳与原始值摘要随追加逐块累加（digest）, 不重新计算整段前缀。
+移动平均由 moving_average3 计算，prediction 在请求中重算特征时使用同一函数，
+因此特征库、快照与批量预测、/predict/custom 的训练特征逐位相同，预测结果一致。
+
+相关环境变量：
+- FEATURE_STORE_MAX_STUDENTS: 最多保留特征的学员数，0 表示关闭特征库，默认 1024
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 与 predict_future_scores 的完整特征顺序一致
+FEATURE_COLUMNS = [
+    "x", "y", "z", "day_of_year", "day_of_week", "hour", "time_index",
+    "score_lag1", "score_lag2", "x_lag1", "y_lag1", "z_lag1",
+    "score_ma3", "x_ma3", "y_ma3", "z_ma3",
+]
+RAW_COLUMNS = ["x", "y", "z", "score"]
+# 计算新行的滞后与移动平均所需的前序行数
+CONTEXT_ROWS = 2
+
+
+def moving_average3(current: np.ndarray, lag1: np.ndarray, lag2: np.ndarray) -> np.ndarray:
+    """
+    3 点移动平均, 与 rolling(window=3, min_periods=1).mean() 相同: 忽略缺失值, 对已有的值求平均
+
+    逐行按 当前值、滞后 1、滞后 2 的顺序累加, 结果与分块方式无关。
+    """
+    window = np.stack([current, lag1, lag2])
+    counts = np.sum(~np.isnan(window), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.nansum(window, axis=0) / counts
+
+
+def _row_bytes(times: np.ndarray, raw: np.ndarray) -> bytes:
+    """按行排列的 [时间戳, x, y, z, score] 字节, 用于累加摘要（分块计算与整体计算结果相同）"""
+    return np.column_stack([times, raw.view(np.int64)]).tobytes()
+
+
+def _compute_features(times: np.ndarray, raw: np.ndarray, context: np.ndarray, start_index: int) -> np.ndarray:
+    """
+    计算新增行的特征
+
+    参数：
+    - times: 新增行的时间戳（datetime64[ns] 的 int64 表示）
+    - raw: 新增行的 [x, y, z, score]（float64）
+    - context: 新增行之前最多 CONTEXT_ROWS 行的 [x, y, z, score]
+    - start_index: 第一个新增行的行号（time_index）
+
+    返回：
+    - (新增行数, len(FEATURE_COLUMNS)) 的 float64 矩阵
+    """
+    k = len(raw)
+    series = np.concatenate([context, raw])
+    offset = len(context)
+    padded = np.vstack([np.full((CONTEXT_ROWS, 4), np.nan), series])
+    start = CONTEXT_ROWS + offset
+    lag1 = padded[start - 1:start - 1 + k]
+    lag2 = padded[start - 2:start - 2 + k]
+    current = padded[start:start + k]
+    # 移动平均与 rolling(window=3, min_periods=1) 相同: 不足 3 行时对已有的行求平均
+    ma3 = moving_average3(current, lag1, lag2)
+
+    stamps = pd.DatetimeIndex(times.view("datetime64[ns]"))
+    columns = {
+        "x": current[:, 0], "y": current[:, 1], "z": current[:, 2],
+        "day_of_year": stamps.dayofyear.to_numpy(),
+        "day_of_week": stamps.dayofweek.to_numpy(),
+        "hour": stamps.hour.to_numpy(),
+        "time_index": np.arange(start_index, start_index + k, dtype=np.float64),
+        "score_lag1": lag1[:, 3], "score_lag2": lag2[:, 3],
+        "x_lag1": lag1[:, 0], "y_lag1": lag1[:, 1], "z_lag1": lag1[:, 2],
+        "score_ma3": ma3[:, 3], "x_ma3": ma3[:, 0], "y_ma3": ma3[:, 1], "z_ma3": ma3[:, 2],
+    }
+    block = np.empty((k, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        block[:, j] = columns[col]
+    return block
+
+
+def _frame_rows(frame: pd.DataFrame, index) -> Tuple[np.ndarray, np.ndarray]:
+    """取历史数据框中指定行（切片或位置列表）的时间戳（int64）与原始值 [x, y, z, score]（float64）"""
+    part = frame.iloc[index]
+    return part["t"].to_numpy(dtype="datetime64[ns]").view(np.int64), part[RAW_COLUMNS].to_numpy(dtype=np.float64)
+
+
+class StudentFeatures:
+    """
+    单个学员的物化特征（按行连续存储, 容量按倍数增长, 追加的均摊代价为 O(新增行数)）
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.lock = threading.Lock()
+        self.length = 0
+        self.times = np.empty(capacity, dtype=np.int64)
+        self.raw = np.empty((capacity, len(RAW_COLUMNS)), dtype=np.float64)
+        self.rows = np.empty((capacity, len(FEATURE_COLUMNS)), dtype=np.float64)
+        # 已物化的全部行的时间戳与原始值摘要（随追加累加）
+        self.digest = hashlib.blake2b(digest_size=16)
+
+    def reset(self):
+        """丢弃全部已物化的行"""
+        self.length = 0
+        self.digest = hashlib.blake2b(digest_size=16)
+
+    def _reserve(self, size: int):
+        capacity = self.times.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        # 重新分配后旧数组仍被已返回的视图引用, 不做原地扩容
+        times = np.empty(capacity, dtype=np.int64)
+        times[:self.length] = self.times[:self.length]
+        raw = np.empty((capacity, len(RAW_COLUMNS)), dtype=np.float64)
+        raw[:self.length] = self.raw[:self.length]
+        rows = np.empty((capacity, len(FEATURE_COLUMNS)), dtype=np.float64)
+        rows[:self.length] = self.rows[:self.length]
+        self.times, self.raw, self.rows = times, raw, rows
+
+    def accepts(self, times: np.ndarray) -> bool:
+        """新增的行是否按时间升序且不早于已物化的最后一行"""
+        if len(times) > 1 and np.any(np.diff(times) < 0):
+            return False
+        return self.length == 0 or len(times) == 0 or times[0] >= self.times[self.length - 1]
+
+    def extend(self, times: np.ndarray, raw: np.ndarray):
+        """追加新记录, 只计算新增行的特征"""
+        if len(times) == 0:
+            return
+        context = self.raw[max(0, self.length - CONTEXT_ROWS):self.length]
+        block = _compute_features(times, raw, context, self.length)
+        end = self.length + len(times)
+        self._reserve(end)
+        self.times[self.length:end] = times
+        self.raw[self.length:end] = raw
+        self.rows[self.length:end] = block
+        self.length = end
+        self.digest.update(_row_bytes(times, raw))
+
+    def matches(self, frame: pd.DataFrame) -> bool:
+        """
+        判断 frame 与已物化的行是否对齐: 两者重叠部分的首行与末行相同（O(1)）
+
+        记录只追加不修改, 首末行相同即视为同一段历史; 历史被修改或删除后行数或首末行会变化。
+        """
+        overlap = min(self.length, len(frame))
+        if overlap == 0:
+            return True
+        positions = [0, overlap - 1]
+        times, raw = _frame_rows(frame, positions)
+        return np.array_equal(times, self.times[positions]) and np.array_equal(raw, self.raw[positions])
+
+    def view(self, length: int) -> np.ndarray:
+        """前 length 行的特征矩阵 (行数, 特征数) 的只读视图（不复制, 之后的追加不影响该视图）"""
+        rows = self.rows[:length].view()
+        rows.flags.writeable = False
+        return rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.raw.nbytes + self.rows.nbytes
+
+
+class FeatureStore:
+    """
+    按学员缓存物化特征（线程安全: 全局锁只保护学员表, 特征计算持有各学员自己的锁）
+
+    参数：
+    - max_students: 最多保留的学员数，0 表示关闭
+    """
+
+    def __init__(self, max_students: int = 1024):
+        self.max_students = max(0, int(max_students))
+        self._students: "OrderedDict[str, StudentFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self.hits = 0
+        self.extended_rows = 0
+        self.appended_rows = 0
+        self.rebuilds = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "FeatureStore":
+        """根据环境变量创建特征库"""
+        return cls(max_students=int(os.getenv("FEATURE_STORE_MAX_STUDENTS", "1024")))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_students > 0
+
+    def _entry(self, student_id: str, capacity: int) -> StudentFeatures:
+        """获取（不存在时创建）学员的特征并标记为最近使用"""
+        with self._lock:
+            entry = self._students.get(student_id)
+            if entry is None:
+                entry = StudentFeatures(capacity=max(64, capacity))
+                self._students[student_id] = entry
+            self._students.move_to_end(student_id)
+            while len(self._students) > self.max_students:
+                self._students.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def features_for(self, student_id: str, frame: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        获取与 frame 逐行对齐的特征矩阵（按 FEATURE_COLUMNS 顺序, float64 只读视图）
+
+        frame 需按时间升序排列（如 load_student_history 的结果）; 新增的行未按时间排序或特征库关闭时返回 None。
+        frame 与已物化的行对齐时只为新增的行计算特征; 已物化的行多于 frame 时（读取历史后又追加了记录）
+        返回与 frame 等长的前缀。
+        """
+        if not self.enabled or frame.empty:
+            return None
+        entry = self._entry(student_id, len(frame))
+        with entry.lock:
+            if not entry.matches(frame):
+                self.rebuilds += 1
+                entry.reset()
+            n = entry.length
+            if n >= len(frame):
+                self.hits += 1
+            else:
+                times, raw = _frame_rows(frame, slice(n, None))
+                if not entry.accepts(times):
+                    return None
+                entry.extend(times, raw)
+                self.extended_rows += len(frame) - n
+            return entry.view(len(frame))
+
+    def append_records(self, frame: pd.DataFrame):
+        """
+        把新写入的记录追加到已缓存学员的特征上（load_records_frame 的结果, 含 student_id 列）
+
+        未缓存的学员跳过（首次读取时再物化）; 新记录早于已物化的行时丢弃该学员的特征。
+        """
+        if not self.enabled or frame.empty:
+            return
+        for student_id, part in frame.groupby("student_id", sort=False):
+            with self._lock:
+                entry = self._students.get(student_id)
+            if entry is None:
+                continue
+            times, raw = _frame_rows(part, slice(None))
+            with entry.lock:
+                if entry.accepts(times):
+                    entry.extend(times, raw)
+                    self.appended_rows += len(times)
+                else:
+                    entry.reset()
+
+    def invalidate(self, student_id: Optional[str] = None):
+        """丢弃某个学员（为空时为全部学员）的物化特征"""
+        with self._lock:
+            if student_id is None:
+                self._students.clear()
+            else:
+                self._students.pop(student_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回特征库的运行指标"""
+        with self._lock:
+            entries = list(self._students.values())
+        return {
+            "enabled": self.enabled,
+            "students": len(entries),
+            "max_students": self.max_students,
+            "rows": sum(entry.length for entry in entries),
+            "bytes": sum(entry.nbytes for entry in entries),
+            "hits": self.hits,
+            "extended_rows": self.extended_rows,
+            "appended_rows": self.appended_rows,
+            "rebuilds": self.rebuilds,
+            "evictions": self.evictions,
+        }
+
+
+_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    """获取全局特征库（首次调用时根据环境变量创建）"""
+    global _store
+    if _store is None:
+        _store = FeatureStore.from_env()
+    return _store
+
+
+def configure_feature_store(**kwargs) -> FeatureStore:
+    """替换全局特征库，参数同 FeatureStore"""
+    global _store
+    _store = FeatureStore(**kwargs)
+    return _store
@@ -0,0 +1,74 @@
+"""
+随机森林的逐行快速推理
+
+多步预测是自回归的, 每一步的滞后特征依赖上一步的预测值, 只能逐行调用模型。
+RandomForestRegressor.predict 单行调用时的固定开销（输入校验、并行调度、逐棵树的 Python 调用）
+远大于实际计算量, 这里把全部决策树的节点数组拼接成一张扁平表,
+对单行样本用 NumPy 同时沿所有树向下走 max_depth 步, 再按树的顺序依次累加叶子值。
+比较与累加的数值规则与 sklearn 完全一致（样本转为 float32、阈值为 float64、
+从 0 开始按顺序累加后除以树的数量）, 因此结果与 rf_model.predict 逐位相同。
+"""
+import weakref
+
+import numpy as np
+
+_compiled = weakref.WeakKeyDictionary()
+
+
+class CompiledForest:
+    """
+    展平后的随机森林（仅支持单输出回归）
+
+    参数：
+    - rf_model: 已拟合的 RandomForestRegressor
+    """
+
+    def __init__(self, rf_model):
+        trees = [estimator.tree_ for estimator in rf_model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("仅支持单输出的随机森林回归模型")
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        left, right, feature, threshold, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left < 0
+            # 叶子节点的左右子节点都指向自身, 固定走 max_depth 步后所有树都停在叶子上
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value[:, 0, 0])
+
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.value = np.concatenate(value).astype(np.float64)
+        self.roots = offsets.astype(np.intp)
+        self.depth = max(tree.max_depth for tree in trees)
+        self.n_trees = len(trees)
+
+    def predict_row(self, row: np.ndarray) -> float:
+        """
+        预测单个样本
+
+        参数：
+        - row: 一维特征向量（已标准化）
+        """
+        sample = np.asarray(row, dtype=np.float32)
+        nodes = self.roots
+        for _ in range(self.depth):
+            go_left = sample[self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        # cumsum 按树的顺序依次累加, 与 sklearn 的累加顺序一致
+        return float(np.cumsum(self.value[nodes])[-1] / self.n_trees)
+
+
+def compile_forest(rf_model) -> CompiledForest:
+    """获取模型对应的展平森林, 同一个模型对象只展平一次"""
+    compiled = _compiled.get(rf_model)
+    if compiled is None:
+        compiled = CompiledForest(rf_model)
+        _compiled[rf_model] = compiled
+    return compiled
@@ -0,0 +1,176 @@
+"""
+学员焊接历史的批量加载
+
+从 welding_records 表中一次查询读取一个或多个学员（工位）的评分时间序列，
+直接构造成 predict_future_scores 所需的 [t, x, y, z, score] 列式 DataFrame，
+不经过 ORM 对象，也不会按学员逐个查询。
+
+列映射见 FORECAST_COLUMN_MAP：操作速度、角度、熔深三项对应 x、y、z，
+综合评分（四项得分的均值，已包含缺陷得分）作为预测目标 score。
+student_id 为空的记录（以及显式标注为 DEFAULT_STUDENT_ID 的旧记录）归入 DEFAULT_STUDENT_ID。
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, or_, select, type_coerce
+from sqlalchemy.orm import Session
+
+import models
+
+# 预测数据框的列 -> welding_records 的列
+FORECAST_COLUMN_MAP = {
+    "x": "speed_score",
+    "y": "angle_score",
+    "z": "depth_score",
+    "score": "total_score",
+}
+FRAME_COLUMNS = ["t", "x", "y", "z", "score"]
+DEFAULT_STUDENT_ID = models.DEFAULT_STUDENT_ID
+
+
+def empty_frame() -> pd.DataFrame:
+    """不含任何记录的预测数据框"""
+    frame = pd.DataFrame({col: pd.Series(dtype=np.float64) for col in FRAME_COLUMNS})
+    frame["t"] = pd.Series(dtype="datetime64[ns]")
+    return frame
+
+
+def _parse_times(values) -> pd.Series:
+    """整列解析时间戳, 统一换算为 UTC 后去掉时区（与 SQLite 中存储的 UTC 时间一致, 不带时区的值视为 UTC）"""
+    return pd.to_datetime(values, format="ISO8601", utc=True).dt.tz_convert(None)
+
+
+def student_filter(student_ids: Iterable[str]):
+    """学员记录的过滤条件: DEFAULT_STUDENT_ID 同时匹配 student_id 为空与等于 "default" 的记录"""
+    record = models.WeldingRecord
+    ids = set(student_ids)
+    conditions = []
+    if DEFAULT_STUDENT_ID in ids:
+        conditions.append(record.student_id.is_(None))
+        conditions.append(record.student_id == DEFAULT_STUDENT_ID)
+        ids.discard(DEFAULT_STUDENT_ID)
+    if ids:
+        conditions.append(record.student_id.in_(sorted(ids)))
+    return or_(*conditions) if conditions else None
+
+
+def load_history_frame(
+    db: Session,
+    student_ids: Optional[Iterable[str]] = None,
+    since: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """
+    一次查询读取指定学员的全部记录, 返回按 (student_id, t) 排序的列式数据框
+
+    参数：
+    - db: 数据库会话
+    - student_ids: 学员标识列表, 为空时读取全部学员
+    - since: 只读取该时间（含）之后的记录
+
+    返回：
+    - DataFrame，列为 student_id, t, x, y, z, score
+    """
+    record = models.WeldingRecord
+    query = _history_query()
+    if student_ids is not None:
+        condition = student_filter(student_ids)
+        if condition is None:
+            return empty_frame().assign(student_id=pd.Series(dtype=object))
+        query = query.where(condition)
+    if since is not None:
+        query = query.where(record.timestamp >= since)
+    return _execute_history_query(db, query)
+
+
+def load_records_frame(db: Session, record_ids: Sequence[int]) -> pd.DataFrame:
+    """
+    按记录ID读取新写入的记录, 列与解析方式同 load_history_frame（用于追加到特征库）
+
+    返回：
+    - DataFrame，列为 student_id, t, x, y, z, score
+    """
+    if not record_ids:
+        return empty_frame().assign(student_id=pd.Series(dtype=object))
+    return _execute_history_query(db, _history_query().where(models.WeldingRecord.id.in_(list(record_ids))))
+
+
+def _history_query():
+    record = models.WeldingRecord
+    # 时间戳按原始存储值读取, 再整列解析, 避免逐行构造 datetime 对象
+    return select(
+        record.student_id,
+        type_coerce(record.timestamp, String).label("t"),
+        *[getattr(record, column).label(name) for name, column in FORECAST_COLUMN_MAP.items()],
+    ).where(record.timestamp.is_not(None))
+
+
+def _execute_history_query(db: Session, query) -> pd.DataFrame:
+    record = models.WeldingRecord
+    query = query.order_by(record.student_id, record.timestamp, record.id)
+
+    # 经由会话的连接执行 Core 查询, 跳过 ORM 结果处理
+    rows = db.connection().execute(query).all()
+    frame = pd.DataFrame.from_records(rows, columns=["student_id", *FRAME_COLUMNS])
+    frame["student_id"] = frame["student_id"].fillna(DEFAULT_STUDENT_ID)
+    frame["t"] = _parse_times(frame["t"])
+    for name in FORECAST_COLUMN_MAP:
+        frame[name] = frame[name].astype(np.float64)
+    return frame.dropna(subset=list(FORECAST_COLUMN_MAP)).reset_index(drop=True)
+
+
+def split_by_student(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """将按 student_id 排序的数据框切分为每个学员一个 [t, x, y, z, score] 数据框"""
+    if frame.empty:
+        return {}
+    students = frame["student_id"].to_numpy()
+    # 已按学员排序, 相邻值变化的位置即为每个学员的起点
+    starts = np.flatnonzero(np.r_[True, students[1:] != students[:-1]])
+    ends = np.r_[starts[1:], len(frame)]
+    values = frame[FRAME_COLUMNS]
+    return {
+        students[start]: values.iloc[start:end].reset_index(drop=True)
+        for start, end in zip(starts, ends)
+    }
+
+
+def load_student_histories(
+    db: Session,
+    student_ids: Optional[Iterable[str]] = None,
+    since: Optional[datetime] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    批量读取多个学员的预测数据框（单次查询）
+
+    返回：
+    - dict: {student_id: DataFrame[t, x, y, z, score]}，没有记录的学员不会出现在结果中
+    """
+    return split_by_student(load_history_frame(db, student_ids=student_ids, since=since))
+
+
+def load_student_history(db: Session, student_id: str = DEFAULT_STUDENT_ID) -> pd.DataFrame:
+    """读取单个学员的预测数据框, 没有记录时返回空数据框"""
+    return load_student_histories(db, [student_id]).get(student_id, empty_frame())
+
+
+def frame_from_records(records: List[Mapping[str, Any]]) -> pd.DataFrame:
+    """
+    将请求中传入的记录列表转换为预测数据框
+
+    每条记录可以直接给出 t, x, y, z, score，也可以使用 welding_records 的列名
+    （timestamp, speed_score, angle_score, depth_score, total_score）。
+    """
+    if not records:
+        return empty_frame()
+    frame = pd.DataFrame.from_records(list(records))
+    renames = {"timestamp": "t", **{column: name for name, column in FORECAST_COLUMN_MAP.items()}}
+    frame = frame.rename(columns={k: v for k, v in renames.items() if v not in frame.columns})
+    missing = [col for col in FRAME_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"记录缺少字段: {missing}")
+    frame = frame[FRAME_COLUMNS].copy()
+    frame["t"] = _parse_times(frame["t"])
+    for name in FORECAST_COLUMN_MAP:
+        frame[name] = frame[name].astype(np.float64)
+    return frame
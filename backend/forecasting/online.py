@@ -0,0 +1,350 @@
+"""
+在线（增量）预测模型
+
+采用 Holt 线性指数平滑：每个学员只保存水平 level 与趋势 trend 两个量，
+每写入一条检测记录就以 O(1) 更新一次，预测时直接外推 level + h × trend，请求路径上不做任何拟合。
+同时累计每条新记录到来前的一步预测误差，用于与随机森林模式对比精度。
+
+状态保存在 online_forecast_states 表中，由 /detect 在写入记录的同一事务中更新；
+已有历史数据时可全量重建：
+    python -m forecasting.online rebuild
+
+相关环境变量：
+- FORECAST_MODE: /predict 默认的预测模式，rf（随机森林）或 online（在线模型），默认 rf
+- FORECAST_ONLINE_ALPHA: 水平的平滑系数，默认 0.5
+- FORECAST_ONLINE_BETA: 趋势的平滑系数，默认 0.3
+"""
+import math
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+from models import DEFAULT_STUDENT_ID
+
+if TYPE_CHECKING:
+    # 每次写入检测记录都会调用 update_online_states, 该路径不依赖 pandas, 不在导入时加载
+    import pandas as pd
+
+FORECAST_MODES = ("rf", "online")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def default_forecast_mode() -> str:
+    """根据环境变量确定默认的预测模式"""
+    mode = os.getenv("FORECAST_MODE", "rf").lower()
+    if mode not in FORECAST_MODES:
+        raise ValueError(f"不支持的预测模式: {mode}，可选值: {FORECAST_MODES}")
+    return mode
+
+
+@dataclass
+class HoltState:
+    """单个学员的平滑状态"""
+    level: float = 0.0
+    trend: float = 0.0
+    count: int = 0
+    last_time: Optional[datetime] = None
+    abs_error_sum: float = 0.0
+    sq_error_sum: float = 0.0
+    error_count: int = 0
+
+    @property
+    def mae(self) -> Optional[float]:
+        """一步预测的平均绝对误差"""
+        return self.abs_error_sum / self.error_count if self.error_count else None
+
+    @property
+    def rmse(self) -> Optional[float]:
+        """一步预测的均方根误差"""
+        return math.sqrt(self.sq_error_sum / self.error_count) if self.error_count else None
+
+
+class HoltForecaster:
+    """
+    Holt 线性指数平滑
+
+    参数：
+    - alpha: 水平的平滑系数 (0, 1]
+    - beta: 趋势的平滑系数 [0, 1]
+    """
+
+    def __init__(self, alpha: float = 0.5, beta: float = 0.3):
+        if not 0 < alpha <= 1 or not 0 <= beta <= 1:
+            raise ValueError("平滑系数需满足 0 < alpha <= 1, 0 <= beta <= 1")
+        self.alpha = alpha
+        self.beta = beta
+
+    @classmethod
+    def from_env(cls) -> "HoltForecaster":
+        """根据环境变量创建模型"""
+        return cls(
+            alpha=float(os.getenv("FORECAST_ONLINE_ALPHA", "0.5")),
+            beta=float(os.getenv("FORECAST_ONLINE_BETA", "0.3")),
+        )
+
+    def update(self, state: HoltState, value: float, time: Optional[datetime] = None) -> HoltState:
+        """吸收一条新记录（原地更新并返回 state）"""
+        if state.count == 0:
+            state.level = value
+            state.trend = 0.0
+        else:
+            # 先记录新值到来前的一步预测误差, 再更新水平与趋势
+            error = value - (state.level + state.trend)
+            state.abs_error_sum += abs(error)
+            state.sq_error_sum += error * error
+            state.error_count += 1
+
+            previous_level = state.level
+            state.level = self.alpha * value + (1 - self.alpha) * (state.level + state.trend)
+            state.trend = self.beta * (state.level - previous_level) + (1 - self.beta) * state.trend
+        state.count += 1
+        if time is not None and (state.last_time is None or time > state.last_time):
+            state.last_time = time
+        return state
+
+    def replay(self, frame: "pd.DataFrame", state: Optional[HoltState] = None) -> HoltState:
+        """按时间顺序吸收数据框 [t, ..., score] 中的全部记录"""
+        state = state or HoltState()
+        if frame.empty:
+            return state
+        ordered = frame.sort_values("t", kind="stable")
+        times = ordered["t"].dt.to_pydatetime()
+        for time, value in zip(times, ordered["score"].to_numpy(dtype=np.float64).tolist()):
+            self.update(state, value, time)
+        return state
+
+    def forecast_values(self, state: HoltState, days: int) -> np.ndarray:
+        """未来 days 步的预测得分（限制在 0-100 并保留两位小数）"""
+        steps = np.arange(1, days + 1, dtype=np.float64)
+        return np.round(np.clip(state.level + state.trend * steps, 0, 100), 2)
+
+    def forecast(self, state: HoltState, days: int) -> Dict[str, float]:
+        """与 predict_future_scores 相同格式的预测结果: 最后一条记录之后逐天的 {时间戳: 得分}"""
+        if state.count == 0 or state.last_time is None:
+            raise ValueError("在线模型尚未吸收任何记录")
+        values = self.forecast_values(state, days).tolist()
+        return {
+            (state.last_time + timedelta(days=i + 1)).strftime(TIME_FORMAT): value
+            for i, value in enumerate(values)
+        }
+
+
+_forecaster: Optional[HoltForecaster] = None
+
+
+def get_online_forecaster() -> HoltForecaster:
+    """获取全局在线模型（首次调用时根据环境变量创建）"""
+    global _forecaster
+    if _forecaster is None:
+        _forecaster = HoltForecaster.from_env()
+    return _forecaster
+
+
+def configure_online_forecaster(**kwargs) -> HoltForecaster:
+    """替换全局在线模型，参数同 HoltForecaster"""
+    global _forecaster
+    _forecaster = HoltForecaster(**kwargs)
+    return _forecaster
+
+
+def _to_state(row: models.OnlineForecastState) -> HoltState:
+    return HoltState(
+        level=row.level,
+        trend=row.trend,
+        count=row.count,
+        last_time=row.last_time,
+        abs_error_sum=row.abs_error_sum,
+        sq_error_sum=row.sq_error_sum,
+        error_count=row.error_count,
+    )
+
+
+def _state_values(state: HoltState) -> dict:
+    return {
+        "level": state.level,
+        "trend": state.trend,
+        "count": state.count,
+        "last_time": state.last_time,
+        "abs_error_sum": state.abs_error_sum,
+        "sq_error_sum": state.sq_error_sum,
+        "error_count": state.error_count,
+    }
+
+
+def _insert_for(dialect_name: str):
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    raise NotImplementedError(f"在线模型状态表暂不支持数据库: {dialect_name}")
+
+
+def update_online_states(db: Session, record_ids: Sequence[int]):
+    """
+    用新写入的记录更新对应学员的在线模型状态（不提交, 由调用方与记录写入在同一事务中提交）
+
+    每条记录的更新代价为 O(1), 与学员的历史长度无关。
+
+    参数：
+    - db: 数据库会话, 记录需已 flush
+    - record_ids: 新记录的ID列表
+    """
+    if not record_ids:
+        return
+    record = models.WeldingRecord
+    rows = db.execute(
+        select(record.student_id, record.timestamp, record.total_score)
+        .where(record.id.in_(list(record_ids)), record.total_score.is_not(None))
+        .order_by(record.timestamp, record.id)
+    ).all()
+    if not rows:
+        return
+
+    student_ids = sorted({row.student_id or DEFAULT_STUDENT_ID for row in rows})
+    state_table = models.OnlineForecastState
+    # 新学员先插入空状态（已存在则跳过）, 并发写入同一新学员时不会因主键冲突而失败,
+    # 之后统一加行锁读取, 同一学员的状态更新按事务依次进行
+    insert_for = _insert_for(db.get_bind().dialect.name)
+    empty = _state_values(HoltState())
+    db.execute(
+        insert_for(state_table)
+        .values([{"student_id": student_id, **empty} for student_id in student_ids])
+        .on_conflict_do_nothing(index_elements=["student_id"])
+    )
+    stored = {
+        row.student_id: row
+        for row in db.execute(
+            select(state_table)
+            .where(state_table.student_id.in_(student_ids))
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).scalars()
+    }
+
+    forecaster = get_online_forecaster()
+    states = {student_id: _to_state(row) for student_id, row in stored.items()}
+    for row in rows:
+        student_id = row.student_id or DEFAULT_STUDENT_ID
+        forecaster.update(states.setdefault(student_id, HoltState()), row.total_score, row.timestamp)
+
+    for student_id, state in states.items():
+        for key, value in _state_values(state).items():
+            setattr(stored[student_id], key, value)
+    db.flush()
+
+
+def load_online_state(db: Session, student_id: str = DEFAULT_STUDENT_ID) -> Optional[HoltState]:
+    """按主键读取学员的在线模型状态, 不存在时返回 None"""
+    row = db.get(models.OnlineForecastState, student_id)
+    return _to_state(row) if row is not None else None
+
+
+def rebuild_online_states(db: Session) -> int:
+    """从全部历史记录重放, 重建所有学员的在线模型状态, 返回学员数"""
+    from forecasting.history import load_history_frame, split_by_student
+
+    forecaster = get_online_forecaster()
+    histories = split_by_student(load_history_frame(db))
+    rows = [
+        {"student_id": student_id, **_state_values(forecaster.replay(frame))}
+        for student_id, frame in histories.items()
+    ]
+    try:
+        db.execute(delete(models.OnlineForecastState))
+        if rows:
+            db.execute(insert(models.OnlineForecastState), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def predict_online(
+    frame: "pd.DataFrame",
+    days: int = 5,
+    state: Optional[HoltState] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    在线模式的预测, 返回格式与 predict_future_scores 相同
+
+    参数：
+    - frame: 历史数据框 [t, x, y, z, score], 用于返回历史部分
+    - days: 预测天数
+    - state: 已维护的学员状态; 为空时由 frame 重放得到（O(n), 仍无需拟合）
+    """
+    from prediction import format_history
+
+    if frame.empty:
+        raise ValueError("输入数据不能为空")
+    forecaster = get_online_forecaster()
+    if state is None or state.count == 0:
+        state = forecaster.replay(frame)
+    df = frame.sort_values("t").reset_index(drop=True)
+    return {
+        "history": format_history(df),
+        "forecast": forecaster.forecast(state, days),
+    }
+
+
+def compare_modes(frame: "pd.DataFrame", holdout: int = 5) -> dict:
+    """
+    回测对比两种预测模式: 用除最后 holdout 条以外的记录分别预测 holdout 步,
+    与被留出的真实得分比较 MAE 与 RMSE
+
+    返回：
+    - dict: {"holdout", "actual", "rf": {...}, "online": {...}}
+    """
+    from prediction import predict_future_scores
+
+    df = frame.sort_values("t").reset_index(drop=True)
+    if len(df) <= holdout:
+        raise ValueError(f"历史记录数需多于留出的 {holdout} 条")
+    train, test = df.iloc[:-holdout], df.iloc[-holdout:]
+    actual = test["score"].to_numpy(dtype=np.float64)
+
+    predictions = {
+        "rf": np.array(list(predict_future_scores(train, days=holdout)["forecast"].values())),
+        "online": get_online_forecaster().forecast_values(get_online_forecaster().replay(train), holdout),
+    }
+    result = {
+        "holdout": holdout,
+        "actual": np.round(actual, 2).tolist(),
+    }
+    for mode, predicted in predictions.items():
+        errors = predicted - actual
+        result[mode] = {
+            "predicted": predicted.tolist(),
+            "mae": round(float(np.mean(np.abs(errors))), 3),
+            "rmse": round(float(np.sqrt(np.mean(errors ** 2))), 3),
+        }
+    return result
+
+
+def main(argv: List[str]):
+    if len(argv) < 2 or argv[1] != "rebuild":
+        print("用法: python -m forecasting.online rebuild")
+        return 1
+
+    from database import SessionLocal, init_database
+
+    init_database()
+    db = SessionLocal()
+    try:
+        count = rebuild_online_states(db)
+        print(f"在线模型状态重建完成, 共 {count} 个学员")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
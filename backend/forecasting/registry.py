@@ -0,0 +1,236 @@
+"""
+预测模型注册表
+
+缓存已拟合的 (StandardScaler, RandomForestRegressor)，以训练数据的指纹为键：
+训练矩阵与目标值不变时直接复用已拟合的模型，只有数据变化时才重新训练。
+内存中按 LRU + TTL 淘汰，可选将模型持久化到磁盘，服务重启后无需重新训练。
+随机森林使用固定的 random_state，相同训练数据拟合出的模型完全一致，
+因此命中缓存时的预测结果与重新训练时完全相同。
+
+相关环境变量：
+- FORECAST_MODEL_CACHE_SIZE: 内存中最多缓存的模型数，0 表示关闭缓存，默认 32
+- FORECAST_MODEL_TTL: 模型的有效期（秒），0 或负数表示永不过期，默认 3600
+- FORECAST_MODEL_CACHE_DIR: 模型持久化目录，为空时不落盘
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+# 模型结构或超参数变化时修改版本号，使旧指纹（包括磁盘上的模型）全部失效
+MODEL_VERSION = "rf-v1"
+
+
+def training_fingerprint(X, y, feature_columns: Sequence[str]) -> str:
+    """
+    计算训练数据的指纹
+
+    参数：
+    - X: 训练特征矩阵（DataFrame 或数组）
+    - y: 训练目标值
+    - feature_columns: 特征列名, 顺序相关
+    """
+    features = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    targets = np.ascontiguousarray(np.asarray(y, dtype=np.float64))
+    hasher = hashlib.sha256()
+    hasher.update(MODEL_VERSION.encode("utf-8"))
+    hasher.update(",".join(feature_columns).encode("utf-8"))
+    hasher.update(np.array(features.shape, dtype=np.int64).tobytes())
+    hasher.update(features.tobytes())
+    hasher.update(targets.tobytes())
+    return hasher.hexdigest()
+
+
+class ForecastModelRegistry:
+    """
+    已拟合预测模型的缓存（线程安全）
+
+    参数：
+    - max_entries: 内存中最多缓存的模型数，0 表示不缓存
+    - ttl_seconds: 模型有效期（秒），None 或非正数表示永不过期
+    - cache_dir: 持久化目录，为空时只使用内存缓存
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        ttl_seconds: Optional[float] = 3600.0,
+        cache_dir: Optional[str] = None,
+    ):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.cache_dir = cache_dir or None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 同一指纹同时只训练一次, 其余调用方等待训练结果
+        self._fit_locks: Dict[str, threading.Lock] = {}
+
+        # 运行指标
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.fits = 0
+        self.evictions = 0
+        self.fit_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ForecastModelRegistry":
+        """根据环境变量创建模型注册表"""
+        return cls(
+            max_entries=int(os.getenv("FORECAST_MODEL_CACHE_SIZE", "32")),
+            ttl_seconds=float(os.getenv("FORECAST_MODEL_TTL", "3600")),
+            cache_dir=os.getenv("FORECAST_MODEL_CACHE_DIR") or None,
+        )
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{fingerprint}.joblib")
+
+    def _get_memory(self, fingerprint: str):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return None
+            created, model = entry
+            if self._expired(created):
+                del self._entries[fingerprint]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            return model
+
+    def _put_memory(self, fingerprint: str, model, created: float):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[fingerprint] = (created, model)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _load_disk(self, fingerprint: str):
+        if not self.cache_dir:
+            return None
+        path = self._path(fingerprint)
+        try:
+            created = os.path.getmtime(path)
+            if self._expired(created):
+                os.remove(path)
+                return None
+            return created, joblib.load(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 文件损坏或版本不兼容时视为未命中, 重新训练后覆盖
+            return None
+
+    def _save_disk(self, fingerprint: str, model):
+        if not self.cache_dir:
+            return
+        # 先写临时文件再原子替换, 避免并发读取到写了一半的模型
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, self._path(fingerprint))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_or_fit(self, fingerprint: str, fit: Callable[[], Any]):
+        """
+        获取指纹对应的已拟合模型, 不存在或已过期时调用 fit() 训练并缓存
+
+        返回：
+        - (模型, 来源)，来源为 "memory"、"disk" 或 "fit"
+        """
+        model = self._get_memory(fingerprint)
+        if model is not None:
+            self.hits += 1
+            return model, "memory"
+
+        with self._lock:
+            fit_lock = self._fit_locks.setdefault(fingerprint, threading.Lock())
+        with fit_lock:
+            try:
+                return self._load_or_fit(fingerprint, fit)
+            finally:
+                # 训练完成后不再需要该指纹的训练锁
+                with self._lock:
+                    self._fit_locks.pop(fingerprint, None)
+
+    def _load_or_fit(self, fingerprint: str, fit: Callable[[], Any]):
+        # 等待期间其他线程可能已完成训练
+        model = self._get_memory(fingerprint)
+        if model is not None:
+            self.hits += 1
+            return model, "memory"
+
+        loaded = self._load_disk(fingerprint)
+        if loaded is not None:
+            created, model = loaded
+            self.disk_hits += 1
+            self._put_memory(fingerprint, model, created)
+            return model, "disk"
+
+        self.misses += 1
+        started = time.perf_counter()
+        model = fit()
+        self.fit_seconds += time.perf_counter() - started
+        self.fits += 1
+        self._put_memory(fingerprint, model, time.time())
+        self._save_disk(fingerprint, model)
+        return model, "fit"
+
+    def clear(self):
+        """清空内存缓存（不删除磁盘上的模型）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回注册表的运行指标"""
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "cache_dir": self.cache_dir,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "fits": self.fits,
+            "evictions": self.evictions,
+            "fit_seconds": round(self.fit_seconds, 3),
+        }
+
+
+_registry: Optional[ForecastModelRegistry] = None
+
+
+def get_model_registry() -> ForecastModelRegistry:
+    """获取全局模型注册表（首次调用时根据环境变量创建）"""
+    global _registry
+    if _registry is None:
+        _registry = ForecastModelRegistry.from_env()
+    return _registry
+
+
+def configure_model_registry(**kwargs) -> ForecastModelRegistry:
+    """替换全局模型注册表，参数同 ForecastModelRegistry"""
+    global _registry
+    _registry = ForecastModelRegistry(**kwargs)
+    return _registry
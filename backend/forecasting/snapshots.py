@@ -0,0 +1,452 @@
+"""
+预测快照的后台调度
+
+随机森林预测不在请求路径上执行: 后台调度线程定期（以及 /detect 写入新记录后）为学员
+重新预测并写入 forecast_snapshots, /predict 与 /predict/custom 只按 (student_id, id)
+索引读取该学员最新的一份快照（包含历史与预测）, 并附带快照的生成时间与是否过期。
+
+- 服务启动时先为全部学员生成一次快照, 之后每 FORECAST_SNAPSHOT_INTERVAL 秒全量刷新一次
+- /detect 写入记录后将该学员标记为待刷新, 在 FORECAST_SNAPSHOT_DEBOUNCE 秒内连续写入的记录合并为一次刷新
+- 快照生成后学员又有新记录（尚未刷新）或快照超过刷新周期时, 读取结果标记为过期
+- 请求可传 refresh=true 同步刷新该学员的快照; 学员还没有快照时同样在请求中生成。
+  按需刷新不排在后台全量刷新之后, 该学员已在刷新中时等待那次刷新的结果
+
+数据库中没有未标注学员的记录时, 为其写入基于模拟数据集的快照（source 为 synthetic）。
+每次写入后只保留学员最新的 FORECAST_SNAPSHOT_KEEP 份快照（见 forecasting/batch.py）。
+调度在 Web 服务进程内运行, 默认在当前进程中顺序预测, 不拉起与 CPU 核数相同的进程池。
+
+用法（在 backend 目录下，手动全量刷新一次）：
+    python -m forecasting.snapshots
+
+相关环境变量：
+- FORECAST_SNAPSHOTS: 是否启用快照读取与后台调度，默认 1；为 0 时 /predict 在请求中直接预测
+- FORECAST_SNAPSHOT_INTERVAL: 全量刷新周期（秒），默认 3600；为 0 时只在启动时与新记录到达时刷新
+- FORECAST_SNAPSHOT_DEBOUNCE: 新记录到达后等待合并的时间（秒），默认 5
+- FORECAST_SNAPSHOT_DAYS: 快照的预测天数，默认 5
+- FORECAST_SNAPSHOT_WORKERS: 全量刷新使用的预测进程数，默认 1（在调度线程中顺序执行）
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+from models import DEFAULT_STUDENT_ID
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    """与快照 created_at 一致的无时区 UTC 时间"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def load_latest_snapshot(db: Session, student_id: str) -> Optional[models.ForecastSnapshot]:
+    """按 (student_id, id) 索引读取学员最新的一份快照（单次索引查询）"""
+    stmt = (
+        select(models.ForecastSnapshot)
+        .where(models.ForecastSnapshot.student_id == student_id)
+        .order_by(models.ForecastSnapshot.id.desc())
+        .limit(1)
+    )
+    return db.execute(stmt).scalars().first()
+
+
+def save_synthetic_snapshot(db: Session, days: int) -> int:
+    """为没有记录的未标注学员写入基于模拟数据集的快照, 返回快照 ID"""
+    from data_generator import generate_dataset
+    from prediction import predict_future_scores
+
+    from forecasting.batch import prune_forecast_snapshots
+
+    history = generate_dataset()
+    result = predict_future_scores(history, days=days)
+    try:
+        snapshot_id = db.execute(
+            insert(models.ForecastSnapshot).values(
+                student_id=DEFAULT_STUDENT_ID,
+                created_at=_utcnow().replace(microsecond=0),
+                mode="rf",
+                days=days,
+                history_points=len(history),
+                last_record_time=history["t"].max().to_pydatetime(),
+                forecast=result["forecast"],
+                history=result["history"],
+                source="synthetic",
+            )
+        ).inserted_primary_key[0]
+        prune_forecast_snapshots(db, [DEFAULT_STUDENT_ID])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return snapshot_id
+
+
+def refresh_snapshots(
+    db: Session,
+    student_ids: Optional[Iterable[str]] = None,
+    days: int = 5,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    为全部（或指定）学员重新预测并写入快照
+
+    未标注学员没有记录时（且在刷新范围内）写入模拟数据快照。
+
+    返回：
+    - run_batch_forecast 的任务摘要, 另加 synthetic（是否写入了模拟数据快照）
+    """
+    from forecasting.batch import run_batch_forecast
+    from forecasting.history import student_filter
+
+    student_ids = list(student_ids) if student_ids is not None else None
+    summary = run_batch_forecast(db, student_ids=student_ids, days=days, workers=workers)
+    summary["synthetic"] = False
+    if student_ids is None or DEFAULT_STUDENT_ID in student_ids:
+        has_records = db.execute(
+            select(models.WeldingRecord.id).where(student_filter([DEFAULT_STUDENT_ID])).limit(1)
+        ).first() is not None
+        if not has_records:
+            save_synthetic_snapshot(db, days)
+            summary["synthetic"] = True
+    return summary
+
+
+class _Refresh:
+    """一次进行中的刷新: 按需刷新遇到已在其中的学员时等待 done, 再读取该学员的结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.errors: Dict[str, str] = {}
+        self.error: Optional[str] = None
+
+
+class SnapshotScheduler:
+    """
+    预测快照调度器: 后台线程定期全量刷新, 并合并刷新有新记录的学员
+
+    参数：
+    - interval: 全量刷新周期（秒），0 表示只在启动时全量刷新
+    - debounce: 新记录到达后等待合并的时间（秒）
+    - days: 快照的预测天数
+    - enabled: 是否启用（关闭时 /predict 在请求中直接预测）
+    - workers: 全量刷新使用的预测进程数，1 表示在调度线程中顺序执行
+    """
+
+    def __init__(
+        self,
+        interval: float = 3600.0,
+        debounce: float = 5.0,
+        days: int = 5,
+        enabled: bool = True,
+        workers: int = 1,
+    ):
+        self.interval = max(0.0, float(interval))
+        self.debounce = max(0.0, float(debounce))
+        self.days = int(days)
+        self.enabled = enabled
+        self.workers = max(1, int(workers))
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        # 后台刷新同一时间只执行一次; 请求中的按需刷新不等待该锁, 与后台刷新并行执行
+        self._refresh_lock = threading.Lock()
+        # 有新记录、等待刷新的学员, 以及正在刷新的学员（学员 -> 所在的刷新）
+        self._dirty: Set[str] = set()
+        self._dirty_since: Optional[float] = None
+        self._refreshing: Dict[str, _Refresh] = {}
+
+        # 运行指标
+        self._refreshes = 0
+        self._full_refreshes = 0
+        self._on_demand = 0
+        self._students_refreshed = 0
+        self._failed = 0
+        self._reads = 0
+        self._misses = 0
+        self._last_refresh_at: Optional[datetime] = None
+        self._last_refresh_seconds: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "SnapshotScheduler":
+        """根据环境变量创建调度器"""
+        return cls(
+            interval=float(os.getenv("FORECAST_SNAPSHOT_INTERVAL", "3600")),
+            debounce=float(os.getenv("FORECAST_SNAPSHOT_DEBOUNCE", "5")),
+            days=int(os.getenv("FORECAST_SNAPSHOT_DAYS", "5")),
+            enabled=os.getenv("FORECAST_SNAPSHOTS", "1").lower() not in ("0", "false", "no"),
+            workers=int(os.getenv("FORECAST_SNAPSHOT_WORKERS", "1")),
+        )
+
+    def start(self):
+        """启动后台调度线程（启动后立即全量刷新一次）"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="forecast-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """停止后台调度线程（正在进行的刷新会先完成）"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def mark_dirty(self, student_ids: Iterable[Optional[str]]):
+        """标记有新记录的学员, 在合并等待时间后由后台线程刷新"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty.update(student_id or DEFAULT_STUDENT_ID for student_id in student_ids)
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+        self._wake.set()
+
+    def _take_dirty(self, now: float) -> Optional[List[str]]:
+        """合并等待时间已到时返回全部待刷新的学员（由 refresh 移出待刷新集合）"""
+        with self._lock:
+            if not self._dirty or now - self._dirty_since < self.debounce:
+                return None
+            return sorted(self._dirty)
+
+    def _run(self):
+        next_full = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_full:
+                self._refresh_in_background(None)
+                next_full = time.monotonic() + self.interval if self.interval > 0 else float("inf")
+                continue
+            student_ids = self._take_dirty(now)
+            if student_ids is not None:
+                self._refresh_in_background(student_ids)
+                continue
+
+            timeouts = [next_full - now] if next_full != float("inf") else []
+            with self._lock:
+                if self._dirty_since is not None:
+                    timeouts.append(self._dirty_since + self.debounce - now)
+            self._wake.wait(max(0.0, min(timeouts)) if timeouts else None)
+            self._wake.clear()
+
+    def _refresh_in_background(self, student_ids: Optional[List[str]]):
+        try:
+            self.refresh(student_ids)
+        except Exception:
+            # 失败已计入指标, 后台线程继续运行
+            logger.exception("预测快照刷新失败")
+
+    def refresh(self, student_ids: Optional[Iterable[str]] = None, on_demand: bool = False) -> Dict[str, Any]:
+        """
+        同步刷新全部（或指定）学员的快照（同步阻塞，需在线程池中调用）
+
+        后台刷新依次执行; 按需刷新（on_demand）不等待正在进行的后台刷新, 只为不在刷新中的学员
+        重新预测, 已在其他刷新中的学员等待那次刷新完成并沿用其结果, 不重复拟合。
+
+        返回：
+        - 任务摘要, 见 refresh_snapshots
+        """
+        student_ids = list(student_ids) if student_ids is not None else None
+        if on_demand and student_ids is not None:
+            return self._refresh_on_demand(student_ids)
+        with self._refresh_lock:
+            return self._run_refresh(student_ids, self._claim(student_ids))
+
+    def _claim(self, student_ids: Optional[List[str]]) -> _Refresh:
+        """将学员移出待刷新集合并登记为刷新中（已在其他刷新中的学员保留原登记）"""
+        current = _Refresh()
+        with self._lock:
+            if student_ids is None:
+                # 全量刷新包含全部待刷新的学员
+                claimed = set(self._dirty)
+                self._dirty.clear()
+            else:
+                claimed = set(student_ids)
+                self._dirty.difference_update(claimed)
+            if not self._dirty:
+                self._dirty_since = None
+            for student_id in claimed:
+                self._refreshing.setdefault(student_id, current)
+        return current
+
+    def _refresh_on_demand(self, student_ids: List[str]) -> Dict[str, Any]:
+        with self._lock:
+            waiting = {sid: self._refreshing[sid] for sid in student_ids if sid in self._refreshing}
+        own = [sid for sid in student_ids if sid not in waiting]
+
+        if own:
+            summary = self._run_refresh(own, self._claim(own), on_demand=True)
+        else:
+            summary = {"students": 0, "succeeded": 0, "failed": 0, "synthetic": False, "errors": {}, "total_seconds": 0.0}
+            with self._lock:
+                self._on_demand += 1
+
+        # 等待其他刷新中的学员完成, 沿用那次刷新的结果
+        errors = dict(summary["errors"])
+        for student_id, other in waiting.items():
+            other.done.wait()
+            error = other.errors.get(student_id) or other.error
+            if error is not None:
+                errors[student_id] = error
+        return {**summary, "errors": errors}
+
+    def _run_refresh(self, student_ids: Optional[List[str]], current: _Refresh, on_demand: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            # 指定学员的刷新在当前线程中执行; 全量刷新使用配置的进程数
+            summary = refresh_snapshots(
+                db, student_ids, days=self.days, workers=1 if student_ids is not None else self.workers
+            )
+            current.errors = dict(summary["errors"])
+        except Exception as e:
+            current.error = str(e) or type(e).__name__
+            with self._lock:
+                self._failed += 1
+                self._last_error = current.error
+            raise
+        finally:
+            db.close()
+            with self._lock:
+                for student_id in [sid for sid, other in self._refreshing.items() if other is current]:
+                    del self._refreshing[student_id]
+                self._last_refresh_seconds = round(time.perf_counter() - started, 3)
+            current.done.set()
+
+        with self._lock:
+            self._refreshes += 1
+            if student_ids is None:
+                self._full_refreshes += 1
+            if on_demand:
+                self._on_demand += 1
+            self._students_refreshed += summary["succeeded"] + summary["synthetic"]
+            self._failed += summary["failed"]
+            self._last_refresh_at = _utcnow()
+            if summary["errors"]:
+                self._last_error = next(iter(summary["errors"].values()))
+        logger.info(
+            f"预测快照已刷新: 学员 {summary['students']} 个, 成功 {summary['succeeded']}, "
+            f"失败 {summary['failed']}, 耗时 {summary['total_seconds']}s"
+        )
+        return summary
+
+    def latest(self, db: Session, student_id: str) -> Optional[models.ForecastSnapshot]:
+        """
+        读取学员最新的可用快照（单次索引查询）
+
+        没有快照、快照未保存历史（旧版本写入）或预测天数与调度器不一致时返回 None。
+        """
+        self._reads += 1
+        snapshot = load_latest_snapshot(db, student_id)
+        if snapshot is None or snapshot.history is None or snapshot.days != self.days:
+            self._misses += 1
+            return None
+        return snapshot
+
+    def describe(self, snapshot: models.ForecastSnapshot, refreshed: bool = False) -> Dict[str, Any]:
+        """
+        快照的时效信息
+
+        - stale: 快照生成后该学员又有新记录（等待或正在刷新），或快照已超过全量刷新周期
+        - refreshed: 快照是否在本次请求中生成
+        """
+        age = max(0.0, (_utcnow() - snapshot.created_at).total_seconds()) if snapshot.created_at else None
+        with self._lock:
+            pending = snapshot.student_id in self._dirty or snapshot.student_id in self._refreshing
+        expired = age is not None and self.interval > 0 and age > self.interval
+        return {
+            "id": snapshot.id,
+            "created_at": snapshot.created_at.isoformat() if snapshot.created_at else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": pending or expired,
+            "refreshed": refreshed,
+            "days": snapshot.days,
+            "history_points": snapshot.history_points,
+            "last_record_time": snapshot.last_record_time.isoformat() if snapshot.last_record_time else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度器的运行指标"""
+        with self._lock:
+            dirty = len(self._dirty)
+            refreshing = bool(self._refreshing)
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval,
+            "debounce_seconds": self.debounce,
+            "days": self.days,
+            "workers": self.workers,
+            "dirty_students": dirty,
+            "refreshing": refreshing,
+            "refreshes": self._refreshes,
+            "full_refreshes": self._full_refreshes,
+            "on_demand_refreshes": self._on_demand,
+            "students_refreshed": self._students_refreshed,
+            "failed": self._failed,
+            "reads": self._reads,
+            "misses": self._misses,
+            "last_refresh_at": self._last_refresh_at.isoformat() if self._last_refresh_at else None,
+            "last_refresh_seconds": self._last_refresh_seconds,
+            "last_error": self._last_error,
+        }
+
+
+_scheduler: Optional[SnapshotScheduler] = None
+
+
+def get_snapshot_scheduler() -> SnapshotScheduler:
+    """获取全局快照调度器（首次调用时根据环境变量创建）"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SnapshotScheduler.from_env()
+    return _scheduler
+
+
+def configure_snapshot_scheduler(**kwargs) -> SnapshotScheduler:
+    """替换全局快照调度器，参数同 SnapshotScheduler"""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+    _scheduler = SnapshotScheduler(**kwargs)
+    return _scheduler
+
+
+def shutdown_snapshot_scheduler():
+    """停止全局快照调度器的后台线程"""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def main() -> int:
+    from database import init_database
+
+    init_database()
+    scheduler = SnapshotScheduler.from_env()
+    summary = scheduler.refresh()
+    print(
+        f"学员 {summary['students']} 个, 成功 {summary['succeeded']}, 失败 {summary['failed']}, "
+        f"模拟数据快照 {'已写入' if summary['synthetic'] else '无'}, 耗时 {summary['total_seconds']}s"
+    )
+    for student_id, error in summary["errors"].items():
+        print(f"  {student_id}: {error}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+AI 助教的大模型客户端
+
+全进程共用一个长连接的 AsyncOpenAI 客户端（首次对话时创建），请求复用其 HTTP 连接池
+（openai 默认最多 1000 个连接、100 个保活连接），不再每次对话新建客户端与 TLS 连接；
+调用在事件循环中异步等待，不阻塞其他请求。
+
+流式生成时逐段返回模型输出，并记录首字延迟（TTFT）、输出 token 数与生成速度；
+服务端返回 usage 时按其 completion_tokens 计数，否则按收到的文本片段数近似。
+迭代被取消（如客户端断开）时关闭上游连接，模型端随之停止生成。
+
+接口兼容 OpenAI Chat Completions，可指向本地模拟服务测试（见 benchmarks/mock_llm.py）。
+
+相关环境变量：
+- ERNIE_ACCESS_TOKEN: API 密钥（可写在 backend/.env 中）
+- LLM_BASE_URL: 接口地址，默认 https://qianfan.baidubce.com/v2
+- LLM_MODEL: 模型名称，默认 ernie-3.5-8k
+- LLM_TIMEOUT: 单次请求超时（秒），默认 60
+- LLM_MAX_RETRIES: 连接失败时的重试次数，默认 2
+"""
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+DEFAULT_BASE_URL = "https://qianfan.baidubce.com/v2"
+DEFAULT_MODEL = "ernie-3.5-8k"
+
+
+class GenerationStats:
+    """单次生成的耗时统计：首字延迟、输出 token 数与生成速度"""
+
+    def __init__(self, streamed: bool = True):
+        self.streamed = streamed
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.completion_tokens: Optional[int] = None
+        self.status = "running"
+
+    def on_delta(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+
+    def finish(self, status: str):
+        self.finished_at = time.perf_counter()
+        self.status = status
+
+    @property
+    def tokens(self) -> int:
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_token_at - self.started if self.first_token_at is not None else None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """生成速度: 流式按首字之后的耗时计算, 非流式按整段回答的耗时计算"""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        seconds = self.finished_at - (self.first_token_at if self.streamed else self.started)
+        return self.tokens / seconds if seconds > 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return {
+            "status": self.status,
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "total_ms": round((end - self.started) * 1000, 1),
+            "tokens": self.tokens,
+            "token_count": "usage" if self.completion_tokens is not None else "chunks",
+            "tokens_per_second": round(self.tokens_per_second, 2) if self.tokens_per_second is not None else None,
+        }
+
+
+class TeacherLLM:
+    """
+    AI 助教的大模型客户端
+
+    参数：
+    - api_key: API 密钥
+    - base_url: OpenAI 兼容接口地址
+    - model: 模型名称
+    - timeout: 单次请求超时（秒）
+    - max_retries: 连接失败时的重试次数
+    - max_tokens / temperature: 生成参数
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = DEFAULT_BASE_URL,
+        model: str = DEFAULT_MODEL,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.timeout = float(timeout)
+        self.max_retries = int(max_retries)
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+        self._client = None
+
+        # 运行指标
+        self._requests = 0
+        self._active = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._failed = 0
+        self._ttft_total = 0.0
+        self._ttft_count = 0
+        self._tps_total = 0.0
+        self._tps_count = 0
+        self._last: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_env(cls) -> "TeacherLLM":
+        """根据环境变量创建客户端"""
+        return cls(
+            api_key=os.getenv("ERNIE_ACCESS_TOKEN"),
+            base_url=os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL),
+            model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        """懒加载 AsyncOpenAI 客户端（OpenAI 客户端导入较慢, 首次对话时导入或由启动预热提前导入）"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+            )
+        return self._client
+
+    def _record(self, stats: GenerationStats):
+        if stats.status == "completed":
+            self._completed += 1
+        elif stats.status == "cancelled":
+            self._cancelled += 1
+        else:
+            self._failed += 1
+        if stats.streamed and stats.ttft is not None:
+            self._ttft_total += stats.ttft
+            self._ttft_count += 1
+        if stats.status == "completed" and stats.tokens_per_second is not None:
+            self._tps_total += stats.tokens_per_second
+            self._tps_count += 1
+        self._last = stats.to_dict()
+
+    async def complete(self, messages: List[Dict[str, str]]) -> Tuple[str, GenerationStats]:
+        """
+        非流式生成（整段回答生成完毕后返回）
+
+        返回：
+        - (回答文本, 耗时统计), 首字延迟即整段回答的耗时
+        """
+        stats = GenerationStats(streamed=False)
+        self._requests += 1
+        self._active += 1
+        status = "cancelled"
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=False,
+            )
+            stats.on_delta()
+            if response.usage is not None:
+                stats.completion_tokens = response.usage.completion_tokens
+            status = "completed"
+            return response.choices[0].message.content or "", stats
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            self._active -= 1
+            stats.finish(status)
+            self._record(stats)
+
+    async def stream(
+        self, messages: List[Dict[str, str]], stats: Optional[GenerationStats] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式生成, 逐段产出模型输出的文本
+
+        迭代被取消或提前关闭时关闭上游连接, stats 的状态记为 cancelled。
+        """
+        stats = stats or GenerationStats()
+        self._requests += 1
+        self._active += 1
+        status = "cancelled"
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            try:
+                async for chunk in response:
+                    if chunk.usage is not None:
+                        stats.completion_tokens = chunk.usage.completion_tokens
+                    for choice in chunk.choices:
+                        content = choice.delta.content if choice.delta is not None else None
+                        if content:
+                            stats.on_delta()
+                            yield content
+            finally:
+                # 断开上游连接: 客户端断开或出错时模型端随之停止生成
+                await response.close()
+            status = "completed"
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            self._active -= 1
+            stats.finish(status)
+            self._record(stats)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回客户端的运行指标"""
+        return {
+            "configured": self.configured,
+            "base_url": self.base_url,
+            "model": self.model,
+            "connected": self._client is not None,
+            "requests": self._requests,
+            "active": self._active,
+            "completed": self._completed,
+            "cancelled": self._cancelled,
+            "failed": self._failed,
+            # 平均首字延迟只统计流式生成
+            "avg_ttft_ms": round(self._ttft_total / self._ttft_count * 1000, 1) if self._ttft_count else None,
+            "avg_tokens_per_second": round(self._tps_total / self._tps_count, 2) if self._tps_count else None,
+            "last": self._last,
+        }
+
+    async def close(self):
+        """关闭客户端及其连接池"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+_llm: Optional[TeacherLLM] = None
+
+
+def get_teacher_llm() -> TeacherLLM:
+    """获取全局大模型客户端（首次调用时根据环境变量创建）"""
+    global _llm
+    if _llm is None:
+        _llm = TeacherLLM.from_env()
+    return _llm
+
+
+def configure_teacher_llm(**kwargs) -> TeacherLLM:
+    """替换全局大模型客户端，参数同 TeacherLLM（旧客户端由 close_teacher_llm 或进程退出时回收）"""
+    global _llm
+    _llm = TeacherLLM(**kwargs)
+    return _llm
+
+
+async def close_teacher_llm():
+    """关闭全局大模型客户端的连接池"""
+    global _llm
+    if _llm is not None:
+        await _llm.close()
+        _llm = None
@@ -1,21 +1,76 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+
+# 最先导入启动记录, 从这里开始计时
+from startup import WARMUP_MODULES, get_startup_profile, startup_mode
+
+profile = get_startup_profile()
+
+with profile.measure("fastapi"):
+    from fastapi import FastAPI
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.middleware.cors import CORSMiddleware
+    import uvicorn
 
 # 导入数据库设置
-from database import engine, Base
-import models
+with profile.measure("database"):
+    from database import init_database
+
+with profile.measure("services"):
+    from analysis.backends import get_model_pool
+    from analysis.pool import get_detection_executor, shutdown_detection_executor
+    from analysis.scheduler import shutdown_microbatch_scheduler
+    from charts.renderer import get_chart_renderer, shutdown_chart_renderer
+    from forecasting.snapshots import get_snapshot_scheduler, shutdown_snapshot_scheduler
+    from llm_client import close_teacher_llm
+
+# 导入API路由（路由模块只在模块级导入轻量依赖, pandas、matplotlib、OpenAI 等在首次使用时导入）
+with profile.measure("api"):
+    from api import detection, teacher, dashboard, predict, charts, diagnostics
+
+
+async def warm_up():
+    """初始化检测执行池并加载、预热检测模型，导入重型依赖，拉起图表渲染进程"""
+    executor = get_detection_executor()
+    if executor.mode == "process":
+        await executor.prestart()
+    else:
+        await run_in_threadpool(get_model_pool().load)
+    await run_in_threadpool(profile.import_modules, WARMUP_MODULES)
+    await get_chart_renderer().prestart()
+
 
-# 导入API路由
-from api import detection, teacher, dashboard, predict
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 创建数据库表并补建新增的列与索引（只在服务进程启动时执行一次, 不在导入时执行）
+    await run_in_threadpool(init_database)
+    # 按启动模式预热（background 模式下在后台进行，不阻塞请求处理）；关闭时回收工作线程/进程
+    mode = startup_mode()
+    # 预测快照调度线程: 启动后先全量生成一次快照, 之后定期及有新记录时刷新
+    get_snapshot_scheduler().start()
+    warmup_task = None
+    if mode == "eager":
+        await profile.run_warmup(warm_up)
+    elif mode == "background":
+        warmup_task = asyncio.create_task(profile.run_warmup(warm_up))
+    else:
+        profile.skip_warmup()
+    profile.mark_ready()
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    shutdown_snapshot_scheduler()
+    shutdown_microbatch_scheduler()
+    shutdown_detection_executor()
+    shutdown_chart_renderer()
+    await close_teacher_llm()
 
-# 创建数据库表
-models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="焊育智眸 - 后端API",
     description="为AI焊接教学系统提供后端服务",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 配置CORS
@@ -32,6 +87,8 @@ app.include_router(detection.router, prefix="/api/v1", tags=["Detection"])
 app.include_router(teacher.router, prefix="/api/v1", tags=["AI Teacher"])
 app.include_router(dashboard.router, prefix="/api/v1", tags=["Dashboard"])
 app.include_router(predict.router, prefix="/api/v1", tags=["Predict"])
+app.include_router(charts.router, prefix="/api/v1", tags=["Charts"])
+app.include_router(diagnostics.router, prefix="/api/v1", tags=["Diagnostics"])
 
 
 @app.get("/")
@@ -1,14 +1,90 @@
-from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy import Column, Integer, Float, DateTime, Index, JSON, String
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from database import Base
 
+# SQLite 的 CURRENT_TIMESTAMP 精确到秒, 参数绑定使用相同的存储格式,
+# 以保证按时间比较（范围过滤、游标分页）时与已存储的值逐字一致
+_TIMESTAMP_TYPE = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        timezone=True,
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+    ),
+    "sqlite",
+)
+# student_id 为空的记录对应的学员标识
+DEFAULT_STUDENT_ID = "default"
+
 class WeldingRecord(Base):
     __tablename__ = "welding_records"
 
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(_TIMESTAMP_TYPE, server_default=func.now())
     speed_score = Column(Float)
     angle_score = Column(Float)
     depth_score = Column(Float)
     defect_score = Column(Float)
     total_score = Column(Float)
+    student_id = Column(String(64), nullable=True)   # 学员/工位标识, 为空表示未指定
+
+    __table_args__ = (
+        # 历史记录按 (timestamp, id) 倒序游标分页及时间范围查询
+        Index("ix_welding_records_timestamp_id", "timestamp", "id"),
+        # 按学员批量读取时间序列用于预测
+        Index("ix_welding_records_student_timestamp", "student_id", "timestamp", "id"),
+    )
+
+class ScoreRollup(Base):
+    """
+    评分汇总表: 按小时/天、按评分维度累计的计数、总和、平方和、最小值与最大值,
+    由 /detect 写入记录时增量维护, 均值与方差可直接由汇总值计算
+    """
+    __tablename__ = "welding_score_rollups"
+
+    granularity = Column(String(8), primary_key=True)   # hour 或 day
+    bucket_start = Column(_TIMESTAMP_TYPE, primary_key=True)
+    dimension = Column(String(32), primary_key=True)    # speed_score / angle_score / ... / total_score
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    sum_sq = Column(Float, nullable=False, default=0.0)
+    min = Column(Float)
+    max = Column(Float)
+
+class ForecastSnapshot(Base):
+    """
+    学员的预测结果快照: 由批量预测任务与后台快照调度器（forecasting/snapshots.py）写入,
+    每个学员按时间保留多份, /predict 读取时取该学员最新的一份
+    """
+    __tablename__ = "forecast_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    student_id = Column(String(64), nullable=False)
+    created_at = Column(_TIMESTAMP_TYPE, server_default=func.now())
+    mode = Column(String(16), nullable=False, default="rf")     # 预测模型, 如 rf
+    days = Column(Integer, nullable=False)
+    history_points = Column(Integer, nullable=False)           # 参与预测的历史记录数
+    last_record_time = Column(_TIMESTAMP_TYPE)                  # 参与预测的最后一条记录的时间
+    forecast = Column(JSON, nullable=False)                     # {时间戳字符串: 预测得分}
+    history = Column(JSON)                                      # 参与预测的历史 {时间戳字符串: 得分}
+    source = Column(String(16))                                 # 历史来源: records 或 synthetic（模拟数据）
+
+    __table_args__ = (
+        # 按学员读取最新快照
+        Index("ix_forecast_snapshots_student_id", "student_id", "id"),
+    )
+
+class OnlineForecastState(Base):
+    """
+    在线预测模型（Holt 线性指数平滑）的每学员状态: 水平、趋势及一步预测误差的累计量,
+    由 /detect 写入记录时以 O(1) 增量更新
+    """
+    __tablename__ = "online_forecast_states"
+
+    student_id = Column(String(64), primary_key=True)
+    level = Column(Float, nullable=False)
+    trend = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)         # 已吸收的记录数
+    last_time = Column(_TIMESTAMP_TYPE)                         # 最后一条记录的时间
+    abs_error_sum = Column(Float, nullable=False, default=0.0)  # 一步预测绝对误差之和
+    sq_error_sum = Column(Float, nullable=False, default=0.0)   # 一步预测误差平方和
+    error_count = Column(Integer, nullable=False, default=0)
@@ -1,44 +1,96 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
+from functools import lru_cache
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+from forecasting.features import FEATURE_COLUMNS, moving_average3
+from forecasting.forest import compile_forest
+from forecasting.registry import get_model_registry, training_fingerprint
 
-def predict_future_scores(data: pd.DataFrame, days: int = 5) -> Dict[str, Dict[str, float]]:
+
+@lru_cache(maxsize=16)
+def _seeded_noise(days: int):
     """
-    使用随机森林回归预测未来几天的得分情况
+    逐天以 42 + i 为种子生成的 (x, y, z) 随机波动（只读）
+
+    与逐天调用 np.random.seed(42 + i) 后依次抽取三个 N(0, 2) 的结果相同,
+    但使用独立的 RandomState, 不重设也不推进全局随机数状态。
+    """
+    noise = np.empty((days, 3), dtype=np.float64)
+    for i in range(days):
+        noise[i] = np.random.RandomState(42 + i).normal(0, 2, 3)
+    noise.setflags(write=False)
+    return noise
+
+
+def _round2(values: np.ndarray) -> list:
+    """
+    与逐个调用 round(float(v), 2) 结果相同的批量舍入
+
+    np.round 先乘 100 再取整, 只有乘积恰好落在 .5 附近时才可能与 Python 的精确舍入不一致,
+    这部分元素回退到内置 round 逐个处理。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ambiguous = ~(np.abs(scaled - np.floor(scaled) - 0.5) > 1e-6)
+    for i in np.flatnonzero(ambiguous):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded.tolist()
+
+
+def _trend_noise(days: int) -> np.ndarray:
+    """获取未来 days 天的可重现随机波动（不影响全局随机数状态）"""
+    return _seeded_noise(days)
+
+
+def format_history(df: pd.DataFrame) -> Dict[str, float]:
+    """
+    将按时间排序的历史数据转换为 {时间戳字符串: 得分} 格式（整列格式化时间戳）
+    """
+    history_times = df['t'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    return dict(zip(history_times, _round2(df['score'].to_numpy(dtype=np.float64))))
+
+
+def fit_forecast_model(X: pd.DataFrame, y: pd.Series) -> Tuple[StandardScaler, RandomForestRegressor]:
+    """
+    拟合特征标准化器与随机森林回归模型
     
     参数：
-    - data: DataFrame，包含历史数据，格式为[t, x, y, z, score]
-    - days: int，预测的天数，默认为5天
+    - X: 训练特征
+    - y: 训练目标（得分）
     
     返回：
-    - dict: 包含历史数据和预测数据的字典
-      {
-        "history": {t: score},   # 实际数据，t为时间戳字符串
-        "forecast": {t: score}   # 预测数据，t为时间戳字符串
-      }
+    - (scaler, rf_model)
     """
+    # 特征标准化
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
     
-    # 验证输入数据
-    if data.empty:
-        raise ValueError("输入数据不能为空")
-    
-    required_columns = ['t', 'x', 'y', 'z', 'score']
-    if not all(col in data.columns for col in required_columns):
-        raise ValueError(f"数据必须包含以下列: {required_columns}")
-    
-    # 复制数据以避免修改原始数据
-    df = data.copy()
+    # 训练随机森林模型
+    rf_model = RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        random_state=42,
+        min_samples_split=2,
+        min_samples_leaf=1
+    )
     
-    # 确保时间列是datetime类型
-    if not pd.api.types.is_datetime64_any_dtype(df['t']):
-        df['t'] = pd.to_datetime(df['t'])
+    rf_model.fit(X_scaled, y)
+    return scaler, rf_model
+
+
+def _build_training_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, list]:
+    """
+    按时间排序并构造训练特征
     
+    返回：
+    - (排序后的数据, 训练特征 X, 训练目标 y, 特征列名)
+    """
     # 按时间排序
     df = df.sort_values('t').reset_index(drop=True)
     
@@ -56,12 +108,13 @@ def predict_future_scores(data: pd.DataFrame, days: int = 5) -> Dict[str, Dict[s
         df['y_lag1'] = df['y'].shift(1)
         df['z_lag1'] = df['z'].shift(1)
     
-    # 3. 移动平均特征
+    # 3. 移动平均特征（与特征库使用同一计算, 两条路径的训练特征逐位相同）
     if len(df) >= 3:
-        df['score_ma3'] = df['score'].rolling(window=3, min_periods=1).mean()
-        df['x_ma3'] = df['x'].rolling(window=3, min_periods=1).mean()
-        df['y_ma3'] = df['y'].rolling(window=3, min_periods=1).mean()
-        df['z_ma3'] = df['z'].rolling(window=3, min_periods=1).mean()
+        for col in ['score', 'x', 'y', 'z']:
+            values = df[col].to_numpy(dtype=np.float64)
+            df[f'{col}_ma3'] = moving_average3(
+                values, df[col].shift(1).to_numpy(dtype=np.float64), df[col].shift(2).to_numpy(dtype=np.float64)
+            )
     
     # 4. 趋势特征
     df['time_index'] = range(len(df))
@@ -85,122 +138,139 @@ def predict_future_scores(data: pd.DataFrame, days: int = 5) -> Dict[str, Dict[s
     # 准备训练数据
     X = df_clean[feature_columns]
     y = df_clean['score']
+    return df, X, y, feature_columns
+
+
+def predict_future_scores(
+    data: pd.DataFrame,
+    days: int = 5,
+    use_cache: bool = True,
+    feature_rows: Optional[np.ndarray] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    使用随机森林回归预测未来几天的得分情况
     
-    # 特征标准化
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    参数：
+    - data: DataFrame，包含历史数据，格式为[t, x, y, z, score]
+    - days: int，预测的天数，默认为5天
+    - use_cache: bool，是否复用模型注册表中以训练数据指纹缓存的已拟合模型，默认为True
+    - feature_rows: 特征库中与 data 逐行对齐的已物化特征（见 forecasting.features），
+      data 已按时间排序且不含缺失值时直接切片作为训练特征，省去整段历史的特征计算
     
-    # 训练随机森林模型
-    rf_model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=10,
-        random_state=42,
-        min_samples_split=2,
-        min_samples_leaf=1
+    返回：
+    - dict: 包含历史数据和预测数据的字典
+      {
+        "history": {t: score},   # 实际数据，t为时间戳字符串
+        "forecast": {t: score}   # 预测数据，t为时间戳字符串
+      }
+    """
+    
+    # 验证输入数据
+    if data.empty:
+        raise ValueError("输入数据不能为空")
+    
+    required_columns = ['t', 'x', 'y', 'z', 'score']
+    if not all(col in data.columns for col in required_columns):
+        raise ValueError(f"数据必须包含以下列: {required_columns}")
+    
+    # 复制数据以避免修改原始数据
+    df = data.copy()
+    
+    # 确保时间列是datetime类型
+    if not pd.api.types.is_datetime64_any_dtype(df['t']):
+        df['t'] = pd.to_datetime(df['t'])
+    
+    # 已物化的特征只在行与 data 完全对齐时可用: 已按时间排序、无缺失值且足以构造滞后特征
+    use_store = (
+        feature_rows is not None
+        and len(feature_rows) == len(df)
+        and len(df) >= 5
+        and df['t'].is_monotonic_increasing
+        and not df.isna().to_numpy().any()
     )
     
-    rf_model.fit(X_scaled, y)
+    if use_store:
+        # 去掉没有完整滞后特征的前两行, 与下方 dropna 后的训练集相同
+        df = df.reset_index(drop=True)
+        feature_columns = list(FEATURE_COLUMNS)
+        X = pd.DataFrame(feature_rows[2:], columns=feature_columns, copy=False)
+        y = df['score'].iloc[2:].reset_index(drop=True)
+    else:
+        df, X, y, feature_columns = _build_training_data(df)
+    
+    # 特征标准化与模型训练: 训练数据未变化时复用注册表中已拟合的模型
+    if use_cache:
+        fingerprint = training_fingerprint(X, y, feature_columns)
+        (scaler, rf_model), _ = get_model_registry().get_or_fit(fingerprint, lambda: fit_forecast_model(X, y))
+    else:
+        scaler, rf_model = fit_forecast_model(X, y)
     
     # 准备历史数据返回格式
-    history = {}
-    for _, row in df.iterrows():
-        timestamp_str = row['t'].strftime('%Y-%m-%d %H:%M:%S')
-        history[timestamp_str] = round(float(row['score']), 2)
+    history = format_history(df)
     
     # 生成未来时间点
     last_time = df['t'].max()
-    future_times = []
-    for i in range(1, days + 1):
-        future_time = last_time + timedelta(days=i)
-        future_times.append(future_time)
+    future_times = last_time + pd.to_timedelta(np.arange(1, days + 1), unit='D')
+    steps = np.arange(1, days + 1)
     
-    # 预测未来数据
-    forecast = {}
+    # 基于历史趋势一次性预测全部未来时间点的x, y, z值
+    last_xyz = np.array([df['x'].iloc[-1], df['y'].iloc[-1], df['z'].iloc[-1]], dtype=np.float64)
+    if len(df) >= 2:
+        # 使用最近数据的线性趋势外推, 再叠加可重现的随机波动
+        recent_data = df.tail(min(5, len(df)))
+        recent_index = range(len(recent_data))
+        trends = np.array([np.polyfit(recent_index, recent_data[col], 1)[0] for col in ('x', 'y', 'z')])
+        noise = _trend_noise(days)
+        future_xyz = np.clip(last_xyz + trends * steps[:, None] + noise, 0, 100)
+    else:
+        # 如果数据不够，使用最后的值加小的随机变化
+        future_xyz = np.clip(last_xyz + np.random.normal(0, 1, size=(days, 3)), 0, 100)
     
-    for i, future_time in enumerate(future_times):
-        # 构建未来时间点的特征
-        future_features = {}
-        
-        # 时间特征
-        future_features['day_of_year'] = future_time.dayofyear
-        future_features['day_of_week'] = future_time.dayofweek
-        future_features['hour'] = future_time.hour
-        future_features['time_index'] = len(df) + i
-        
-        # 基于历史趋势预测x, y, z值
-        # 使用简单的线性趋势外推
-        if len(df) >= 2:
-            # 计算最近的趋势
-            recent_data = df.tail(min(5, len(df)))
-            
-            x_trend = np.polyfit(range(len(recent_data)), recent_data['x'], 1)[0]
-            y_trend = np.polyfit(range(len(recent_data)), recent_data['y'], 1)[0]
-            z_trend = np.polyfit(range(len(recent_data)), recent_data['z'], 1)[0]
-            
-            # 添加一些随机波动
-            np.random.seed(42 + i)  # 确保结果可重现
-            x_noise = np.random.normal(0, 2)
-            y_noise = np.random.normal(0, 2)
-            z_noise = np.random.normal(0, 2)
-            
-            future_features['x'] = np.clip(df['x'].iloc[-1] + x_trend * (i + 1) + x_noise, 0, 100)
-            future_features['y'] = np.clip(df['y'].iloc[-1] + y_trend * (i + 1) + y_noise, 0, 100)
-            future_features['z'] = np.clip(df['z'].iloc[-1] + z_trend * (i + 1) + z_noise, 0, 100)
-        else:
-            # 如果数据不够，使用最后的值加小的随机变化
-            future_features['x'] = np.clip(df['x'].iloc[-1] + np.random.normal(0, 1), 0, 100)
-            future_features['y'] = np.clip(df['y'].iloc[-1] + np.random.normal(0, 1), 0, 100)
-            future_features['z'] = np.clip(df['z'].iloc[-1] + np.random.normal(0, 1), 0, 100)
-        
-        # 滞后特征和移动平均特征（如果模型需要）
-        if len(df_clean) >= 3 and 'score_lag1' in feature_columns:
-            if i == 0:
-                future_features['score_lag1'] = df['score'].iloc[-1]
-                future_features['score_lag2'] = df['score'].iloc[-2] if len(df) >= 2 else df['score'].iloc[-1]
-                future_features['x_lag1'] = df['x'].iloc[-1]
-                future_features['y_lag1'] = df['y'].iloc[-1]
-                future_features['z_lag1'] = df['z'].iloc[-1]
-                
-                future_features['score_ma3'] = df['score'].tail(3).mean()
-                future_features['x_ma3'] = df['x'].tail(3).mean()
-                future_features['y_ma3'] = df['y'].tail(3).mean()
-                future_features['z_ma3'] = df['z'].tail(3).mean()
-            else:
-                # 使用之前预测的值作为滞后特征
-                prev_scores = [v for v in forecast.values()]
-                if len(prev_scores) >= 1:
-                    future_features['score_lag1'] = prev_scores[-1]
-                else:
-                    future_features['score_lag1'] = df['score'].iloc[-1]
-                
-                if len(prev_scores) >= 2:
-                    future_features['score_lag2'] = prev_scores[-2]
-                else:
-                    future_features['score_lag2'] = df['score'].iloc[-1]
-                
-                future_features['x_lag1'] = future_features['x']
-                future_features['y_lag1'] = future_features['y']
-                future_features['z_lag1'] = future_features['z']
-                
-                # 移动平均使用最近的预测值
-                recent_scores = list(df['score'].tail(2)) + prev_scores
-                future_features['score_ma3'] = np.mean(recent_scores[-3:])
-                future_features['x_ma3'] = future_features['x']
-                future_features['y_ma3'] = future_features['y']
-                future_features['z_ma3'] = future_features['z']
-        
-        # 构建特征向量
-        X_future = np.array([[future_features[col] for col in feature_columns]])
-        X_future_scaled = scaler.transform(X_future)
+    # 在预分配的特征矩阵中填入与预测值无关的特征
+    column_index = {col: j for j, col in enumerate(feature_columns)}
+    features = np.empty((days, len(feature_columns)), dtype=np.float64)
+    for j, col in enumerate(('x', 'y', 'z')):
+        features[:, column_index[col]] = future_xyz[:, j]
+    features[:, column_index['day_of_year']] = future_times.dayofyear
+    features[:, column_index['day_of_week']] = future_times.dayofweek
+    features[:, column_index['hour']] = future_times.hour
+    features[:, column_index['time_index']] = len(df) + steps - 1
+    
+    # 滞后特征和移动平均特征（如果模型需要）
+    use_lags = 'score_lag1' in feature_columns
+    if use_lags and days > 0:
+        for col in ('x', 'y', 'z'):
+            # 第一天使用真实的最后一条记录, 之后与原实现相同, 直接取当天外推的x, y, z
+            features[0, column_index[f'{col}_lag1']] = df[col].iloc[-1]
+            features[0, column_index[f'{col}_ma3']] = df[col].tail(3).mean()
+            features[1:, column_index[f'{col}_lag1']] = features[1:, column_index[col]]
+            features[1:, column_index[f'{col}_ma3']] = features[1:, column_index[col]]
+        features[0, column_index['score_lag1']] = df['score'].iloc[-1]
+        features[0, column_index['score_lag2']] = df['score'].iloc[-2] if len(df) >= 2 else df['score'].iloc[-1]
+        features[0, column_index['score_ma3']] = df['score'].tail(3).mean()
+    
+    # 得分序列: 最后两条真实得分 + 逐天的预测得分, 用于计算得分滞后与移动平均
+    score_trail = np.empty(days + 2, dtype=np.float64)
+    if use_lags:
+        score_trail[:2] = df['score'].tail(2).tolist()
+    
+    # 逐天预测（自回归: 得分滞后特征依赖前一天的预测值）
+    forest = compile_forest(rf_model)
+    mean, scale = scaler.mean_, scaler.scale_
+    for i in range(days):
+        if use_lags and i >= 1:
+            # 使用之前预测的值作为滞后特征
+            features[i, column_index['score_lag1']] = score_trail[i + 1]
+            features[i, column_index['score_lag2']] = score_trail[i] if i >= 2 else df['score'].iloc[-1]
+            features[i, column_index['score_ma3']] = np.mean(score_trail[i - 1:i + 2])
         
-        # 预测
-        predicted_score = rf_model.predict(X_future_scaled)[0]
+        # 与 scaler.transform 相同的标准化, 再用展平后的森林预测
+        predicted_score = forest.predict_row((features[i] - mean) / scale)
         
         # 确保预测值在合理范围内
-        predicted_score = np.clip(predicted_score, 0, 100)
-        
-        timestamp_str = future_time.strftime('%Y-%m-%d %H:%M:%S')
-        forecast[timestamp_str] = round(float(predicted_score), 2)
+        score_trail[i + 2] = round(float(np.clip(predicted_score, 0, 100)), 2)
+    
+    forecast = dict(zip(future_times.strftime('%Y-%m-%d %H:%M:%S'), score_trail[2:].tolist()))
     
     return {
         "history": history,
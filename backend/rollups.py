@@ -0,0 +1,144 @@
+"""
+评分汇总表维护
+
+welding_score_rollups 按小时/天、按评分维度保存 count、sum、sum_sq、min、max。
+每次写入检测记录时, 在同一事务中把新记录按桶聚合后以 UPSERT 累加到汇总表;
+rebuild_rollups 则从原始记录全量重建。两者都完全在 SQL 中完成。
+
+用法（在 backend 目录下全量重建）：
+    python rollups.py rebuild
+"""
+import math
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+# 维护汇总的评分维度与时间粒度
+ROLLUP_DIMENSIONS = ("speed_score", "angle_score", "depth_score", "defect_score", "total_score")
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+
+def _bucket_start(granularity: str, dialect_name: str):
+    """记录时间戳所在桶的起始时间, 格式与时间戳的存储格式一致"""
+    timestamp = models.WeldingRecord.timestamp
+    if dialect_name == "sqlite":
+        fmt = "%Y-%m-%d %H:00:00" if granularity == "hour" else "%Y-%m-%d 00:00:00"
+        return func.strftime(fmt, timestamp)
+    return func.date_trunc(granularity, timestamp)
+
+
+def _insert_for(dialect_name: str):
+    if dialect_name == "sqlite":
+        return sqlite.insert, func.min, func.max
+    if dialect_name == "postgresql":
+        return postgresql.insert, func.least, func.greatest
+    raise NotImplementedError(f"汇总表暂不支持数据库: {dialect_name}")
+
+
+def _aggregate_select(granularity: str, dialect_name: str, record_ids: Optional[Sequence[int]]):
+    """从原始记录按 (桶, 维度) 聚合的查询, record_ids 为空时聚合全部记录"""
+    record = models.WeldingRecord
+    bucket = _bucket_start(granularity, dialect_name)
+    selects = []
+    for dimension in ROLLUP_DIMENSIONS:
+        column = getattr(record, dimension)
+        query = select(
+            literal(granularity).label("granularity"),
+            bucket.label("bucket_start"),
+            literal(dimension).label("dimension"),
+            func.count(column).label("count"),
+            func.sum(column).label("sum"),
+            func.sum(column * column).label("sum_sq"),
+            func.min(column).label("min"),
+            func.max(column).label("max"),
+        ).where(column.is_not(None), record.timestamp.is_not(None))
+        if record_ids is not None:
+            query = query.where(record.id.in_(record_ids))
+        selects.append(query.group_by(bucket))
+    return union_all(*selects)
+
+
+def _upsert_from_records(db: Session, record_ids: Optional[Sequence[int]]):
+    dialect_name = db.get_bind().dialect.name
+    insert, least, greatest = _insert_for(dialect_name)
+    table = models.ScoreRollup.__table__
+    columns = ["granularity", "bucket_start", "dimension", "count", "sum", "sum_sq", "min", "max"]
+
+    for granularity in ROLLUP_GRANULARITIES:
+        aggregated = _aggregate_select(granularity, dialect_name, record_ids).subquery()
+        # SQLite 解析 INSERT ... SELECT ... ON CONFLICT 时要求 SELECT 带有 WHERE 子句
+        source = select(*[aggregated.c[name] for name in columns]).where(aggregated.c.count > 0)
+        statement = insert(table).from_select(columns, source)
+        statement = statement.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "dimension"],
+            set_={
+                "count": table.c.count + statement.excluded.count,
+                "sum": table.c.sum + statement.excluded.sum,
+                "sum_sq": table.c.sum_sq + statement.excluded.sum_sq,
+                "min": least(table.c.min, statement.excluded.min),
+                "max": greatest(table.c.max, statement.excluded.max),
+            },
+        )
+        db.execute(statement)
+
+
+def update_rollups(db: Session, record_ids: Sequence[int]):
+    """
+    将新写入的记录累加到汇总表（不提交, 由调用方与记录写入在同一事务中提交）
+
+    参数：
+    - db: 数据库会话, 记录需已 flush
+    - record_ids: 新记录的ID列表
+    """
+    if record_ids:
+        _upsert_from_records(db, list(record_ids))
+
+
+def rebuild_rollups(db: Session):
+    """从原始记录全量重建汇总表（在单个事务中完成并提交）"""
+    try:
+        db.execute(delete(models.ScoreRollup))
+        _upsert_from_records(db, None)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def summarize_rollup(count: int, total: float, total_sq: float, minimum: float, maximum: float) -> Dict[str, float]:
+    """由汇总值计算均值、标准差（总体）与最值"""
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return {
+        "mean": round(mean, 2),
+        "std": round(math.sqrt(variance), 2),
+        "min": minimum,
+        "max": maximum,
+    }
+
+
+def main(argv: List[str]):
+    if len(argv) < 2 or argv[1] != "rebuild":
+        print("用法: python rollups.py rebuild")
+        return 1
+
+    from database import SessionLocal, init_database
+
+    init_database()
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+        count = db.query(func.count()).select_from(models.ScoreRollup).scalar()
+        print(f"汇总表重建完成, 共 {count} 行")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
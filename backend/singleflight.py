@@ -0,0 +1,128 @@
+"""
+并发相同请求的合并（single-flight）
+
+课堂看板加载时，大量浏览器会在同一时刻以相同参数请求 /predict 等接口。
+同一分组内键相同的并发调用只执行一次计算：第一个调用发起计算，
+计算完成前到达的相同调用等待同一个结果，不重复执行；计算完成后键即释放，
+之后的调用重新计算（结果缓存由各模块自行负责）。
+
+计算任务独立于发起它的请求：发起请求被取消时计算仍会完成，供其他等待者使用。
+共享的结果会被多个请求同时读取，调用方不应修改。
+
+当前的分组：
+- predict: /predict 与 /predict/charts-only，按学员、预测模式、是否刷新快照与图表样式合并
+- detect: /detect，按图片内容摘要合并缓存未命中时的推理
+
+相关环境变量：
+- SINGLEFLIGHT: 是否合并并发的相同请求，默认 1
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    一组可合并的调用
+
+    参数：
+    - name: 分组名称
+    - enabled: 为 False 时每次调用都独立执行
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+
+        # 键 -> 进行中的计算任务, 以及等待该结果的调用数（含发起者）
+        self._flights: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+        # 运行指标
+        self._calls = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._max_waiters = 0
+
+    async def do(self, key: Hashable, start: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        执行 start() 返回的计算，键相同的计算正在进行时等待其结果
+
+        start 只在本次调用发起计算时同步调用一次。
+
+        返回：
+        - (计算结果, 是否与其他调用共享了计算)
+        """
+        self._calls += 1
+        if not self.enabled:
+            self._executions += 1
+            return await self._run(start()), False
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._coalesced += 1
+            self._waiters[key] += 1
+            self._max_waiters = max(self._max_waiters, self._waiters[key])
+            return await asyncio.shield(flight), True
+
+        self._executions += 1
+        flight = asyncio.ensure_future(self._run(start()))
+        self._flights[key] = flight
+        self._waiters[key] = 1
+        self._max_waiters = max(self._max_waiters, 1)
+
+        def release(_):
+            self._flights.pop(key, None)
+            self._waiters.pop(key, None)
+
+        flight.add_done_callback(release)
+        return await asyncio.shield(flight), False
+
+    async def _run(self, awaitable: Awaitable[Any]) -> Any:
+        try:
+            return await awaitable
+        except Exception:
+            self._failed += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """返回合并指标：调用数、实际执行数、被合并的调用数及合并率"""
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "calls": self._calls,
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "coalesced_ratio": round(self._coalesced / self._calls, 4) if self._calls else 0.0,
+            "max_waiters": self._max_waiters,
+            "failed": self._failed,
+        }
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def singleflight_enabled() -> bool:
+    """读取 SINGLEFLIGHT 环境变量"""
+    return os.getenv("SINGLEFLIGHT", "1").lower() not in ("0", "false", "no")
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """获取（首次调用时创建）指定名称的合并分组"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name, enabled=singleflight_enabled())
+    return group
+
+
+def configure_singleflight(name: str, enabled: Optional[bool] = None) -> SingleFlight:
+    """替换指定名称的合并分组（重置指标），enabled 默认读取环境变量"""
+    group = SingleFlight(name, enabled=singleflight_enabled() if enabled is None else enabled)
+    _groups[name] = group
+    return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """全部合并分组的指标"""
+    return {name: group.stats() for name, group in sorted(_groups.items())}
@@ -0,0 +1,140 @@
+"""
+启动过程与预热
+
+服务启动时只导入处理 / 与 /detect 所需的模块（FastAPI、SQLAlchemy、numpy 与检测后端），
+pandas、scikit-learn、matplotlib（含中文字体解析）与 OpenAI 客户端等重型依赖在首次使用时导入，
+或由后台预热任务提前导入。启动阶段与预热阶段各模块的导入耗时记录在 StartupProfile 中，
+通过 /api/v1/diagnostics/startup 查看。
+
+相关环境变量：
+- STARTUP_MODE: 启动模式，默认 background
+  - background: 立即开始处理请求，检测模型加载、重型依赖导入与图表渲染进程的预热在后台进行
+  - eager: 完成全部预热后再开始处理请求
+  - lazy: 不预热，各模块在首次使用时导入
+"""
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODES = ("background", "eager", "lazy")
+
+# 后台预热时按顺序导入的模块（首次请求预测、图表或 AI 助教时才会用到）
+WARMUP_MODULES = [
+    "pandas",
+    "sklearn.ensemble",
+    "prediction",
+    "data_generator",
+    "forecasting.online",
+    "forecasting.batch",
+    "matplotlib",
+    "charts.engine",
+    "charts.line_chart",
+    "charts.radar_chart",
+    "openai",
+]
+
+
+def startup_mode() -> str:
+    """读取 STARTUP_MODE 环境变量"""
+    mode = os.getenv("STARTUP_MODE", "background").lower()
+    if mode not in STARTUP_MODES:
+        raise ValueError(f"不支持的启动模式: {mode}，可选值: {STARTUP_MODES}")
+    return mode
+
+
+class StartupProfile:
+    """
+    启动过程记录（线程安全）：各阶段的导入耗时、服务就绪时间与预热状态
+
+    导入耗时为包含依赖在内的增量耗时：已被先前阶段导入的依赖不再计入。
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_seconds: Optional[float] = None
+        self.warmup_state = "pending"
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+        self._imports: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str, phase: str = "boot"):
+        """记录代码块中导入 name 的耗时与新加载的模块数"""
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {
+                "module": name,
+                "phase": phase,
+                "seconds": round(time.perf_counter() - started, 4),
+                "modules_loaded": len(sys.modules) - modules_before,
+            }
+            with self._lock:
+                self._imports.append(entry)
+
+    def import_modules(self, names: List[str], phase: str = "warmup"):
+        """依次导入并记录各模块的导入耗时"""
+        for name in names:
+            with self.measure(name, phase=phase):
+                importlib.import_module(name)
+
+    def mark_ready(self):
+        """记录服务开始处理请求的时间"""
+        self.ready_seconds = time.perf_counter() - self.started
+
+    async def run_warmup(self, warm_up: Callable[[], Awaitable[Any]]):
+        """执行预热任务并记录状态与耗时（失败时只记录错误，不影响服务）"""
+        self.warmup_state = "running"
+        started = time.perf_counter()
+        try:
+            await warm_up()
+            self.warmup_state = "done"
+        except Exception as e:
+            logger.exception("启动预热失败")
+            self.warmup_state = "failed"
+            self.warmup_error = str(e)
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - started, 3)
+
+    def skip_warmup(self):
+        self.warmup_state = "skipped"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """启动过程概况：就绪耗时、预热状态与按耗时排序的各模块导入记录"""
+        with self._lock:
+            imports = sorted(self._imports, key=lambda entry: entry["seconds"], reverse=True)
+        return {
+            "mode": startup_mode(),
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "uptime_seconds": round(time.perf_counter() - self.started, 3),
+            "warmup": {
+                "state": self.warmup_state,
+                "seconds": self.warmup_seconds,
+                "error": self.warmup_error,
+            },
+            "deferred_modules": {name: name in sys.modules for name in WARMUP_MODULES},
+            "loaded_modules": len(sys.modules),
+            "imports": imports,
+        }
+
+
+_profile: Optional[StartupProfile] = None
+
+
+def get_startup_profile() -> StartupProfile:
+    """获取全局启动记录（首次调用时开始计时）"""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+    return _profile
@@ -0,0 +1,96 @@
+"""
+测试公共设置
+
+在导入后端模块之前设置环境变量：使用临时目录中的 SQLite 数据库，跳过启动预热，
+关闭后台预测快照线程，图表渲染与检测执行池使用线程模式（不拉起子进程）。
+
+用法（在 backend 目录下）：
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_work_dir = tempfile.mkdtemp(prefix="welding-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_work_dir, 'test.db')}",
+    STARTUP_MODE="lazy",
+    FORECAST_SNAPSHOTS="0",
+    CHART_RENDER_EXECUTOR="thread",
+    DETECT_EXECUTOR="thread",
+    DETECT_MICROBATCH_WAIT_MS="0",
+    DETECT_CACHE_DB="",
+    DETECT_SPOOL_DIR="",
+    CHART_CACHE_DIR="",
+)
+
+import asyncio  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import models  # noqa: E402
+from database import SessionLocal, engine, init_database  # noqa: E402
+
+init_database()
+
+
+@pytest.fixture
+def db():
+    """清空全部表后返回数据库会话"""
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """运行 lifespan 的测试客户端（数据库已清空）"""
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def detect_services():
+    """使用空的检测结果缓存, 测试结束后关闭检测执行池（下次使用时按环境变量重建）"""
+    from analysis.cache import configure_result_cache
+    from analysis.pool import shutdown_detection_executor
+
+    configure_result_cache()
+    yield
+    shutdown_detection_executor(wait=False)
+
+
+@pytest.fixture
+def post_detect(db, detect_services):
+    """
+    返回在同一事件循环中并发发起 /detect 请求的函数
+
+    ASGITransport 不经过 lifespan（数据库表已在导入时创建）, 各请求共用一个事件循环,
+    可用于测试执行池排队与并发请求合并。
+    """
+    import main
+
+    def post(payloads):
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+                return await asyncio.gather(*(
+                    client.post("/api/v1/detect", files={"file": (f"weld_{i}.png", payload, "image/png")})
+                    for i, payload in enumerate(payloads)
+                ))
+
+        return asyncio.run(run())
+
+    return post
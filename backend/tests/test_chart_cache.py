@@ -0,0 +1,105 @@
+"""图表缓存: /charts/{hash}.{格式} 的 ETag/304、磁盘淘汰与雷达图示例数据的缓存键"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+from charts.cache import ChartCache, chart_key, configure_chart_cache
+from charts.specs import generate_sample_data
+
+KEY = "ab" * 32
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"chart" * 100
+
+
+@pytest.fixture
+def chart_cache():
+    cache = configure_chart_cache(max_bytes=1024 * 1024)
+    yield cache
+    configure_chart_cache()
+
+
+def test_get_chart_returns_image_with_etag(client, chart_cache):
+    chart_cache.put(f"{KEY}.png", IMAGE)
+
+    response = client.get(f"/api/v1/charts/{KEY}.png")
+
+    assert response.status_code == 200
+    assert response.content == IMAGE
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["etag"] == f'"{KEY}"'
+    assert "immutable" in response.headers["cache-control"]
+
+
+@pytest.mark.parametrize("if_none_match", [f'"{KEY}"', f'W/"{KEY}"', f'"other", "{KEY}"', "*"])
+def test_matching_if_none_match_returns_304(client, chart_cache, if_none_match):
+    chart_cache.put(f"{KEY}.png", IMAGE)
+
+    response = client.get(f"/api/v1/charts/{KEY}.png", headers={"If-None-Match": if_none_match})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == f'"{KEY}"'
+
+
+def test_stale_etag_returns_image(client, chart_cache):
+    chart_cache.put(f"{KEY}.png", IMAGE)
+    response = client.get(f"/api/v1/charts/{KEY}.png", headers={"If-None-Match": '"' + "cd" * 32 + '"'})
+    assert response.status_code == 200
+    assert response.content == IMAGE
+
+
+def test_missing_and_invalid_chart_names(client, chart_cache):
+    assert client.get(f"/api/v1/charts/{KEY}.png").status_code == 404
+    assert client.get("/api/v1/charts/../../main.py").status_code == 404
+    assert client.get(f"/api/v1/charts/{KEY}.gif").status_code == 422
+    assert client.get("/api/v1/charts/abc.png").status_code == 422
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ChartCache(max_bytes=0, cache_dir=str(tmp_path), disk_max_bytes=250)
+    for i in range(3):
+        cache.put(f"k{i}.png", b"x" * 100)
+    assert sorted(os.listdir(tmp_path)) == ["k1.png", "k2.png"]
+
+    # 读取 k1 后它成为最近使用的图片, 下一次写入淘汰 k2
+    assert cache.get("k1.png") is not None
+    cache.put("k3.png", b"y" * 100)
+    assert sorted(os.listdir(tmp_path)) == ["k1.png", "k3.png"]
+    assert cache.stats()["disk_bytes"] == 200
+    assert cache.stats()["disk_evictions"] == 2
+
+    # 重启后从目录恢复, 超出新的上限时按修改时间淘汰
+    restarted = ChartCache(max_bytes=0, cache_dir=str(tmp_path), disk_max_bytes=100)
+    assert restarted.stats()["disk_entries"] == 1
+
+
+def test_seeded_sample_data_gives_stable_chart_keys():
+    first, second = generate_sample_data(seed=1), generate_sample_data(seed=1)
+    assert first == second
+    assert chart_key("defect_radar", first[0]) == chart_key("defect_radar", second[0])
+    assert generate_sample_data(seed=2) != first
+
+
+def test_predict_reuses_cached_charts(client, db, chart_cache):
+    db.add_all(
+        models.WeldingRecord(
+            timestamp=datetime(2025, 2, 1, 9) + timedelta(days=i),
+            student_id="s1",
+            speed_score=70.0 + i,
+            angle_score=75.0,
+            depth_score=80.0 - i,
+            defect_score=85.0,
+            total_score=77.0 + i * 0.5,
+        )
+        for i in range(10)
+    )
+    db.commit()
+    params = {"student_id": "s1", "mode": "rf", "embed": "false"}
+
+    first = client.get("/api/v1/predict", params=params).json()
+    renders = chart_cache.stats()["renders"]
+    second = client.get("/api/v1/predict", params=params).json()
+
+    assert first["charts"] == second["charts"]
+    assert chart_cache.stats()["renders"] == renders
@@ -0,0 +1,33 @@
+"""/detect/batch: NDJSON 流式结果与文件数量上限"""
+import json
+import os
+
+import models
+from api import detection
+
+
+def test_batch_streams_items_and_summary(client, db, detect_services):
+    image = os.urandom(128)
+    files = [("files", (f"weld_{i}.png", payload, "image/png")) for i, payload in enumerate([image, os.urandom(128), image])]
+
+    response = client.post("/api/v1/detect/batch", files=files)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    items = sorted((line for line in lines if line["type"] == "item"), key=lambda line: line["index"])
+    summary = lines[-1]
+    assert summary["type"] == "summary"
+    assert [item["index"] for item in items] == [0, 1, 2]
+    # 内容相同的图片得分相同
+    assert items[0]["scores"] == items[2]["scores"]
+    assert len(summary["record_ids"]) == 3 and None not in summary["record_ids"]
+    assert db.query(models.WeldingRecord).count() == 3
+
+
+def test_batch_with_too_many_files_returns_413(client, monkeypatch):
+    monkeypatch.setattr(detection, "BATCH_MAX_FILES", 2)
+    files = [("files", (f"weld_{i}.png", os.urandom(64), "image/png")) for i in range(3)]
+
+    response = client.post("/api/v1/detect/batch", files=files)
+
+    assert response.status_code == 413
@@ -0,0 +1,52 @@
+"""检测执行池: 池满时 /detect 返回 429"""
+import asyncio
+import os
+import threading
+
+import pytest
+
+import models
+from analysis.pool import DetectionExecutor, PoolSaturatedError, configure_detection_executor
+
+
+def test_saturated_pool_returns_429(db, post_detect):
+    configure_detection_executor(workers=1, max_inflight=1, queue_timeout=0)
+
+    responses = post_detect([os.urandom(256), os.urandom(256)])
+
+    assert sorted(r.status_code for r in responses) == [200, 429]
+    rejected = next(r for r in responses if r.status_code == 429)
+    assert rejected.headers["retry-after"] == "1"
+    assert db.query(models.WeldingRecord).count() == 1
+
+
+def test_pool_rejects_after_queue_timeout():
+    executor = DetectionExecutor(workers=1, max_inflight=1, queue_timeout=0.05)
+    release = threading.Event()
+
+    async def run():
+        holding = asyncio.ensure_future(executor.submit(release.wait, 5))
+        await asyncio.sleep(0.02)
+        with pytest.raises(PoolSaturatedError):
+            await executor.submit(lambda: None)
+        release.set()
+        return await holding
+
+    try:
+        assert asyncio.run(run()) is True
+        assert executor.stats()["rejected"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_queued_request_runs_when_slot_frees():
+    executor = DetectionExecutor(workers=1, max_inflight=1, queue_timeout=5)
+
+    async def run():
+        return await asyncio.gather(*(executor.submit(lambda i=i: i) for i in range(3)))
+
+    try:
+        assert asyncio.run(run()) == [0, 1, 2]
+        assert executor.stats()["rejected"] == 0
+    finally:
+        executor.shutdown()
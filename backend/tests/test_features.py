@@ -0,0 +1,103 @@
+"""预测特征库: 增量追加与整体计算逐位相同, /detect 写入的记录直接追加"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from api.dashboard import SCORE_COLUMNS
+from api.detection import _save_record
+from forecasting.features import FEATURE_COLUMNS, configure_feature_store
+from forecasting.history import load_student_history
+from prediction import _build_training_data, predict_future_scores
+
+STUDENT = "s1"
+START = datetime(2025, 2, 1, 9)
+
+
+@pytest.fixture
+def store():
+    store = configure_feature_store()
+    yield store
+    configure_feature_store()
+
+
+def _save(db, i, student_id=STUDENT, start=START):
+    scores = {name: float(55 + (i * 11 + j * 5) % 40) for j, name in enumerate(SCORE_COLUMNS)}
+    _save_record(db, {**scores, "timestamp": start + timedelta(hours=7 * i)}, student_id)
+
+
+def _expected_features(history):
+    _, X, _, feature_columns = _build_training_data(history.copy())
+    assert feature_columns == FEATURE_COLUMNS
+    return X.to_numpy(dtype=np.float64)
+
+
+def test_features_match_training_data_and_are_read_only(db, store):
+    for i in range(15):
+        _save(db, i)
+    history = load_student_history(db, STUDENT)
+
+    rows = store.features_for(STUDENT, history)
+    assert np.array_equal(rows[2:], _expected_features(history))
+    assert not rows.flags.writeable
+    assert store.features_for(STUDENT, history) is not rows
+    assert store.stats()["hits"] == 1
+
+
+def test_detect_appends_to_cached_features(db, store):
+    for i in range(10):
+        _save(db, i)
+    store.features_for(STUDENT, load_student_history(db, STUDENT))
+    before = store.stats()["extended_rows"]
+
+    for i in range(10, 14):
+        _save(db, i)
+    history = load_student_history(db, STUDENT)
+    rows = store.features_for(STUDENT, history)
+
+    stats = store.stats()
+    assert stats["appended_rows"] == 4
+    assert stats["extended_rows"] == before and stats["rebuilds"] == 0
+    assert np.array_equal(rows[2:], _expected_features(history))
+
+    # 追加得到的特征与摘要同重新物化的结果逐位相同
+    rebuilt = configure_feature_store()
+    assert np.array_equal(rebuilt.features_for(STUDENT, history), rows, equal_nan=True)
+    assert rebuilt._students[STUDENT].digest.digest() == store._students[STUDENT].digest.digest()
+
+
+def test_prefix_of_materialized_rows_is_a_hit(db, store):
+    for i in range(12):
+        _save(db, i)
+    history = load_student_history(db, STUDENT)
+    full = store.features_for(STUDENT, history)
+
+    prefix = store.features_for(STUDENT, history.iloc[:8])
+    assert np.array_equal(prefix, full[:8], equal_nan=True)
+    assert store.stats()["rebuilds"] == 0
+
+
+def test_changed_or_out_of_order_history_is_rebuilt(db, store):
+    for i in range(10):
+        _save(db, i)
+    history = load_student_history(db, STUDENT)
+    store.features_for(STUDENT, history)
+
+    changed = history.copy()
+    changed.loc[0, "score"] += 1.0
+    assert np.array_equal(store.features_for(STUDENT, changed)[2:], _expected_features(changed))
+    assert store.stats()["rebuilds"] == 1
+
+    # 早于已物化行的新记录使该学员的特征整体重建
+    store.features_for(STUDENT, history)
+    _save(db, 0, start=START - timedelta(days=30))
+    history = load_student_history(db, STUDENT)
+    assert np.array_equal(store.features_for(STUDENT, history)[2:], _expected_features(history))
+
+
+def test_store_forecast_matches_recomputed_forecast(db, store):
+    for i in range(20):
+        _save(db, i)
+    history = load_student_history(db, STUDENT)
+    rows = store.features_for(STUDENT, history)
+    assert predict_future_scores(history, days=5, feature_rows=rows) == predict_future_scores(history, days=5)
@@ -0,0 +1,90 @@
+"""多步预测循环: 向量化后的 predict_future_scores 与原逐天循环的结果逐位相同"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_generator import generate_dataset
+from prediction import _build_training_data, fit_forecast_model, predict_future_scores
+
+
+def _reference_forecast(data: pd.DataFrame, days: int) -> dict:
+    """原实现的逐天预测循环（全局随机种子、字典构造特征、sklearn 逐行预测）"""
+    df = data.copy()
+    df['t'] = pd.to_datetime(df['t'])
+    df, X, y, feature_columns = _build_training_data(df)
+    scaler, rf_model = fit_forecast_model(X, y)
+    use_lags = 'score_lag1' in feature_columns
+
+    forecast = {}
+    for i in range(days):
+        future_time = df['t'].max() + timedelta(days=i + 1)
+        features = {
+            'day_of_year': future_time.dayofyear,
+            'day_of_week': future_time.dayofweek,
+            'hour': future_time.hour,
+            'time_index': len(df) + i,
+        }
+        recent_data = df.tail(min(5, len(df)))
+        np.random.seed(42 + i)
+        for col in ('x', 'y', 'z'):
+            trend = np.polyfit(range(len(recent_data)), recent_data[col], 1)[0]
+            noise = np.random.normal(0, 2)
+            features[col] = np.clip(df[col].iloc[-1] + trend * (i + 1) + noise, 0, 100)
+
+        if use_lags:
+            prev_scores = list(forecast.values())
+            if i == 0:
+                features['score_lag1'] = df['score'].iloc[-1]
+                features['score_lag2'] = df['score'].iloc[-2]
+                features['score_ma3'] = df['score'].tail(3).mean()
+                for col in ('x', 'y', 'z'):
+                    features[f'{col}_lag1'] = df[col].iloc[-1]
+                    features[f'{col}_ma3'] = df[col].tail(3).mean()
+            else:
+                features['score_lag1'] = prev_scores[-1]
+                features['score_lag2'] = prev_scores[-2] if len(prev_scores) >= 2 else df['score'].iloc[-1]
+                features['score_ma3'] = np.mean((list(df['score'].tail(2)) + prev_scores)[-3:])
+                for col in ('x', 'y', 'z'):
+                    features[f'{col}_lag1'] = features[col]
+                    features[f'{col}_ma3'] = features[col]
+
+        row = scaler.transform(pd.DataFrame([[features[col] for col in feature_columns]], columns=feature_columns))
+        predicted_score = np.clip(rf_model.predict(row)[0], 0, 100)
+        forecast[future_time.strftime('%Y-%m-%d %H:%M:%S')] = round(float(predicted_score), 2)
+    return forecast
+
+
+def _random_history(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    xyz = np.clip(rng.normal(60, 15, (n, 3)), 0, 100)
+    return pd.DataFrame({
+        't': [datetime(2025, 3, 1, 8) + timedelta(days=i, hours=int(h)) for i, h in enumerate(rng.integers(0, 10, n))],
+        'x': xyz[:, 0],
+        'y': xyz[:, 1],
+        'z': xyz[:, 2],
+        'score': np.round(xyz @ [0.3, 0.3, 0.4], 2),
+    })
+
+
+@pytest.mark.parametrize("days", [1, 2, 5, 14])
+def test_generated_dataset_forecast_matches_reference(days):
+    data = generate_dataset()
+    result = predict_future_scores(data, days=days, use_cache=False)
+    assert result["forecast"] == _reference_forecast(data, days)
+
+
+@pytest.mark.parametrize("n, seed", [(2, 1), (4, 2), (5, 3), (12, 4), (60, 5)])
+def test_random_history_forecast_matches_reference(n, seed):
+    data = _random_history(n, seed)
+    result = predict_future_scores(data, days=7, use_cache=False)
+    assert result["forecast"] == _reference_forecast(data, 7)
+
+
+def test_forecast_does_not_touch_global_random_state():
+    np.random.seed(123)
+    expected = np.random.random(3)
+    np.random.seed(123)
+    predict_future_scores(_random_history(12, 6), days=5, use_cache=False)
+    assert np.array_equal(np.random.random(3), expected)
@@ -0,0 +1,86 @@
+"""预测模型: 注册表按训练数据指纹复用已拟合模型, 展平森林与 sklearn 逐位相同"""
+import numpy as np
+import pytest
+
+from data_generator import generate_dataset
+from forecasting.forest import compile_forest
+from forecasting.registry import ForecastModelRegistry, configure_model_registry, training_fingerprint
+from prediction import _build_training_data, fit_forecast_model, predict_future_scores
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    _, X, y, feature_columns = _build_training_data(generate_dataset())
+    return X, y, feature_columns
+
+
+@pytest.fixture(scope="module")
+def fitted(training_data):
+    X, y, _ = training_data
+    return fit_forecast_model(X, y)
+
+
+def test_compiled_forest_matches_sklearn_bit_for_bit(training_data, fitted):
+    X, _, _ = training_data
+    scaler, rf_model = fitted
+    forest = compile_forest(rf_model)
+
+    rng = np.random.default_rng(11)
+    scaled = scaler.transform(X)
+    # 训练样本、扰动后的样本与远离训练分布的样本
+    rows = np.vstack([
+        scaled,
+        scaled + rng.normal(0, 0.5, scaled.shape),
+        rng.normal(0, 5, (200, scaled.shape[1])),
+    ])
+    expected = rf_model.predict(rows)
+    actual = np.array([forest.predict_row(row) for row in rows])
+    assert np.array_equal(actual, expected)
+
+
+def test_compile_forest_is_cached_per_model(fitted):
+    _, rf_model = fitted
+    assert compile_forest(rf_model) is compile_forest(rf_model)
+
+
+def test_registry_fits_once_per_fingerprint(training_data, tmp_path):
+    X, y, feature_columns = training_data
+    fingerprint = training_fingerprint(X, y, feature_columns)
+    registry = ForecastModelRegistry(cache_dir=str(tmp_path))
+    calls = []
+
+    def fit():
+        calls.append(1)
+        return fit_forecast_model(X, y)
+
+    model, source = registry.get_or_fit(fingerprint, fit)
+    assert source == "fit"
+    assert registry.get_or_fit(fingerprint, fit) == (model, "memory")
+
+    # 重启后从磁盘加载, 预测结果不变
+    restarted = ForecastModelRegistry(cache_dir=str(tmp_path))
+    (scaler, rf_model), source = restarted.get_or_fit(fingerprint, fit)
+    assert source == "disk"
+    assert len(calls) == 1
+    rows = model[0].transform(X)
+    assert np.array_equal(rf_model.predict(scaler.transform(X)), model[1].predict(rows))
+
+
+def test_fingerprint_changes_with_training_data(training_data):
+    X, y, feature_columns = training_data
+    changed = y.copy()
+    changed.iloc[-1] += 0.01
+    assert training_fingerprint(X, y, feature_columns) != training_fingerprint(X, changed, feature_columns)
+    assert training_fingerprint(X, y, feature_columns) != training_fingerprint(X, y, feature_columns[::-1])
+
+
+def test_cached_forecast_matches_fresh_fit():
+    registry = configure_model_registry()
+    data = generate_dataset()
+    try:
+        fresh = predict_future_scores(data, days=5, use_cache=False)
+        assert predict_future_scores(data, days=5) == fresh
+        assert predict_future_scores(data, days=5) == fresh
+        assert registry.stats()["fits"] == 1 and registry.stats()["hits"] == 1
+    finally:
+        configure_model_registry()
@@ -0,0 +1,86 @@
+"""/dashboard/history 的游标分页"""
+from datetime import datetime, timedelta
+
+import models
+
+
+def _add_records(db, timestamps, scores=None):
+    records = []
+    for i, timestamp in enumerate(timestamps):
+        score = scores[i] if scores else 80.0
+        records.append(models.WeldingRecord(
+            timestamp=timestamp,
+            speed_score=score,
+            angle_score=score,
+            depth_score=score,
+            defect_score=score,
+            total_score=score,
+        ))
+    db.add_all(records)
+    db.commit()
+    return records
+
+
+def _expected_order(records):
+    return [r.id for r in sorted(records, key=lambda r: (r.timestamp, r.id), reverse=True)]
+
+
+def _fetch_all(client, **params):
+    ids, pages, cursor = [], [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        page = client.get("/api/v1/dashboard/history", params=query).json()
+        pages.append(page)
+        ids += [item["id"] for item in page["items"]]
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return ids, pages
+        cursor = page["next_cursor"]
+
+
+def test_pages_cover_ties_without_gaps_or_duplicates(client, db):
+    # 多条记录时间戳相同, 需按 id 决胜
+    base = datetime(2025, 3, 1, 8)
+    timestamps = [base, base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+                  base + timedelta(minutes=1), base + timedelta(minutes=2), base]
+    records = _add_records(db, timestamps)
+
+    ids, pages = _fetch_all(client, limit=2)
+
+    assert ids == _expected_order(records)
+    assert [len(page["items"]) for page in pages] == [2, 2, 2, 1]
+
+
+def test_last_page_exactly_full(client, db):
+    base = datetime(2025, 3, 1, 8)
+    records = _add_records(db, [base + timedelta(seconds=i) for i in range(6)])
+
+    ids, pages = _fetch_all(client, limit=3)
+
+    assert ids == _expected_order(records)
+    # 记录数恰为每页条数的整数倍时, 第二页即末页, 不会多出一个空页
+    assert len(pages) == 2
+    assert pages[0]["has_more"] and not pages[1]["has_more"]
+
+
+def test_limit_bounds_and_empty_table(client, db):
+    page = client.get("/api/v1/dashboard/history").json()
+    assert page == {"items": [], "next_cursor": None, "has_more": False}
+    assert client.get("/api/v1/dashboard/history", params={"limit": 0}).status_code == 422
+    assert client.get("/api/v1/dashboard/history", params={"limit": 501}).status_code == 422
+
+
+def test_filters_apply_across_pages(client, db):
+    base = datetime(2025, 3, 1, 8)
+    scores = [60.0, 90.0, 95.0, 70.0, 91.0, 99.0, 92.0]
+    records = _add_records(db, [base + timedelta(minutes=i) for i in range(len(scores))], scores)
+
+    ids, _ = _fetch_all(client, limit=2, min_score=90, end_time=(base + timedelta(minutes=5)).isoformat())
+
+    expected = [r for r in records if r.total_score >= 90 and r.timestamp <= base + timedelta(minutes=5)]
+    assert ids == _expected_order(expected)
+
+
+def test_invalid_cursor(client, db):
+    response = client.get("/api/v1/dashboard/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
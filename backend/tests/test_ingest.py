@@ -0,0 +1,39 @@
+"""/detect 上传流式接收: 请求格式、缺少文件字段与大小上限"""
+import os
+
+import models
+
+
+def test_streamed_upload_is_scored_and_stored(client, db, detect_services, tmp_path, monkeypatch):
+    monkeypatch.setenv("DETECT_SPOOL_DIR", str(tmp_path))
+
+    response = client.post("/api/v1/detect", files={"file": ("weld.png", os.urandom(2048), "image/png")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["filename"] == "weld.png"
+    assert set(body["scores"]) == {"speed_score", "angle_score", "depth_score", "defect_score", "total_score"}
+    assert db.query(models.WeldingRecord).count() == 1
+    # 暂存文件在推理完成后删除
+    assert os.listdir(tmp_path) == []
+
+
+def test_non_multipart_body_returns_400(client):
+    response = client.post("/api/v1/detect", content=b"raw", headers={"content-type": "application/octet-stream"})
+    assert response.status_code == 400
+
+
+def test_missing_file_field_returns_422(client):
+    response = client.post("/api/v1/detect", files={"image": ("weld.png", b"data", "image/png")})
+    assert response.status_code == 422
+    assert "file" in response.json()["detail"]
+
+
+def test_oversized_upload_returns_413_and_removes_spool(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("DETECT_MAX_UPLOAD_MB", str(1 / 1024))  # 1KB
+    monkeypatch.setenv("DETECT_SPOOL_DIR", str(tmp_path))
+
+    response = client.post("/api/v1/detect", files={"file": ("weld.png", os.urandom(4096), "image/png")})
+
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,96 @@
+"""在线预测模式: 增量维护的学员状态与全量重放一致, /predict/custom 的在线模式直接外推"""
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from api.dashboard import SCORE_COLUMNS
+from api.detection import _save_record
+from database import SessionLocal
+from forecasting.history import load_student_history
+from forecasting.online import (
+    HoltForecaster,
+    HoltState,
+    get_online_forecaster,
+    load_online_state,
+    rebuild_online_states,
+)
+
+STUDENT = "s1"
+START = datetime(2025, 2, 1, 9)
+
+
+def _scores(i: int) -> dict:
+    scores = {name: float(60 + (i * 7 + j * 3) % 35) for j, name in enumerate(SCORE_COLUMNS)}
+    return {**scores, "timestamp": START + timedelta(hours=9 * i)}
+
+
+def test_incremental_update_matches_replay():
+    forecaster = HoltForecaster(alpha=0.4, beta=0.2)
+    values = [70.0, 72.5, 71.0, 75.0, 78.25, 77.0, 80.0]
+    incremental = HoltState()
+    for i, value in enumerate(values):
+        forecaster.update(incremental, value, START + timedelta(days=i))
+
+    frame = pd.DataFrame({"t": [START + timedelta(days=i) for i in range(len(values))], "score": values})
+    assert forecaster.replay(frame) == incremental
+    assert incremental.count == len(values) and incremental.error_count == len(values) - 1
+    assert list(forecaster.forecast(incremental, 2)) == ["2025-02-08 09:00:00", "2025-02-09 09:00:00"]
+
+
+def test_saved_records_update_state_like_rebuild(db):
+    for i in range(20):
+        _save_record(db, _scores(i), STUDENT)
+    incremental = load_online_state(db, STUDENT)
+    assert incremental.count == 20
+
+    assert rebuild_online_states(db) == 1
+    db.expire_all()
+    assert load_online_state(db, STUDENT) == incremental
+    assert get_online_forecaster().replay(load_student_history(db, STUDENT)) == incremental
+
+
+def test_concurrent_first_records_of_a_new_student(db):
+    errors = []
+
+    def save(i):
+        session = SessionLocal()
+        try:
+            _save_record(session, _scores(i), "new-student")
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert load_online_state(db, "new-student").count == 8
+
+
+def test_custom_online_prediction_uses_stored_state(client, db):
+    for i in range(12):
+        _save_record(db, _scores(i), STUDENT)
+    state = load_online_state(db, STUDENT)
+    forecaster = get_online_forecaster()
+
+    response = client.post("/api/v1/predict/custom", params={"mode": "online", "days": 3}, json={"student_id": STUDENT})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["mode"] == "online" and body["source"] == "records"
+    assert body["forecast"] == forecaster.forecast(state, 3)
+    assert len(body["history"]) == 12
+
+    # 附加的记录在已维护的状态之上继续吸收
+    extra = {"t": "2025-02-06 09:00:00", "x": 90.0, "y": 90.0, "z": 90.0, "score": 95.0}
+    response = client.post(
+        "/api/v1/predict/custom", params={"mode": "online", "days": 3},
+        json={"student_id": STUDENT, "records": [extra]},
+    )
+    expected = forecaster.update(load_online_state(db, STUDENT), 95.0, datetime(2025, 2, 6, 9))
+    assert response.json()["forecast"] == pytest.approx(forecaster.forecast(expected, 3))
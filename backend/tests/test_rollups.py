@@ -0,0 +1,93 @@
+"""评分汇总表: 增量维护的汇总与原始记录上的聚合一致"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import models
+from api.dashboard import SCORE_COLUMNS, query_aggregates
+from api.detection import _save_record
+from rollups import rebuild_rollups
+
+START = datetime(2025, 1, 1, 6)  # 周三
+
+
+@pytest.fixture
+def records(db):
+    """跨越多个小时、天与周的记录（汇总表由各测试全量重建）"""
+    rng = np.random.default_rng(7)
+    offsets = np.sort(rng.integers(0, 20 * 24 * 60, 300))
+    rows = []
+    for offset in offsets:
+        scores = {name: float(np.round(rng.uniform(40, 100), 2)) for name in SCORE_COLUMNS}
+        rows.append({"timestamp": START + timedelta(minutes=int(offset)), **scores})
+    db.add_all(models.WeldingRecord(**row) for row in rows)
+    db.commit()
+    return pd.DataFrame(rows)
+
+
+def _raw_buckets(frame: pd.DataFrame, granularity: str) -> pd.Series:
+    timestamps = frame["timestamp"]
+    if granularity == "hour":
+        return timestamps.dt.strftime("%Y-%m-%d %H:00:00")
+    days = timestamps.dt.normalize()
+    if granularity == "week":
+        days = days - pd.to_timedelta(days.dt.dayofweek, unit="D")
+    return days.dt.strftime("%Y-%m-%d")
+
+
+def _rollup_rows(db):
+    return sorted(
+        (r.granularity, r.bucket_start, r.dimension, r.count, round(r.sum, 6), round(r.sum_sq, 4), r.min, r.max)
+        for r in db.query(models.ScoreRollup).all()
+    )
+
+
+def test_incremental_rollups_match_rebuild(db):
+    # 与 /detect 相同, 逐条写入记录并在同一事务中更新汇总表
+    for i in range(40):
+        scores = {name: float(50 + (i * 7 + j) % 50) for j, name in enumerate(SCORE_COLUMNS)}
+        _save_record(db, {**scores, "timestamp": START + timedelta(hours=5 * i)})
+    incremental = _rollup_rows(db)
+    assert incremental
+
+    rebuild_rollups(db)
+    assert _rollup_rows(db) == incremental
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day", "week"])
+def test_aggregates_match_raw_records(db, records, granularity):
+    rebuild_rollups(db)
+    end = START + timedelta(days=21)
+    result = query_aggregates(db, granularity, start_time=START, end_time=end, percentiles=True)
+
+    frame = records.assign(bucket=_raw_buckets(records, granularity))
+    grouped = frame.groupby("bucket")
+    assert [bucket.bucket_start for bucket in result.buckets] == sorted(grouped.groups)
+
+    for bucket in result.buckets:
+        group = grouped.get_group(bucket.bucket_start)
+        assert bucket.count == len(group)
+        for name in SCORE_COLUMNS:
+            values = group[name].to_numpy()
+            summary = bucket.scores[name]
+            assert summary.mean == pytest.approx(round(values.mean(), 2), abs=0.011)
+            assert summary.std == pytest.approx(round(values.std(), 2), abs=0.011)
+            assert summary.min == values.min()
+            assert summary.max == values.max()
+            # 最近秩法分位数
+            ordered = np.sort(values)
+            assert summary.p50 == ordered[int(np.ceil(0.5 * len(ordered))) - 1]
+            assert summary.p90 == ordered[int(np.ceil(0.9 * len(ordered))) - 1]
+
+
+def test_week_buckets_start_on_monday_and_are_complete(db, records):
+    rebuild_rollups(db)
+    # 起始时间在周三, 所在周仍从周一起完整计入
+    result = query_aggregates(db, "week", start_time=START, end_time=START + timedelta(days=3), percentiles=False)
+
+    assert [bucket.bucket_start for bucket in result.buckets] == ["2024-12-30"]
+    week = records[(records["timestamp"] >= datetime(2024, 12, 30)) & (records["timestamp"] < datetime(2025, 1, 6))]
+    assert result.buckets[0].count == len(week)
+    assert result.buckets[0].scores["total_score"].p50 is None
@@ -0,0 +1,74 @@
+"""批量评分引擎: 与原逐张评分（全局 np.random 播种）的结果逐位一致"""
+import hashlib
+
+import numpy as np
+
+from analysis.backends import DetectionInput, SyntheticDetector
+from analysis.scoring import results_to_matrix, score_digests, score_rows
+
+
+def _reference_scores(digest: str) -> dict:
+    """原 _analyze_image_features 的评分（不含模拟耗时）"""
+    seed = int(digest[:8], 16) % 2**32
+    np.random.seed(seed)
+    base_scores = np.random.normal(85, 8, 4)
+    adjustment_factor = np.random.uniform(0.9, 1.1)
+    return {
+        'speed': max(70, min(99, base_scores[0] * adjustment_factor)),
+        'angle': max(70, min(99, base_scores[1] * adjustment_factor)),
+        'depth': max(70, min(99, base_scores[2] * adjustment_factor)),
+        'defect': max(70, min(99, base_scores[3] * adjustment_factor)),
+    }
+
+
+def _reference_row(analysis_results: dict) -> dict:
+    """原 /detect 中的取整与综合得分"""
+    speed_score = round(analysis_results['speed'], 2)
+    angle_score = round(analysis_results['angle'], 2)
+    depth_score = round(analysis_results['depth'], 2)
+    defect_score = round(analysis_results['defect'], 2)
+    total_score = round((speed_score + angle_score + depth_score + defect_score) / 4, 2)
+    return {
+        "speed_score": speed_score,
+        "angle_score": angle_score,
+        "depth_score": depth_score,
+        "defect_score": defect_score,
+        "total_score": total_score,
+    }
+
+
+DIGESTS = [hashlib.md5(str(i).encode()).hexdigest() for i in range(2000)]
+
+
+def test_batch_scores_match_reference_bit_for_bit():
+    reference = np.array([[r[k] for k in ("speed", "angle", "depth", "defect")]
+                          for r in map(_reference_scores, DIGESTS)])
+    batch = score_digests(DIGESTS)
+    assert batch.dtype == np.float64
+    assert np.array_equal(batch, reference)
+
+
+def test_rounded_rows_match_reference():
+    expected = [_reference_row(_reference_scores(digest)) for digest in DIGESTS]
+    assert score_rows(score_digests(DIGESTS)) == expected
+
+
+def test_single_image_is_the_n1_case():
+    batch = score_digests(DIGESTS[:50])
+    for i, digest in enumerate(DIGESTS[:50]):
+        assert np.array_equal(score_digests([digest])[0], batch[i])
+
+
+def test_result_dicts_round_trip():
+    matrix = score_digests(DIGESTS[:10])
+    results = [dict(zip(("speed", "angle", "depth", "defect"), row)) for row in matrix.tolist()]
+    assert np.array_equal(results_to_matrix(results), matrix)
+    assert results_to_matrix([]).shape == (0, 4)
+
+
+def test_scoring_leaves_global_random_state_untouched():
+    np.random.seed(123)
+    before = np.random.get_state()[1].copy()
+    score_digests(DIGESTS[:20])
+    SyntheticDetector(latency_range=None).predict_batch([DetectionInput(digest=DIGESTS[0])])
+    assert np.array_equal(np.random.get_state()[1], before)
@@ -0,0 +1,104 @@
+"""并发相同请求的合并"""
+import asyncio
+import os
+
+import models
+from singleflight import SingleFlight, configure_singleflight
+
+
+def _counting(calls, result="value", delay=0.05, error=None):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return compute
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(group.do("key", _counting(calls)) for _ in range(10)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == ["value"] * 10
+    assert sorted(shared for _, shared in results) == [False] + [True] * 9
+    stats = group.stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 9 and stats["in_flight"] == 0
+
+
+def test_different_keys_and_later_calls_run_separately():
+    group = SingleFlight("test")
+    calls = []
+
+    async def run():
+        await asyncio.gather(group.do("a", _counting(calls)), group.do("b", _counting(calls)))
+        # 计算完成后键即释放, 之后的调用重新计算
+        await group.do("a", _counting(calls))
+
+    asyncio.run(run())
+    assert len(calls) == 3
+
+
+def test_failure_reaches_every_waiter_and_releases_key():
+    group = SingleFlight("test")
+    calls = []
+
+    async def run():
+        failing = [group.do("key", _counting(calls, error=ValueError("boom"))) for _ in range(3)]
+        results = await asyncio.gather(*failing, return_exceptions=True)
+        value, shared = await group.do("key", _counting(calls))
+        return results, value, shared
+
+    results, value, shared = asyncio.run(run())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert (value, shared) == ("value", False)
+    assert len(calls) == 2
+    assert group.stats()["failed"] == 1
+
+
+def test_cancelled_initiator_does_not_cancel_shared_computation():
+    group = SingleFlight("test")
+    calls = []
+
+    async def run():
+        initiator = asyncio.ensure_future(group.do("key", _counting(calls, delay=0.1)))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(group.do("key", _counting(calls)))
+        await asyncio.sleep(0.01)
+        initiator.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == ("value", True)
+    assert len(calls) == 1
+
+
+def test_disabled_group_runs_every_call():
+    group = SingleFlight("test", enabled=False)
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(group.do("key", _counting(calls)) for _ in range(4)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 4
+    assert not any(shared for _, shared in results)
+
+
+def test_identical_concurrent_uploads_share_one_inference(db, post_detect):
+    group = configure_singleflight("detect", enabled=True)
+    image = os.urandom(512)
+
+    responses = post_detect([image] * 5)
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({tuple(sorted(r.json()["scores"].items())) for r in responses}) == 1
+    assert group.stats()["executions"] == 1
+    # 每个请求仍各自写入一条记录
+    assert db.query(models.WeldingRecord).count() == 5
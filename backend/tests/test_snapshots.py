@@ -0,0 +1,170 @@
+"""预测快照: 时效标记、按需刷新（与后台全量刷新并行）与旧快照清理"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+from forecasting import snapshots
+from forecasting.snapshots import SnapshotScheduler, save_synthetic_snapshot
+
+STUDENT = "s1"
+
+
+def _add_history(db, student_id=STUDENT, n=12, start=datetime(2025, 2, 1, 9)):
+    db.add_all(
+        models.WeldingRecord(
+            timestamp=start + timedelta(days=i),
+            student_id=student_id,
+            speed_score=70.0 + i,
+            angle_score=75.0 + (i % 3),
+            depth_score=80.0 - (i % 4),
+            defect_score=85.0,
+            total_score=77.0 + i * 0.5,
+        )
+        for i in range(n)
+    )
+    db.commit()
+
+
+def _snapshot_count(db, student_id):
+    return db.query(models.ForecastSnapshot).filter_by(student_id=student_id).count()
+
+
+@pytest.fixture
+def scheduler():
+    # 不启动后台线程, 由测试同步调用 refresh
+    return SnapshotScheduler(interval=3600, debounce=0, days=5, enabled=True)
+
+
+def test_refresh_writes_fresh_snapshot(db, scheduler):
+    _add_history(db)
+    assert scheduler.latest(db, STUDENT) is None
+
+    summary = scheduler.refresh([STUDENT])
+    assert summary["succeeded"] == 1
+
+    snapshot = scheduler.latest(db, STUDENT)
+    info = scheduler.describe(snapshot)
+    assert info["stale"] is False
+    assert info["days"] == 5
+    assert info["history_points"] == 12
+    assert len(snapshot.forecast) == 5
+
+
+def test_new_records_mark_snapshot_stale_until_refreshed(db, scheduler):
+    _add_history(db)
+    scheduler.refresh([STUDENT])
+    first = scheduler.latest(db, STUDENT)
+
+    _add_history(db, n=1, start=datetime(2025, 3, 1, 9))
+    scheduler.mark_dirty([STUDENT])
+    assert scheduler.describe(scheduler.latest(db, STUDENT))["stale"] is True
+    # 只有该学员等待刷新
+    assert scheduler.stats()["dirty_students"] == 1
+
+    scheduler.refresh([STUDENT])
+    db.expire_all()
+    latest = scheduler.latest(db, STUDENT)
+    assert latest.id > first.id
+    assert latest.history_points == 13
+    assert scheduler.describe(latest)["stale"] is False
+
+
+def test_expired_snapshot_is_stale(db, scheduler):
+    _add_history(db)
+    scheduler.refresh([STUDENT])
+    snapshot = scheduler.latest(db, STUDENT)
+    snapshot.created_at = snapshot.created_at - timedelta(seconds=scheduler.interval + 1)
+    assert scheduler.describe(snapshot)["stale"] is True
+
+
+def test_days_mismatch_is_a_miss(db, scheduler):
+    _add_history(db)
+    scheduler.refresh([STUDENT])
+    other = SnapshotScheduler(days=3, enabled=True)
+    assert other.latest(db, STUDENT) is None
+
+
+def test_old_snapshots_are_pruned(db, scheduler, monkeypatch):
+    monkeypatch.setenv("FORECAST_SNAPSHOT_KEEP", "2")
+    _add_history(db)
+    _add_history(db, student_id="s2")
+    for _ in range(4):
+        scheduler.refresh([STUDENT])
+    scheduler.refresh(["s2"])
+
+    assert _snapshot_count(db, STUDENT) == 2
+    # 只清理本次写入的学员
+    assert _snapshot_count(db, "s2") == 1
+    ids = [s.id for s in db.query(models.ForecastSnapshot).filter_by(student_id=STUDENT)]
+    assert scheduler.latest(db, STUDENT).id == max(ids)
+
+
+def test_synthetic_snapshots_are_pruned(db, monkeypatch):
+    monkeypatch.setenv("FORECAST_SNAPSHOT_KEEP", "1")
+    for _ in range(3):
+        save_synthetic_snapshot(db, days=5)
+    assert _snapshot_count(db, models.DEFAULT_STUDENT_ID) == 1
+
+
+@pytest.fixture
+def slow_full_refresh(monkeypatch):
+    """全量刷新在 release 被设置前阻塞, 记录每次刷新涉及的学员"""
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+    original = snapshots.refresh_snapshots
+
+    def refresh(db, student_ids=None, **kwargs):
+        calls.append(student_ids)
+        if student_ids is None:
+            started.set()
+            assert release.wait(10)
+        return original(db, student_ids, **kwargs)
+
+    monkeypatch.setattr(snapshots, "refresh_snapshots", refresh)
+    return started, release, calls
+
+
+def test_on_demand_refresh_does_not_wait_for_full_refresh(db, scheduler, slow_full_refresh):
+    started, release, calls = slow_full_refresh
+    _add_history(db)
+    _add_history(db, student_id="s2")
+    full = threading.Thread(target=scheduler.refresh)
+    full.start()
+    try:
+        assert started.wait(5)
+        summary = scheduler.refresh([STUDENT], on_demand=True)
+        assert summary["succeeded"] == 1
+        assert full.is_alive()
+        assert scheduler.latest(db, STUDENT) is not None
+    finally:
+        release.set()
+        full.join()
+    assert calls == [None, [STUDENT]]
+    assert scheduler.stats()["on_demand_refreshes"] == 1
+
+
+def test_on_demand_refresh_waits_for_student_already_refreshing(db, scheduler, slow_full_refresh):
+    started, release, calls = slow_full_refresh
+    _add_history(db)
+    scheduler.mark_dirty([STUDENT])
+    full = threading.Thread(target=scheduler.refresh)
+    full.start()
+    assert started.wait(5)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(scheduler.refresh([STUDENT], on_demand=True)))
+    waiter.start()
+    waiter.join(0.2)
+    # 该学员在全量刷新中: 按需刷新等待那次刷新的结果, 不重复拟合
+    assert waiter.is_alive()
+    release.set()
+    full.join()
+    waiter.join()
+
+    assert calls == [None]
+    assert results[0]["errors"] == {}
+    assert scheduler.latest(db, STUDENT) is not None
+    assert scheduler.stats()["refreshing"] is False
@@ -9,6 +9,16 @@ interface PredictionData {
   line_chart: string;
   defect_radar: string;
   skill_radar: string;
+  charts?: Record<string, string>;
+}
+
+type ChartName = "line_chart" | "defect_radar" | "skill_radar"
+
+// 图表地址：优先使用后端返回的 /charts/{hash}.png 地址（内容不变时由浏览器缓存），否则使用内嵌的base64图片
+function chartSrc(data: PredictionData | null, name: ChartName): string | null {
+  if (!data) return null
+  if (data.charts?.[name]) return data.charts[name]
+  return data[name] ? `data:image/png;base64,${data[name]}` : null
 }
 
 // 预测图表组件
@@ -24,7 +34,7 @@ function PredictionChart({ chartData }: { chartData: string | null }) {
   return (
     <div className="w-full h-80 flex items-center justify-center">
       <img 
-        src={`data:image/png;base64,${chartData}`} 
+        src={chartData} 
         alt="预测趋势图表" 
         className="max-w-full max-h-full object-contain"
       />
@@ -45,7 +55,7 @@ function DefectRadar({ radarData }: { radarData: string | null }) {
   return (
     <div className="w-full h-64 flex items-center justify-center">
       <img 
-        src={`data:image/png;base64,${radarData}`} 
+        src={radarData} 
         alt="缺陷雷达图" 
         className="max-w-full max-h-full object-contain"
       />
@@ -66,7 +76,7 @@ function SkillRadar({ radarData }: { radarData: string | null }) {
   return (
     <div className="w-full h-64 flex items-center justify-center">
       <img 
-        src={`data:image/png;base64,${radarData}`} 
+        src={radarData} 
         alt="技能雷达图" 
         className="max-w-full max-h-full object-contain"
       />
@@ -105,7 +115,7 @@ export function PredictionDashboardContent() {
         setLoading(true)
         setError(null)
         
-        const response = await fetch("http://127.0.0.1:8000/api/v1/predict")
+        const response = await fetch("http://127.0.0.1:8000/api/v1/predict?embed=false")
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`)
         }
@@ -160,7 +170,7 @@ export function PredictionDashboardContent() {
           </CardTitle>
         </CardHeader>
         <CardContent className="p-6">
-          <PredictionChart chartData={predictionData?.line_chart || null} />
+          <PredictionChart chartData={chartSrc(predictionData, "line_chart")} />
         </CardContent>
       </Card>
 
@@ -174,7 +184,7 @@ export function PredictionDashboardContent() {
             </CardTitle>
           </CardHeader>
           <CardContent className="p-6">
-            <DefectRadar radarData={predictionData?.defect_radar || null} />
+            <DefectRadar radarData={chartSrc(predictionData, "defect_radar")} />
           </CardContent>
         </Card>
 
@@ -186,7 +196,7 @@ export function PredictionDashboardContent() {
             </CardTitle>
           </CardHeader>
           <CardContent className="p-6">
-            <SkillRadar radarData={predictionData?.skill_radar || null} />
+            <SkillRadar radarData={chartSrc(predictionData, "skill_radar")} />
           </CardContent>
         </Card>
 